@@ -14,11 +14,24 @@ function CVMatching() {
     fetchJobs();
   }, []);
 
+  // Parcourt toutes les pages (next_cursor) d'une liste paginée
+  const fetchAllPages = async (path, key) => {
+    const items = [];
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ fields: 'names', limit: '200' });
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`http://localhost:8000/${path}?${params}`);
+      const data = await response.json();
+      items.push(...(data[key] || []));
+      cursor = data.next_cursor || null;
+    } while (cursor);
+    return items;
+  };
+
   const fetchCandidates = async () => {
     try {
-      const response = await fetch('http://localhost:8000/candidates');
-      const data = await response.json();
-      setCandidates(data.candidates || []);
+      setCandidates(await fetchAllPages('candidates', 'candidates'));
     } catch (err) {
       setError('Erreur lors du chargement des candidats');
     }
@@ -26,9 +39,7 @@ function CVMatching() {
 
   const fetchJobs = async () => {
     try {
-      const response = await fetch('http://localhost:8000/jobs');
-      const data = await response.json();
-      setJobs(data.jobs || []);
+      setJobs(await fetchAllPages('jobs', 'jobs'));
     } catch (err) {
       setError('Erreur lors du chargement des offres');
     }
@@ -5,35 +5,53 @@ function CandidatesList() {
   const [candidates, setCandidates] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selected, setSelected] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Liste paginée : seuls les champs résumés sont chargés
+  const loadCandidates = async (cursor = null) => {
+    try {
+      const params = { fields: "summary", limit: 20 };
+      if (cursor) params.cursor = cursor;
+      const res = await axios.get("http://127.0.0.1:8000/candidates", { params });
+
+      // Correction ici : s'assurer que candidates est toujours un tableau
+      const page = Array.isArray(res.data?.candidates) ? res.data.candidates : [];
+      setCandidates((previous) => (cursor ? [...previous, ...page] : page));
+      setNextCursor(res.data?.next_cursor || null);
+    } catch (e) {
+      console.error("Erreur chargement :", e);
+      if (!cursor) setCandidates([]); // Assurer que c'est un tableau même en cas d'erreur
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
-    const loadCandidates = async () => {
-      try {
-        const res = await axios.get("http://127.0.0.1:8000/candidates");
-        console.log("API Response:", res.data); // Debug log
-        
-        // Correction ici : s'assurer que candidates est toujours un tableau
-        if (Array.isArray(res.data)) {
-          setCandidates(res.data);
-        } else if (res.data && Array.isArray(res.data.candidates)) {
-          // Si l'API retourne { candidates: [...] }
-          setCandidates(res.data.candidates);
-        } else if (res.data && typeof res.data === 'object') {
-          // Si l'API retourne un objet avec d'autres propriétés
-          setCandidates([]); // Tableau vide par défaut
-        } else {
-          setCandidates([]);
-        }
-      } catch (e) {
-        console.error("Erreur chargement :", e);
-        setCandidates([]); // Assurer que c'est un tableau même en cas d'erreur
-      } finally {
-        setLoading(false);
-      }
-    };
     loadCandidates();
   }, []);
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    loadCandidates(nextCursor);
+  };
+
+  // Détails (analyses complètes) chargés à la demande
+  const toggleDetails = async (c) => {
+    if (selected?._id === c._id) {
+      setSelected(null);
+      return;
+    }
+    try {
+      const res = await axios.get(`http://127.0.0.1:8000/candidates/${c._id}`);
+      setSelected(res.data);
+    } catch (e) {
+      console.error("Erreur chargement détails :", e);
+      setSelected(c);
+    }
+  };
+
   if (loading)
     return <p style={{ textAlign: "center", padding: "50px" }}>Chargement des analyses...</p>;
 
@@ -114,7 +132,7 @@ function CandidatesList() {
             </div>
 
             <button
-              onClick={() => setSelected(selected?._id === c._id ? null : c)}
+              onClick={() => toggleDetails(c)}
               style={{
                 backgroundColor: "#0284c7",
                 color: "white",
@@ -165,21 +183,21 @@ function CandidatesList() {
               >
                 <h4 style={{ color: "#0f172a" }}>🧩 Analyse complète</h4>
                 <p>
-                  <b>Label IA :</b> {c.fraud_analysis?.bart_analysis?.label ?? "N/A"}
+                  <b>Label IA :</b> {selected.fraud_analysis?.bart_analysis?.label ?? "N/A"}
                 </p>
                 <p>
-                  <b>Confiance :</b> {c.fraud_analysis?.bart_analysis?.confidence ?? 0}%
+                  <b>Confiance :</b> {selected.fraud_analysis?.bart_analysis?.confidence ?? 0}%
                 </p>
 
                 <h4 style={{ color: "#3b82f6" }}>🧠 Détection IA / Similarité</h4>
-                {c.analysis?.similarity ? (
+                {selected.analysis?.similarity ? (
                   <>
                     <p>
                       <b>Score de similarité :</b>{" "}
-                      {(c.analysis.similarity.similarity_score * 100).toFixed(1)}%
+                      {(selected.analysis.similarity.similarity_score * 100).toFixed(1)}%
                     </p>
                     <p>
-                      <b>Verdict :</b> {c.analysis.similarity.verdict}
+                      <b>Verdict :</b> {selected.analysis.similarity.verdict}
                     </p>
                   </>
                 ) : (
@@ -187,8 +205,8 @@ function CandidatesList() {
                 )}
 
                 <h4 style={{ color: "#22c55e" }}>📜 Authenticité des documents</h4>
-                {c.document_authenticity?.length > 0 ? (
-                  c.document_authenticity.map((doc, i) => (
+                {selected.document_authenticity?.length > 0 ? (
+                  selected.document_authenticity.map((doc, i) => (
                     <div
                       key={i}
                       style={{
@@ -222,8 +240,8 @@ function CandidatesList() {
 
                 <h4 style={{ color: "#b91c1c" }}>⚠️ Fautes détectées</h4>
                 <ul>
-                  {c.analysis?.spelling_analysis?.examples?.length > 0 ? (
-                    c.analysis.spelling_analysis.examples.map((ex, i) => <li key={i}>{ex}</li>)
+                  {selected.analysis?.spelling_analysis?.examples?.length > 0 ? (
+                    selected.analysis.spelling_analysis.examples.map((ex, i) => <li key={i}>{ex}</li>)
                   ) : (
                     <li>Aucune faute détectée</li>
                   )}
@@ -231,20 +249,39 @@ function CandidatesList() {
 
                 <h4 style={{ color: "#eab308" }}>🚨 Anomalies IA</h4>
                 <ul>
-                  {c.fraud_analysis?.anomalies?.length > 0 ? (
-                    c.fraud_analysis.anomalies.map((a, i) => <li key={i}>{a}</li>)
+                  {selected.fraud_analysis?.anomalies?.length > 0 ? (
+                    selected.fraud_analysis.anomalies.map((a, i) => <li key={i}>{a}</li>)
                   ) : (
                     <li>RAS</li>
                   )}
                 </ul>
 
                 <p style={{ color: "#64748b", marginTop: "10px" }}>
-                  📅 {new Date(c.created_at).toLocaleString()}
+                  📅 {new Date(selected.created_at).toLocaleString()}
                 </p>
               </div>
             )}
           </div>
         ))}
+
+        {nextCursor && (
+          <div style={{ textAlign: "center", marginTop: "20px" }}>
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              style={{
+                backgroundColor: "#0f766e",
+                color: "white",
+                border: "none",
+                padding: "10px 20px",
+                borderRadius: "6px",
+                cursor: "pointer",
+              }}
+            >
+              {loadingMore ? "Chargement..." : "⬇️ Charger plus"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -63,8 +63,7 @@ function TopCandidates() {
 
   // Get candidate score for the selected job
   const getCandidateScore = (candidate) => {
-    const scoreData = candidate.computed?.score_cache?.[`job_${selectedJob}`];
-    return scoreData ? (scoreData.score * 100).toFixed(1) : 'N/A';
+    return typeof candidate.score === 'number' ? (candidate.score * 100).toFixed(1) : 'N/A';
   };
 
   // Get candidate screening classification
@@ -7,15 +7,33 @@ class RecruitAIApi {
     return response.json();
   }
 
-  // Candidats
-  async getCandidates() {
-    const response = await fetch(`${API_BASE_URL}/candidates`);
+  // Candidats (liste paginée : { candidates, next_cursor, has_more })
+  async getCandidates({ fields = 'summary', limit = 50, cursor = null } = {}) {
+    const params = new URLSearchParams({ fields, limit });
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/candidates?${params}`);
+    return response.json();
+  }
+
+  // Détail d'un candidat (chargé à la demande)
+  async getCandidate(candidateId, fields = 'detail') {
+    const response = await fetch(`${API_BASE_URL}/candidates/${candidateId}?fields=${fields}`);
+    return response.json();
+  }
+
+  // Meilleurs candidats pour une offre (curseur sur le score)
+  async getTopCandidates(jobId, { limit = 5, cursor = null } = {}) {
+    const params = new URLSearchParams({ limit });
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/get_top_candidates/${jobId}?${params}`);
     return response.json();
   }
 
   // Offres d'emploi
-  async getJobs() {
-    const response = await fetch(`${API_BASE_URL}/jobs`);
+  async getJobs({ fields = 'full', limit = 100, cursor = null } = {}) {
+    const params = new URLSearchParams({ fields, limit });
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/jobs?${params}`);
     return response.json();
   }
 
@@ -1,25 +1,27 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import spacy
 import re
-from typing import List, Dict, Tuple, Any
+from typing import Callable, List, Dict, Tuple, Any, Optional, Iterable
 import logging
+from tfidf_model import get_tfidf_model
+from skill_matcher import skill_matcher
+from model_registry import registry
+from memoization import memoize
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+def _experience_years(candidate: Dict) -> float:
+    """Années d'expérience du candidat ; 0 si la valeur n'est pas numérique (ex: "5 ans")"""
+    try:
+        return float(candidate.get("experienceYears", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
 class AIEngine:
     def __init__(self):
-        """Initialise le moteur IA avec les modèles nécessaires"""
-        try:
-            # Charger le modèle spaCy français
-            self.nlp = spacy.load("fr_core_news_sm")
-            logger.info("Modèle spaCy français chargé avec succès")
-        except OSError:
-            logger.warning("Modèle spaCy français non trouvé, utilisation du modèle small")
-            self.nlp = spacy.load("fr_core_news_sm")
-        
+        """Initialise le moteur IA (le modèle spaCy est chargé à la première utilisation)"""
         # Initialiser le vectorizer TF-IDF
         self.vectorizer = TfidfVectorizer(
             max_features=1000,
@@ -33,58 +35,152 @@ class AIEngine:
             "web": ["html", "css", "react", "vue", "angular", "node.js", "django", "flask", "spring"],
             "database": ["sql", "mysql", "postgresql", "mongodb", "redis", "oracle"],
             "devops": ["docker", "kubernetes", "aws", "azure", "gcp", "jenkins", "git", "ci/cd"],
-            "data_science": ["python", "r", "pandas", "numpy", "tensorflow", "pytorch", "ml", "ai"],
+            "data_science": ["python", "r", "pandas", "numpy", "tensorflow", "pytorch", "machine learning", "ai"],
             "mobile": ["android", "ios", "react native", "flutter", "swift", "kotlin"],
             "soft_skills": ["communication", "leadership", "teamwork", "problem solving", "creativity", "adaptability"]
         }
         
-        # Synonymes de compétences
+        # Synonymes de compétences (identifiants canoniques du dictionnaire ;
+        # les alias comme "py", "nodejs" ou "ml" sont résolus par skill_matcher)
         self.skill_synonyms = {
-            "python": ["python", "py", "django", "flask"],
-            "javascript": ["javascript", "js", "node", "react", "vue", "angular"],
-            "java": ["java", "spring", "j2ee"],
+            "python": ["python", "django", "flask"],
+            "javascript": ["javascript", "node.js", "react", "vue", "angular"],
+            "java": ["java", "spring"],
             "sql": ["sql", "mysql", "postgresql", "oracle"],
-            "mongodb": ["mongodb", "mongo", "nosql"],
+            "mongodb": ["mongodb", "nosql"],
             "docker": ["docker", "container"],
-            "aws": ["aws", "amazon web services"],
-            "react": ["react", "reactjs", "react.js"],
-            "node.js": ["node", "nodejs", "node.js"]
         }
         
+        # Identifiants entiers des compétences du dictionnaire et masques de synonymes
+        self._skill_ids: Dict[str, int] = {}
+        self._neighbour_masks: List[int] = []
+        self._build_skill_index()
+        
         logger.info("Moteur IA initialisé avec succès")
 
+    @property
+    def nlp(self):
+        """Modèle spaCy français partagé (registre de modèles)"""
+        return registry.get("spacy_fr")
+
+    def _build_skill_index(self):
+        """
+        Associe chaque compétence du dictionnaire à un identifiant entier et
+        précalcule son masque de voisins : la compétence elle-même et
+        toutes celles partageant un groupe de synonymes. L'index est figé
+        ensuite : les compétences inconnues (texte libre, entités spaCy)
+        n'ont pas de bit et sont comparées par égalité de chaîne.
+        """
+        known = list(skill_matcher.skills) + self.get_all_skills()
+        for synonyms in self.skill_synonyms.values():
+            known.extend(synonyms)
+        for skill in known:
+            if skill not in self._skill_ids:
+                self._skill_ids[skill] = len(self._neighbour_masks)
+                self._neighbour_masks.append(1 << self._skill_ids[skill])
+        for synonyms in self.skill_synonyms.values():
+            group_mask = self.skills_mask(synonyms)
+            for term in synonyms:
+                self._neighbour_masks[self._skill_ids[term]] |= group_mask
+
+    def skill_id(self, skill: str) -> Optional[int]:
+        """Identifiant entier d'une compétence du dictionnaire (None si inconnue)"""
+        return self._skill_ids.get(skill)
+
+    def skills_mask(self, skills: Iterable[str]) -> int:
+        """Bitset des compétences connues"""
+        mask = 0
+        for skill in skills:
+            skill_id = self._skill_ids.get(skill)
+            if skill_id is not None:
+                mask |= 1 << skill_id
+        return mask
+
+    def expanded_skills_mask(self, skills: Iterable[str]) -> int:
+        """Bitset des compétences connues et de tous leurs synonymes"""
+        mask = 0
+        for skill in skills:
+            skill_id = self._skill_ids.get(skill)
+            if skill_id is not None:
+                mask |= self._neighbour_masks[skill_id]
+        return mask
+
+    def _covered_job_skills(self, candidates_skills: Iterable[str], job_skills: List[str]) -> List[bool]:
+        """Couverture de chaque compétence de l'offre : bitset si connue, égalité sinon"""
+        candidates_skills = set(candidates_skills)
+        matched_mask = self.expanded_skills_mask(candidates_skills)
+        covered = []
+        for job_skill in job_skills:
+            skill_id = self._skill_ids.get(job_skill)
+            if skill_id is not None:
+                covered.append(bool(matched_mask >> skill_id & 1))
+            else:
+                covered.append(job_skill in candidates_skills)
+        return covered
+
+    def match_skill_sets(self, candidates_skills: Iterable[str],
+                         job_skills: List[str]) -> Tuple[List[str], List[str], float]:
+        """
+        Compétences correspondantes, manquantes et taux de couverture
+        en une seule intersection de bitsets
+        """
+        if not job_skills:
+            return [], [], 0.0
+        covered = self._covered_job_skills(candidates_skills, job_skills)
+        matching = [skill for skill, ok in zip(job_skills, covered) if ok]
+        missing = [skill for skill, ok in zip(job_skills, covered) if not ok]
+        return matching, missing, len(set(matching)) / len(set(job_skills))
+
     def extract_skills_from_text(self, text: str) -> List[str]:
         """
         Extrait les compétences techniques d'un texte de CV
         """
+        if not text:
+            return []
         try:
-            if not text:
-                return []
-            
-            text_lower = text.lower()
-            found_skills = []
-            
-            # Recherche des compétences par catégorie
-            for category, skills in self.skill_categories.items():
-                for skill in skills:
-                    # Vérifier la compétence et ses synonymes
-                    synonyms = self.skill_synonyms.get(skill, [skill])
-                    for synonym in synonyms:
-                        if synonym in text_lower:
-                            found_skills.append(skill)
-                            break
-            
-            # Extraction avec spaCy pour les entités
-            doc = self.nlp(text_lower)
-            for ent in doc.ents:
-                if ent.label_ in ["SKILL", "TECH"] or any(skill in ent.text.lower() for skill in self.get_all_skills()):
-                    found_skills.append(ent.text.lower())
-            
-            return list(set(found_skills))
-        
+            return self._extract_skills_cached(text)
         except Exception as e:
+            # spaCy indisponible : les compétences du dictionnaire restent valables
             logger.error(f"Erreur lors de l'extraction des compétences: {e}")
-            return []
+            return list(set(self._extract_keyword_skills(text)))
+
+    # Les échecs (spaCy indisponible) sont levés, donc jamais mis en cache
+    @memoize("extract_skills", version="2", method=True)
+    def _extract_skills_cached(self, text: str) -> List[str]:
+        found_skills = self._extract_keyword_skills(text)
+        # Extraction avec spaCy pour les entités
+        doc = self.nlp(text.lower())
+        found_skills.extend(self._extract_entity_skills(doc))
+        return list(set(found_skills))
+
+    def extract_skills_from_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        Version en lot de extract_skills_from_text : spaCy traite tous les
+        textes via nlp.pipe au lieu d'un appel par CV
+        """
+        results = [list(set(self._extract_keyword_skills(text))) if text else [] for text in texts]
+        try:
+            indexed = [(i, text) for i, text in enumerate(texts) if text]
+            docs = self.nlp.pipe([text.lower() for _, text in indexed], batch_size=64)
+            for (i, text), doc in zip(indexed, docs):
+                results[i] = list(set(results[i]) | set(self._extract_entity_skills(doc)))
+        except Exception as e:
+            # Les compétences du dictionnaire déjà trouvées sont conservées
+            logger.error(f"Erreur lors de l'extraction des compétences en lot: {e}")
+        return results
+
+    def _extract_keyword_skills(self, text: str) -> List[str]:
+        """Compétences du dictionnaire (et leurs alias) en un seul parcours"""
+        # Texte d'origine : les alias exacts (R, Go, REST) respectent la casse
+        return skill_matcher.find_skills(text)
+
+    def _extract_entity_skills(self, doc) -> List[str]:
+        """Entités spaCy correspondant à des compétences connues"""
+        found_skills = []
+        for ent in doc.ents:
+            if ent.label_ in ["SKILL", "TECH"] or skill_matcher.find(ent.text):
+                found_skills.append(ent.text.lower())
+        return found_skills
 
     def get_all_skills(self) -> List[str]:
         """Retourne toutes les compétences connues"""
@@ -97,19 +193,31 @@ class AIEngine:
         """
         Calcule la similarité cosinus entre deux textes
         """
+        if not text1 or not text2:
+            return 0.0
         try:
-            if not text1 or not text2:
-                return 0.0
-            
-            # Vectorisation TF-IDF
-            tfidf_matrix = self.vectorizer.fit_transform([text1, text2])
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
-            return float(similarity[0][0])
-        
+            return self._similarity_cached(text1, text2)
         except Exception as e:
             logger.error(f"Erreur calcul similarité: {e}")
             return 0.0
 
+    # Résultat lié à l'état du modèle TF-IDF : sa version fait partie de la clé.
+    # Les erreurs sont levées, donc jamais mises en cache.
+    @memoize("calculate_similarity", version=lambda: get_tfidf_model().version, method=True)
+    def _similarity_cached(self, text1: str, text2: str) -> float:
+        # Modèle TF-IDF appris sur le corpus : simple produit scalaire
+        tfidf_model = get_tfidf_model()
+        if tfidf_model.is_fitted:
+            return tfidf_model.similarity(text1, text2)
+
+        # Pas encore de corpus : vectorizer local (l'instance partagée n'est pas modifiée)
+        vectorizer = TfidfVectorizer(**self.vectorizer.get_params())
+        tfidf_matrix = vectorizer.fit_transform([text1, text2])
+        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
+        return float(similarity[0][0])
+
+    # Extracteurs regex peu coûteux : niveau mémoire uniquement
+    @memoize("extract_experience", version="1", shared=False, method=True)
     def extract_experience(self, text: str) -> float:
         """
         Extrait les années d'expérience d'un texte de CV
@@ -136,6 +244,7 @@ class AIEngine:
             logger.error(f"Erreur extraction expérience: {e}")
             return 0.0
 
+    @memoize("extract_education", version="1", shared=False, method=True)
     def extract_education(self, text: str) -> List[str]:
         """
         Extrait le niveau d'éducation d'un texte de CV
@@ -169,8 +278,8 @@ class AIEngine:
             candidates_skills = self.extract_candidates_skills(candidatess)
             job_skills = self.extract_job_skills(job)
             
-            # Calcul des scores
-            skill_score = self.calculate_skill_score(candidates_skills, job_skills)
+            # Calcul des scores (compétences : une seule intersection de bitsets)
+            matching_skills, missing_skills, skill_score = self.match_skill_sets(candidates_skills, job_skills)
             experience_score = self.calculate_experience_score(candidatess, job)
             education_score = self.calculate_education_score(candidatess, job)
             text_similarity = self.calculate_text_similarity(candidatess, job)
@@ -184,8 +293,6 @@ class AIEngine:
             )
             
             # Analyse détaillée
-            matching_skills = self.find_matching_skills(candidates_skills, job_skills)
-            missing_skills = self.find_missing_skills(candidates_skills, job_skills)
             strengths = self.identify_strengths(candidatess, job, matching_skills)
             weaknesses = self.identify_weaknesses(candidatess, job, missing_skills)
             
@@ -206,17 +313,103 @@ class AIEngine:
             logger.error(f"Erreur matching candidat-job: {e}")
             return self.create_fallback_result()
 
+    def batch_match_candidates_job(self, candidates: List[Dict], job: Dict,
+                                   threshold: float = 0.0,
+                                   top_k: Optional[int] = None,
+                                   score_sink: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Matching vectorisé d'une offre contre N candidats.
+        Les scores (compétences, expérience, éducation, similarité texte)
+        sont calculés sous forme de tableaux NumPy ; les champs narratifs
+        ne sont construits que pour les candidats retenus.
+        Retourne les résultats triés par score décroissant, chacun avec
+        l'"index" du candidat dans la liste d'entrée.
+        `score_sink` reçoit les scores de tous les candidats (avant seuil),
+        pour leur persistance en lot.
+        """
+        if not candidates:
+            return []
+
+        job_skills = self.extract_job_skills(job)
+        candidates_skills = self.extract_candidates_skills_batch(candidates)
+
+        # Matrice candidats × compétences requises (bitsets)
+        skill_matrix = np.array(
+            [self._covered_job_skills(skills, job_skills) for skills in candidates_skills],
+            dtype=bool
+        ).reshape(len(candidates), len(job_skills))
+        if job_skills:
+            skill_scores = skill_matrix.sum(axis=1) / len(job_skills)
+        else:
+            skill_scores = np.zeros(len(candidates))
+
+        # Expérience
+        experience = np.array([_experience_years(c) for c in candidates])
+        job_min_exp = job.get("min_experience", 0) or 0
+        if job_min_exp == 0:
+            experience_scores = np.ones(len(candidates))
+        else:
+            experience_scores = np.minimum(experience / job_min_exp, 1.0)
+
+        # Éducation
+        education_scores = np.array([self.calculate_education_score(c, job) for c in candidates])
+
+        # Similarité textuelle
+        text_scores = self.calculate_text_similarity_batch(candidates, job)
+
+        final_scores = (
+            0.4 * skill_scores +
+            0.3 * experience_scores +
+            0.15 * education_scores +
+            0.15 * text_scores
+        )
+        overall = np.round(final_scores * 100, 1)
+
+        if score_sink is not None:
+            score_sink([
+                {
+                    "index": i,
+                    "overall_score": float(overall[i]),
+                    "skill_score": round(float(skill_scores[i]) * 100, 1),
+                    "experience_score": round(float(experience_scores[i]) * 100, 1),
+                    "education_score": round(float(education_scores[i]) * 100, 1),
+                    "text_similarity": round(float(text_scores[i]) * 100, 1),
+                }
+                for i in range(len(candidates))
+            ])
+
+        # Sélection : seuil puis tri décroissant (stable)
+        selected = np.flatnonzero(overall >= threshold)
+        selected = selected[np.argsort(-overall[selected], kind="stable")]
+        if top_k is not None:
+            selected = selected[:top_k]
+
+        results = []
+        for i in selected:
+            candidate = candidates[i]
+            matching_skills = [job_skills[k] for k in np.flatnonzero(skill_matrix[i])]
+            missing_skills = [job_skills[k] for k in np.flatnonzero(~skill_matrix[i])]
+            strengths = self.identify_strengths(candidate, job, matching_skills)
+            weaknesses = self.identify_weaknesses(candidate, job, missing_skills)
+            results.append({
+                "index": int(i),
+                "overall_score": float(overall[i]),
+                "skill_score": round(float(skill_scores[i]) * 100, 1),
+                "experience_score": round(float(experience_scores[i]) * 100, 1),
+                "education_score": round(float(education_scores[i]) * 100, 1),
+                "text_similarity": round(float(text_scores[i]) * 100, 1),
+                "matching_skills": matching_skills,
+                "missing_skills": missing_skills,
+                "strengths": strengths,
+                "weaknesses": weaknesses,
+                "recommendation": self.generate_recommendation(float(final_scores[i]), strengths, weaknesses)
+            })
+
+        return results
+
     def extract_candidates_skills(self, candidates: Dict) -> List[str]:
         """Extrait les compétences du candidat"""
-        skills = []
-        
-        # Compétences structurées
-        if candidates.get("skills"):
-            for skill in candidates["skills"]:
-                if isinstance(skill, dict):
-                    skills.append(skill["name"].lower())
-                else:
-                    skills.append(skill.lower())
+        skills = self._structured_skills(candidates)
         
         # Extraction depuis le texte
         if candidates.get("resumeText"):
@@ -225,6 +418,22 @@ class AIEngine:
         
         return list(set(skills))
 
+    def extract_candidates_skills_batch(self, candidates: List[Dict]) -> List[set]:
+        """Compétences de plusieurs candidats (extraction texte en lot)"""
+        text_skills = self.extract_skills_from_texts([c.get("resumeText") or "" for c in candidates])
+        return [set(self._structured_skills(c)) | set(skills) for c, skills in zip(candidates, text_skills)]
+
+    def _structured_skills(self, candidates: Dict) -> List[str]:
+        """Compétences structurées du candidat"""
+        skills = []
+        if candidates.get("skills"):
+            for skill in candidates["skills"]:
+                if isinstance(skill, dict):
+                    skills.append(skill_matcher.canonical(skill["name"]))
+                else:
+                    skills.append(skill_matcher.canonical(skill))
+        return skills
+
     def extract_job_skills(self, job: Dict) -> List[str]:
         """Extrait les compétences de l'offre"""
         skills = []
@@ -232,47 +441,38 @@ class AIEngine:
         if job.get("required_skills"):
             for skill in job["required_skills"]:
                 if isinstance(skill, dict):
-                    skills.append(skill["name"].lower())
+                    skills.append(skill_matcher.canonical(skill["name"]))
                 else:
-                    skills.append(skill.lower())
+                    skills.append(skill_matcher.canonical(skill))
         
         if job.get("preferred_skills"):
             for skill in job["preferred_skills"]:
                 if isinstance(skill, dict):
-                    skills.append(skill["name"].lower())
+                    skills.append(skill_matcher.canonical(skill["name"]))
                 else:
-                    skills.append(skill.lower())
+                    skills.append(skill_matcher.canonical(skill))
         
         return list(set(skills))
 
     def calculate_skill_score(self, candidates_skills: List[str], job_skills: List[str]) -> float:
         """Calcule le score de matching des compétences"""
-        if not job_skills:
-            return 0.0
-        
-        matching_count = 0
-        for job_skill in job_skills:
-            if any(self.skills_match(candidates_skill, job_skill) for candidates_skill in candidates_skills):
-                matching_count += 1
-        
-        return matching_count / len(job_skills)
+        return self.match_skill_sets(candidates_skills, job_skills)[2]
 
     def skills_match(self, skill1: str, skill2: str) -> bool:
         """Vérifie si deux compétences correspondent"""
         if skill1 == skill2:
             return True
         
-        # Vérification des synonymes
-        for main_skill, synonyms in self.skill_synonyms.items():
-            if skill1 in synonyms and skill2 in synonyms:
-                return True
-        
-        return False
+        # Vérification des synonymes (masque de voisins précalculé)
+        id1, id2 = self.skill_id(skill1), self.skill_id(skill2)
+        if id1 is None or id2 is None:
+            return False
+        return bool(self._neighbour_masks[id1] >> id2 & 1)
 
     def calculate_experience_score(self, candidates: Dict, job: Dict) -> float:
         """Calcule le score d'expérience"""
-        candidates_exp = candidates.get("experienceYears", 0)
-        job_min_exp = job.get("min_experience", 0)
+        candidates_exp = _experience_years(candidates)
+        job_min_exp = job.get("min_experience", 0) or 0
         
         if job_min_exp == 0:
             return 1.0
@@ -307,31 +507,45 @@ class AIEngine:
         
         return self.calculate_similarity(candidates_text, job_text)
 
+    def calculate_text_similarity_batch(self, candidates: List[Dict], job: Dict) -> np.ndarray:
+        """Similarité textuelle de N candidats avec une offre (un seul fit TF-IDF)"""
+        scores = np.zeros(len(candidates))
+        job_text = job.get("description", "")
+        indices = [i for i, c in enumerate(candidates) if c.get("resumeText")]
+        if not job_text or not indices:
+            return scores
+
+        try:
+            tfidf_model = get_tfidf_model()
+            if tfidf_model.is_fitted:
+                scores[indices] = tfidf_model.similarities(job_text, [candidates[i]["resumeText"] for i in indices])
+                return scores
+            
+            # Vectorizer local : l'instance partagée n'est pas modifiée
+            vectorizer = TfidfVectorizer(**self.vectorizer.get_params())
+            tfidf_matrix = vectorizer.fit_transform([job_text] + [candidates[i]["resumeText"] for i in indices])
+            # Lignes normalisées L2 : le produit scalaire est le cosinus
+            similarities = (tfidf_matrix[1:] @ tfidf_matrix[0].T).toarray().ravel()
+            scores[indices] = similarities
+        except Exception as e:
+            logger.error(f"Erreur calcul similarité en lot: {e}")
+        return scores
+
     def find_matching_skills(self, candidates_skills: List[str], job_skills: List[str]) -> List[str]:
         """Trouve les compétences correspondantes"""
-        matching = []
-        for job_skill in job_skills:
-            for candidates_skill in candidates_skills:
-                if self.skills_match(candidates_skill, job_skill):
-                    matching.append(job_skill)
-                    break
-        return matching
+        return self.match_skill_sets(candidates_skills, job_skills)[0]
 
     def find_missing_skills(self, candidates_skills: List[str], job_skills: List[str]) -> List[str]:
         """Trouve les compétences manquantes"""
-        missing = []
-        for job_skill in job_skills:
-            if not any(self.skills_match(candidates_skill, job_skill) for candidates_skill in candidates_skills):
-                missing.append(job_skill)
-        return missing
+        return self.match_skill_sets(candidates_skills, job_skills)[1]
 
     def identify_strengths(self, candidates: Dict, job: Dict, matching_skills: List[str]) -> List[str]:
         """Identifie les points forts"""
         strengths = []
         
         # Expérience supérieure
-        candidates_exp = candidates.get("experienceYears", 0)
-        job_min_exp = job.get("min_experience", 0)
+        candidates_exp = _experience_years(candidates)
+        job_min_exp = job.get("min_experience", 0) or 0
         if candidates_exp > job_min_exp + 2:
             strengths.append(f"Expérience supérieure ({candidates_exp} ans)")
         
@@ -352,8 +566,8 @@ class AIEngine:
         weaknesses = []
         
         # Expérience insuffisante
-        candidates_exp = candidates.get("experienceYears", 0)
-        job_min_exp = job.get("min_experience", 0)
+        candidates_exp = _experience_years(candidates)
+        job_min_exp = job.get("min_experience", 0) or 0
         if candidates_exp < job_min_exp:
             weaknesses.append(f"Expérience insuffisante ({candidates_exp} ans vs {job_min_exp} ans requis)")
         
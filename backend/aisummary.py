@@ -1,9 +1,9 @@
 # aisummary.py (updated)
-import PyPDF2
-import pdfplumber
 import docx
 import re
 from transformers import pipeline
+from skill_matcher import skill_matcher
+from pdf_extraction import extract_text
 
 class CVAnalyzer:
     def __init__(self):
@@ -26,24 +26,8 @@ class CVAnalyzer:
     def extract_text_from_pdf(self, file_stream):
         """Extract text from PDF files with multiple fallbacks."""
         try:
-            text = ""
-            # Try pdfplumber first (better for text extraction)
-            with pdfplumber.open(file_stream) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            # If pdfplumber didn't get much text, try PyPDF2 as fallback
-            if len(text.strip()) < 50:
-                file_stream.seek(0)  # Reset stream
-                pdf_reader = PyPDF2.PdfReader(file_stream)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            return text.strip()
+            # Shared engine: picks pypdf or pdfplumber per document
+            return extract_text(file_stream).strip()
         except Exception as e:
             print(f"PDF extraction error: {e}")
             return ""
@@ -116,10 +100,7 @@ INTERVIEW FOCUS: [What to explore]
         # Simple keyword-based analysis as fallback
         text_lower = cv_text.lower()
         
-        skills_found = []
-        for skill in ['python', 'java', 'javascript', 'react', 'sql', 'aws', 'docker', 'kubernetes']:
-            if skill in text_lower:
-                skills_found.append(skill)
+        skills_found = skill_matcher.find_skills(cv_text)
         
         experience_years = "Not specified"
         if 'year' in text_lower or 'years' in text_lower:
@@ -1,5 +1,5 @@
 import os
-from PyPDF2 import PdfReader
+from pdf_extraction import extract_text
 import docx
 from flask import Flask, request, render_template_string
 import webbrowser
@@ -262,11 +262,7 @@ HTML_TEMPLATE = """
 def extract_text_from_pdf(pdf_path):
     """Extract text from PDF file"""
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        return extract_text(pdf_path)
     except Exception as e:
         return f"Error reading PDF: {e}"
 
@@ -1,15 +1,11 @@
 import re
 from .spell_checker import analyze_text_quality
 from .certificate_checker import verify_certificates_from_text
-from PyPDF2 import PdfReader
+from .pdf_extraction import extract_text
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Lit le texte brut d’un fichier PDF."""
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+    return extract_text(pdf_path)
 
 def analyze_cv(cv_path: str, candidate_name: str):
     """
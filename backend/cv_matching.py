@@ -5,42 +5,16 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import re
-from sentence_transformers import SentenceTransformer
-import spacy
-from transformers import pipeline
-import torch
+from tfidf_model import get_tfidf_model
+from skill_matcher import skill_matcher
+from model_registry import registry
 
 logger = logging.getLogger(__name__)
 
 class AdvancedCVMatchingService:
     def __init__(self):
-        # Modèles d'embedding sémantique
-        try:
-            self.sentence_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-            logger.info("Sentence transformer model loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load sentence transformer: {e}")
-            self.sentence_model = None
-        
-        # Modèle spaCy pour le NLP
-        try:
-            self.nlp = spacy.load("fr_core_news_sm")
-            logger.info("spaCy model loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load spaCy model: {e}")
-            self.nlp = None
-        
-        # Classificateur pour l'analyse sémantique
-        try:
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="nlptown/bert-base-multilingual-uncased-sentiment",
-                tokenizer="nlptown/bert-base-multilingual-uncased-sentiment"
-            )
-            logger.info("Sentiment analyzer loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load sentiment analyzer: {e}")
-            self.sentiment_analyzer = None
+        # Les modèles (embeddings, spaCy, sentiment) sont chargés à la demande
+        # via le registre partagé
         
         # TF-IDF traditionnel comme fallback
         self.tfidf_vectorizer = TfidfVectorizer(
@@ -49,20 +23,6 @@ class AdvancedCVMatchingService:
             ngram_range=(1, 2)
         )
         
-        self.common_skills = [
-            "python", "java", "javascript", "react", "angular", "vue", "nodejs", "django", "flask",
-            "sql", "postgresql", "mysql", "mongodb", "redis", "docker", "kubernetes", "aws", "azure",
-            "git", "github", "gitlab", "jenkins", "ci/cd", "rest api", "graphql", "microservices",
-            "machine learning", "ai", "data science", "pandas", "numpy", "tensorflow", "pytorch",
-            "html", "css", "bootstrap", "sass", "webpack", "npm", "yarn", "linux", "bash",
-            "agile", "scrum", "kanban", "jira", "confluence", "testing", "tdd", "bdd",
-            "next.js", "typescript", "express", "spring", "hibernate", "jpa", "maven", "gradle",
-            "vue.js", "svelte", "ember", "backbone", "jquery", "lodash", "moment", "axios",
-            "firebase", "supabase", "prisma", "sequelize", "typeorm", "mongoose", "elasticsearch",
-            "kafka", "rabbitmq", "nginx", "apache", "tomcat", "jetty", "wildfly", "glassfish",
-            "full stack", "frontend", "backend", "devops", "cloud", "api", "rest", "json", "xml"
-        ]
-        
         # Niveaux d'expérience pour l'analyse
         self.experience_levels = {
             "junior": ["débutant", "junior", "stage", "alternance", "0-2 ans", "1-3 ans"],
@@ -70,26 +30,37 @@ class AdvancedCVMatchingService:
             "senior": ["senior", "expert", "lead", "principal", "7+ ans", "10+ ans", "architecte"]
         }
     
+    @property
+    def sentence_model(self):
+        """Modèle d'embedding sémantique multilingue"""
+        return registry.get_or_none("minilm_multilingual")
+    
+    @property
+    def nlp(self):
+        """Modèle spaCy pour le NLP (instance partagée avec AIEngine)"""
+        return registry.get_or_none("spacy_fr")
+    
+    @property
+    def sentiment_analyzer(self):
+        """Classificateur pour l'analyse sémantique (non utilisé par le matching)"""
+        return registry.get_or_none("nlptown_sentiment")
+    
     def extract_skills_advanced(self, text: str) -> Dict[str, Any]:
         """Extrait les compétences avec analyse sémantique avancée"""
         if not text:
             return {"skills": [], "experience_level": "unknown", "confidence": 0.0}
         
-        text_lower = text.lower()
-        found_skills = []
-        
-        # Extraction basique des compétences
-        for skill in self.common_skills:
-            if skill in text_lower:
-                found_skills.append(skill.title())
+        # Extraction des compétences (automate partagé, un seul parcours)
+        found_skills = [skill.title() for skill in skill_matcher.find_skills(text)]
         
         # Analyse d'expérience avec regex
         experience_level = self._detect_experience_level(text)
         
         # Extraction d'entités avec spaCy si disponible
         entities = []
-        if self.nlp:
-            doc = self.nlp(text)
+        nlp = self.nlp
+        if nlp:
+            doc = nlp(text)
             entities = [ent.text for ent in doc.ents if ent.label_ in ["ORG", "PRODUCT", "TECH"]]
         
         return {
@@ -136,8 +107,9 @@ class AdvancedCVMatchingService:
                 return 0.0
             
             # Utilisation du modèle sentence transformer si disponible
-            if self.sentence_model:
-                embeddings = self.sentence_model.encode([text1, text2])
+            sentence_model = self.sentence_model
+            if sentence_model:
+                embeddings = sentence_model.encode([text1, text2])
                 similarity = cosine_similarity(
                     embeddings[0:1].reshape(1, -1), 
                     embeddings[1:2].reshape(1, -1)
@@ -154,7 +126,12 @@ class AdvancedCVMatchingService:
     def _calculate_tfidf_similarity(self, text1: str, text2: str) -> float:
         """Calcule la similarité TF-IDF traditionnelle"""
         try:
-            embeddings = self.tfidf_vectorizer.fit_transform([text1, text2])
+            tfidf_model = get_tfidf_model()
+            if tfidf_model.is_fitted:
+                return tfidf_model.similarity(text1, text2)
+            
+            vectorizer = TfidfVectorizer(**self.tfidf_vectorizer.get_params())
+            embeddings = vectorizer.fit_transform([text1, text2])
             similarity = cosine_similarity(embeddings[0:1], embeddings[1:2])[0][0]
             return float(similarity)
         except Exception as e:
@@ -1,28 +1,32 @@
 # ---------------- cv_parser.py ----------------
 import re
-import pdfplumber
-from transformers import pipeline
 from datetime import datetime
 from typing import List, Dict, Any
 from scoring import predict_turnover_or_engagement, screen_cv_class
+from skill_matcher import skill_matcher
+from model_registry import registry
+from inference_batcher import MicroBatcher
+from pdf_extraction import extract_text
 
-# --- Pipeline NER pour extraire les noms et infos ---
-ner_pipeline = pipeline("ner", model="dslim/bert-base-NER", grouped_entities=True)
+# --- Pipeline NER (dslim/bert-base-NER) chargé à la demande via le registre ---
+def _ner_batch(texts: List[str]) -> List[List[Dict[str, Any]]]:
+    results = registry.get("bert_ner")(texts, batch_size=len(texts))
+    # Certaines versions de transformers dépaquettent un lot d'un seul texte
+    if len(texts) == 1 and (not results or isinstance(results[0], dict)):
+        results = [results]
+    return results
+
+# Appels concurrents regroupés en un seul passage du modèle
+ner_batcher = MicroBatcher("bert_ner", _ner_batch, length_fn=len)
 
 # ---------------- Extraction texte ----------------
 def extract_text_from_pdf(file_path: str) -> str:
     """Extrait le texte d'un PDF de manière générique"""
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+    return extract_text(file_path)
 
 # ---------------- Informations personnelles ----------------
 def extract_personal_info(text: str) -> Dict[str, Any]:
-    ner_results = ner_pipeline(text[:1000])
+    ner_results = ner_batcher(text[:1000])
     firstName, lastName, location = "Unknown", "Candidate", ""
     
     for ent in ner_results:
@@ -61,23 +65,13 @@ def extract_personal_info(text: str) -> Dict[str, Any]:
 
 # ---------------- Compétences ----------------
 def extract_skills(text: str) -> List[Dict[str, Any]]:
-    technical_skills_db = {
-        "programming": ['python', 'java', 'javascript', 'c++', 'c#', 'ruby', 'php', 'go', 'rust', 'swift'],
-        "web": ['html', 'css', 'react', 'angular', 'vue', 'django', 'flask', 'spring'],
-        "mobile": ['flutter', 'react native', 'android', 'ios'],
-        "database": ['mysql', 'postgresql', 'mongodb', 'redis', 'sqlite', 'oracle'],
-        "devops": ['docker', 'kubernetes', 'jenkins', 'git', 'aws', 'azure', 'gcp']
-    }
     found_skills = []
-    text_lower = text.lower()
-    for category, skills in technical_skills_db.items():
-        for skill in skills:
-            if re.search(r'\b' + re.escape(skill) + r'\b', text_lower):
-                found_skills.append({
-                    "name": skill,
-                    "level": estimate_skill_level(skill, text),
-                    "category": category
-                })
+    for skill in skill_matcher.find_skills(text):
+        found_skills.append({
+            "name": skill,
+            "level": estimate_skill_level(skill, text),
+            "category": skill_matcher.category(skill)
+        })
     return found_skills
 
 def estimate_skill_level(skill: str, text: str) -> float:
@@ -1,54 +1,154 @@
-from transformers import (
-    TrOCRProcessor,
-    VisionEncoderDecoderModel,
-    AutoImageProcessor,
-    AutoModelForImageClassification,
-)
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Union
+
+import numpy as np
 from PIL import Image
 import torch
+from model_registry import registry
+from inference_batcher import MicroBatcher
 
 # ======================================================
-# 🧠 1️⃣ Initialisation des modèles
+# ⚙️ Configuration du pipeline document
 # ======================================================
-print("🚀 Initialisation des modèles d'authentification de documents...")
+# Plus grand côté après réduction : suffisant pour des lignes lisibles
+DOC_MAX_SIDE = int(os.getenv("DOC_MAX_SIDE", "2000"))
+DOC_PDF_DPI = int(os.getenv("DOC_PDF_DPI", "150"))
+DOC_MAX_LINES = int(os.getenv("DOC_MAX_LINES", "40"))
+# Lignes passées ensemble dans un même generate TrOCR
+DOC_OCR_BATCH_SIZE = int(os.getenv("DOC_OCR_BATCH_SIZE", "16"))
+# Délai par document : au-delà, le résultat partiel est renvoyé
+DOC_ANALYSIS_TIMEOUT = float(os.getenv("DOC_ANALYSIS_TIMEOUT", "60"))
 
+# ======================================================
+# 🧠 1️⃣ Modèles (chargés à la première utilisation via le registre)
+# ======================================================
 # --- OCR (lecture de texte depuis image ou PDF) ---
-try:
-    ocr_processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
-    ocr_model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
-    print("✅ OCR (TrOCR) prêt.")
-except Exception as e:
-    print("❌ Erreur chargement OCR:", e)
-    ocr_processor, ocr_model = None, None
+def get_ocr_model():
+    return registry.get_or_none("trocr") or (None, None)
 
 # --- Détection falsification IA (images générées ou truquées) ---
-try:
-    forgery_processor = AutoImageProcessor.from_pretrained("umm-maybe/ai-image-detector")
-    forgery_model = AutoModelForImageClassification.from_pretrained("umm-maybe/ai-image-detector")
-    print("✅ Détecteur d'images truquées prêt.")
-except Exception as e:
-    print("❌ Erreur chargement du modèle de falsification:", e)
-    forgery_processor, forgery_model = None, None
+def get_forgery_model():
+    return registry.get_or_none("forgery_detector") or (None, None)
+
+
+# --- Lots d'images : taille fixe après redimensionnement, pas de tranches de longueur ---
+def _ocr_batch(images):
+    ocr_processor, ocr_model = get_ocr_model()
+    pixel_values = ocr_processor(images=images, return_tensors="pt").pixel_values
+    with torch.no_grad():
+        generated_ids = ocr_model.generate(pixel_values)
+    return [text.strip() for text in ocr_processor.batch_decode(generated_ids, skip_special_tokens=True)]
+
+
+def _forgery_batch(images):
+    forgery_processor, forgery_model = get_forgery_model()
+    inputs = forgery_processor(images=images, return_tensors="pt")
+    with torch.no_grad():
+        probabilities = torch.softmax(forgery_model(**inputs).logits, dim=-1)
+    return [(int(p.argmax()), float(p.max())) for p in probabilities]
+
+
+ocr_batcher = MicroBatcher("trocr", _ocr_batch, max_batch_size=DOC_OCR_BATCH_SIZE)
+forgery_batcher = MicroBatcher("forgery_detector", _forgery_batch, max_batch_size=8)
+
+
+# ======================================================
+# 🖼️ 2️⃣ Décodage unique et segmentation en lignes
+# ======================================================
+def load_document_image(path: str, max_side: int = DOC_MAX_SIDE) -> Image.Image:
+    """Décode le document une seule fois (1re page pour un PDF), réduit à max_side"""
+    if path.lower().endswith(".pdf"):
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            image = pdf.pages[0].to_image(resolution=DOC_PDF_DPI).original
+    else:
+        image = Image.open(path)
+        # JPEG : décodage directement à une résolution réduite
+        image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    """Seuil de binarisation d'Otsu (variance inter-classes maximale)"""
+    probabilities = np.bincount(gray.ravel(), minlength=256) / gray.size
+    omega = np.cumsum(probabilities)
+    mu = np.cumsum(probabilities * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def _runs(mask: np.ndarray) -> List[List[int]]:
+    """Intervalles [début, fin) des suites de True"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return [list(run) for run in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))]
+
+
+def segment_lines(image: Image.Image, max_lines: int = DOC_MAX_LINES) -> List[Image.Image]:
+    """
+    Découpe l'image en lignes de texte par profil de projection horizontal :
+    TrOCR ne lit qu'une ligne à la fois.
+    """
+    gray = np.asarray(image.convert("L"))
+    ink = gray <= _otsu_threshold(gray)
+    if ink.mean() > 0.5:  # texte clair sur fond sombre
+        ink = ~ink
+    height, width = ink.shape
+
+    rows = ink.sum(axis=1) >= max(1, width // 500)
+    lines: List[List[int]] = []
+    for start, end in _runs(rows):
+        # Fusionne les lignes séparées de quelques pixels (accents, soulignés)
+        if lines and start - lines[-1][1] <= max(2, height // 400):
+            lines[-1][1] = end
+        else:
+            lines.append([start, end])
+
+    crops = []
+    min_height, max_height = max(8, height // 200), height // 4
+    for top, bottom in lines:
+        # Trop fin (bruit) ou trop haut (logo, tampon, photo)
+        if not min_height <= bottom - top <= max_height:
+            continue
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        pad = max(4, (bottom - top) // 4)
+        box = (max(0, int(columns[0]) - pad), max(0, int(top) - pad),
+               min(width, int(columns[-1]) + pad + 1), min(height, int(bottom) + pad))
+        crops.append(image.crop(box))
+        if len(crops) >= max_lines:
+            break
+    return crops or [image]
 
 
 # ======================================================
-# 📖 2️⃣ OCR : Extraction du texte
+# 📖 3️⃣ OCR : Extraction du texte
 # ======================================================
-def extract_text_from_image(image_path: str) -> str:
+def _as_image(source: Union[str, Image.Image]) -> Image.Image:
+    return source if isinstance(source, Image.Image) else load_document_image(source)
+
+
+def ocr_lines(image: Image.Image) -> List[str]:
+    """Texte de chaque ligne ; toutes les lignes partent ensemble vers TrOCR"""
+    futures = [ocr_batcher.submit(crop) for crop in segment_lines(image)]
+    return [future.result() for future in futures]
+
+
+def extract_text_from_image(source: Union[str, Image.Image]) -> str:
+    ocr_processor, ocr_model = get_ocr_model()
     if not ocr_model:
         return "Erreur: modèle OCR non initialisé."
     try:
-        image = Image.open(image_path).convert("RGB")
-        pixel_values = ocr_processor(images=image, return_tensors="pt").pixel_values
-        generated_ids = ocr_model.generate(pixel_values)
-        text = ocr_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-        return text.strip()
+        return "\n".join(text for text in ocr_lines(_as_image(source)) if text)
     except Exception as e:
         return f"Erreur OCR: {e}"
 
 
 # ======================================================
-# 🔍 3️⃣ Vérification texte OCR vs texte du CV
+# 🔍 4️⃣ Vérification texte OCR vs texte du CV
 # ======================================================
 def verify_certificate_text(cv_text: str, ocr_text: str):
     keywords = ["aws", "google", "ibm", "coursera", "microsoft", "udemy", "oracle", "linkedin"]
@@ -63,48 +163,116 @@ def verify_certificate_text(cv_text: str, ocr_text: str):
 
 
 # ======================================================
-# 🧠 4️⃣ Détection d’images falsifiées / générées par IA
+# 🧠 5️⃣ Détection d’images falsifiées / générées par IA
 # ======================================================
-def detect_forgery(image_path: str):
+def _forgery_verdict(forgery_model, predicted_class: int, score: float):
+    label = forgery_model.config.id2label[predicted_class]
+    return {
+        "label": label,
+        "confidence": round(score * 100, 2),
+        "verdict": (
+            "🚨 Document probablement falsifié / généré par IA"
+            if "fake" in label.lower()
+            else "✅ Document authentique"
+        ),
+    }
+
+
+def detect_forgery(source: Union[str, Image.Image]):
+    forgery_processor, forgery_model = get_forgery_model()
     if not forgery_model:
         return {"error": "Modèle de falsification non initialisé"}
 
     try:
-        image = Image.open(image_path).convert("RGB")
-        inputs = forgery_processor(images=image, return_tensors="pt")
-
-        with torch.no_grad():
-            outputs = forgery_model(**inputs)
-            logits = outputs.logits
-            predicted_class = logits.argmax(-1).item()
-            score = torch.softmax(logits, dim=-1)[0][predicted_class].item()
-
-        labels = forgery_model.config.id2label
-        label = labels[predicted_class]
-
-        return {
-            "label": label,
-            "confidence": round(score * 100, 2),
-            "verdict": (
-                "🚨 Document probablement falsifié / généré par IA"
-                if "fake" in label.lower()
-                else "✅ Document authentique"
-            ),
-        }
+        return _forgery_verdict(forgery_model, *forgery_batcher(_as_image(source)))
     except Exception as e:
         return {"error": str(e)}
 
 
 # ======================================================
-# 🔗 5️⃣ Pipeline complet (OCR + vérification + IA)
+# 🔗 6️⃣ Pipeline complet (OCR + vérification + IA)
 # ======================================================
-def analyze_document_authenticity(cv_text: str, doc_path: str):
-    ocr_text = extract_text_from_image(doc_path)
-    text_verif = verify_certificate_text(cv_text, ocr_text)
-    image_verif = detect_forgery(doc_path)
+def _collect(futures, deadline: float):
+    """
+    Résultats des futures avant l'échéance. Sinon les requêtes encore en
+    file sont annulées (retirées des lots TrOCR / falsification) et
+    TimeoutError est levée.
+    """
+    try:
+        return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+    except FutureTimeoutError:
+        for future in futures:
+            future.cancel()
+        raise
 
-    return {
-        "ocr_text": ocr_text,
-        "text_verification": text_verif,
-        "image_verification": image_verif,
-    }
\ No newline at end of file
+
+def analyze_documents_authenticity(cv_text: str, doc_paths: List[str],
+                                   timeout: float = DOC_ANALYSIS_TIMEOUT) -> List[Dict]:
+    """
+    Analyse tous les documents d'un candidat ensemble : chaque image est
+    décodée une fois, toutes passent dans un même lot du classifieur de
+    falsification, puis toutes leurs lignes partent ensemble vers TrOCR.
+    Chaque document dispose de `timeout` secondes à partir de la
+    soumission de ses requêtes ; au-delà, il renvoie ce qui est déjà
+    calculé et ses requêtes restantes sont annulées.
+    """
+    forgery_processor, forgery_model = get_forgery_model()
+    ocr_processor, ocr_model = get_ocr_model()
+
+    documents = []
+    for path in doc_paths:
+        try:
+            documents.append({"image": load_document_image(path)})
+        except Exception as e:
+            documents.append({"error": str(e)})
+    decoded = [doc for doc in documents if "image" in doc]
+
+    # Falsification d'abord : soumissions consécutives, regroupées en un lot
+    for doc in decoded:
+        doc["deadline"] = time.monotonic() + timeout
+        if forgery_model:
+            doc["forgery"] = forgery_batcher.submit(doc["image"])
+    if ocr_model:
+        for doc in decoded:
+            try:
+                doc["lines"] = [ocr_batcher.submit(crop) for crop in segment_lines(doc["image"])]
+            except Exception as e:
+                doc["ocr_error"] = str(e)
+
+    results = []
+    for doc in documents:
+        if "error" in doc:
+            ocr_text, image_verif = f"Erreur OCR: {doc['error']}", {"error": doc["error"]}
+        else:
+            if not ocr_model:
+                ocr_text = "Erreur: modèle OCR non initialisé."
+            elif "ocr_error" in doc:
+                ocr_text = f"Erreur OCR: {doc['ocr_error']}"
+            else:
+                try:
+                    ocr_text = "\n".join(text for text in _collect(doc["lines"], doc["deadline"]) if text)
+                except FutureTimeoutError:
+                    ocr_text = "Erreur OCR: délai dépassé"
+                except Exception as e:
+                    ocr_text = f"Erreur OCR: {e}"
+
+            if not forgery_model:
+                image_verif = {"error": "Modèle de falsification non initialisé"}
+            else:
+                try:
+                    image_verif = _forgery_verdict(forgery_model, *_collect([doc["forgery"]], doc["deadline"])[0])
+                except FutureTimeoutError:
+                    image_verif = {"error": "Délai dépassé"}
+                except Exception as e:
+                    image_verif = {"error": str(e)}
+
+        results.append({
+            "ocr_text": ocr_text,
+            "text_verification": verify_certificate_text(cv_text, ocr_text),
+            "image_verification": image_verif,
+        })
+    return results
+
+
+def analyze_document_authenticity(cv_text: str, doc_path: str):
+    return analyze_documents_authenticity(cv_text, [doc_path])[0]
@@ -0,0 +1,96 @@
+# embedding_store.py
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from bson import Binary
+
+from onnx_backend import embedding_version_tag
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# 🧠 Identité du modèle d'embeddings
+# ======================================================
+# Toute modification du modèle (ou de sa normalisation) doit incrémenter
+# EMBEDDING_MODEL_VERSION pour invalider les vecteurs déjà stockés.
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Les poids quantifiés int8 (ONNX_QUANTIZE=1) produisent des vecteurs distincts
+EMBEDDING_MODEL_VERSION = "1" + embedding_version_tag()
+EMBEDDING_FIELD = "embedding"
+
+
+def text_fingerprint(text: str) -> str:
+    """Empreinte SHA-256 du texte encodé (détecte un resumeText modifié)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def embedding_fingerprint(text: str, model_name: str = EMBEDDING_MODEL_NAME,
+                          model_version: str = EMBEDDING_MODEL_VERSION) -> str:
+    """
+    Empreinte du vecteur d'un texte : modèle, version et texte. Un index
+    construit avec un autre modèle (ou d'autres poids) est ainsi détecté
+    comme périmé.
+    """
+    return f"{model_name}:{model_version}:{text_fingerprint(text)}"
+
+
+def is_embedding_fresh(record: Optional[Dict[str, Any]], text: str,
+                       model_name: str = EMBEDDING_MODEL_NAME,
+                       model_version: str = EMBEDDING_MODEL_VERSION) -> bool:
+    """Vérifie qu'un vecteur stocké correspond au texte et au modèle courants"""
+    if not record or "vector" not in record:
+        return False
+    return (
+        record.get("model") == model_name
+        and record.get("version") == model_version
+        and record.get("text_hash") == text_fingerprint(text)
+    )
+
+
+def build_embedding_record(vector: np.ndarray, text: str,
+                           model_name: str = EMBEDDING_MODEL_NAME,
+                           model_version: str = EMBEDDING_MODEL_VERSION) -> Dict[str, Any]:
+    """Construit le sous-document MongoDB stocké à côté du candidat"""
+    vector = np.asarray(vector, dtype="<f4").ravel()
+    return {
+        "model": model_name,
+        "version": model_version,
+        "text_hash": text_fingerprint(text),
+        "dim": int(vector.shape[0]),
+        "vector": Binary(vector.tobytes()),
+        "updatedAt": datetime.utcnow(),
+    }
+
+
+def load_vector(record: Dict[str, Any]) -> np.ndarray:
+    """Reconstruit le vecteur float32 à partir du sous-document stocké"""
+    return np.frombuffer(bytes(record["vector"]), dtype="<f4")
+
+
+def get_or_compute_embedding(doc: Dict[str, Any], text: str,
+                             encode: Callable[[str], np.ndarray],
+                             save: Optional[Callable[[Any, Dict[str, Any]], Any]] = None,
+                             field: str = EMBEDDING_FIELD) -> np.ndarray:
+    """
+    Retourne le vecteur stocké sur le document s'il est à jour,
+    sinon ré-encode le texte et persiste le nouveau vecteur via
+    save(_id, champs), ex. repository.update_candidate.
+    """
+    record = doc.get(field)
+    if is_embedding_fresh(record, text):
+        return load_vector(record)
+
+    vector = np.asarray(encode(text), dtype=np.float32).ravel()
+    record = build_embedding_record(vector, text)
+    doc[field] = record
+
+    if save is not None and doc.get("_id") is not None:
+        try:
+            save(doc["_id"], {field: record})
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde embedding {doc.get('_id')}: {e}")
+
+    return vector
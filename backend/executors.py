@@ -0,0 +1,113 @@
+# executors.py
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Exécuteurs dédiés (hors boucle d'événements)
+# ======================================================
+# Accès MongoDB (pymongo, bloquant mais I/O) : pool de threads large
+DB_WORKERS = int(os.getenv("DB_WORKERS", "16"))
+# Inférence (torch, sklearn, pdfplumber) : pool borné au nombre de cœurs.
+# Des threads plutôt que des processus : les modèles du registre sont
+# partagés et torch libère le GIL pendant les calculs.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """Exécute un appel pymongo sur l'exécuteur base de données"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_inference(func: Callable, *args, **kwargs) -> Any:
+    """Exécute un calcul lourd (modèle, parsing PDF) sur l'exécuteur d'inférence"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, functools.partial(func, *args, **kwargs))
+
+
+# ======================================================
+# 🚦 Limites de concurrence par route
+# ======================================================
+def _parse_limits(value: str) -> Dict[str, int]:
+    """Format: "batch_match=2,upload_cv=4" """
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+DEFAULT_ROUTE_LIMITS = {
+    "upload_cv": 4,
+    "cv_match": 8,
+    "match_candidate_job": 8,
+    "batch_match": 2,
+    "recommandation": 2,
+    "document_analysis": 2,
+}
+ROUTE_LIMITS = dict(DEFAULT_ROUTE_LIMITS, **_parse_limits(os.getenv("ROUTE_CONCURRENCY_LIMITS", "")))
+# Attente maximale d'une place avant de répondre 503
+ROUTE_LIMIT_WAIT_SECONDS = float(os.getenv("ROUTE_LIMIT_WAIT_SECONDS", "10"))
+
+
+class RouteLimiter:
+    """
+    Sémaphores par route : une route coûteuse (matching en lot) ne peut
+    pas occuper tous les exécuteurs au détriment de /health ou /jobs.
+    """
+
+    def __init__(self, limits: Dict[str, int], wait_seconds: float = ROUTE_LIMIT_WAIT_SECONDS):
+        self.limits = limits
+        self.wait_seconds = wait_seconds
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+
+    def _semaphore(self, name: str) -> Optional[asyncio.Semaphore]:
+        if name not in self.limits:
+            return None
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(self.limits[name])
+        return self._semaphores[name]
+
+    @asynccontextmanager
+    async def limit(self, name: str):
+        semaphore = self._semaphore(name)
+        if semaphore is None:
+            yield
+            return
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.wait_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Limite de concurrence atteinte pour {name}")
+            raise HTTPException(status_code=503, detail=f"Trop de requêtes {name} en cours, réessayez plus tard",
+                                headers={"Retry-After": "5"})
+        self._active[name] = self._active.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self._active[name] -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"limit": limit, "active": self._active.get(name, 0)} for name, limit in self.limits.items()}
+
+
+route_limiter = RouteLimiter(ROUTE_LIMITS)
+
+
+def shutdown_executors():
+    db_executor.shutdown(wait=False)
+    inference_executor.shutdown(wait=False)
@@ -1,27 +1,110 @@
-from transformers import pipeline
+import os
+import threading
+
+import numpy as np
+
+from model_registry import registry
+from inference_batcher import MicroBatcher
+from scoring import minilm_batcher
+from memoization import memoize
 
 # ======================================================
-# 🧠 Chargement du modèle IA pré-entraîné Facebook BART
+# ⚙️ Classifieur de cohérence : "embedding" (défaut) ou "bart"
 # ======================================================
-try:
-    print("🚀 Chargement du modèle facebook/bart-large-mnli...")
-    bart_model = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    print("✅ Modèle BART chargé avec succès.")
-except Exception as e:
-    print("❌ Erreur lors du chargement du modèle BART :", e)
-    bart_model = None
+# "embedding" compare le CV à des prototypes de labels avec le MiniLM déjà
+# chargé (quelques ms) ; "bart" garde le zero-shot facebook/bart-large-mnli
+FRAUD_CLASSIFIER = os.getenv("FRAUD_CLASSIFIER", "embedding").lower()
+# Température du softmax sur les similarités cosinus (plus bas = plus tranché)
+PROTOTYPE_TEMPERATURE = float(os.getenv("FRAUD_PROTOTYPE_TEMPERATURE", "0.05"))
+
+BART_LABELS = ["coherent", "incoherent", "fake", "authentic"]
+
+# Exemples représentatifs de chaque label, moyennés en un vecteur prototype
+LABEL_PROTOTYPES = {
+    "coherent": [
+        "A well structured resume with a clear career progression and consistent dates.",
+        "Experience, education and skills that logically support each other.",
+        "Parcours professionnel cohérent, expériences et compétences en lien avec le poste.",
+    ],
+    "incoherent": [
+        "A confusing resume with contradictory dates and unrelated, disconnected sections.",
+        "Random list of skills with no relation to the described experience.",
+        "Texte désordonné, dates incohérentes et expériences sans rapport entre elles.",
+    ],
+    "fake": [
+        "An exaggerated resume with implausible achievements and invented job titles.",
+        "Generic buzzwords copied from templates, claiming expertise in every technology.",
+        "CV fabriqué avec des diplômes et des postes invraisemblables.",
+    ],
+    "authentic": [
+        "A genuine resume describing concrete projects, responsibilities and measurable results.",
+        "Specific employers, dates, technologies and accomplishments described in detail.",
+        "CV authentique détaillant des projets réels, des missions précises et des résultats.",
+    ],
+}
+
+_prototypes = None
+_prototypes_lock = threading.Lock()
+
+
+def _label_prototypes() -> np.ndarray:
+    """Matrice (labels x dimension) des prototypes, calculée une fois par processus"""
+    global _prototypes
+    if _prototypes is None:
+        with _prototypes_lock:
+            if _prototypes is None:
+                rows = []
+                for label in BART_LABELS:
+                    futures = [minilm_batcher.submit(text) for text in LABEL_PROTOTYPES[label]]
+                    centroid = np.mean([future.result() for future in futures], axis=0)
+                    rows.append(centroid / np.linalg.norm(centroid))
+                _prototypes = np.stack(rows)
+    return _prototypes
+
+
+def classify_with_prototypes(text: str) -> dict:
+    """Zero-shot par similarité aux prototypes, même format que le pipeline BART"""
+    similarities = _label_prototypes() @ minilm_batcher(text)
+    logits = similarities / PROTOTYPE_TEMPERATURE
+    probabilities = np.exp(logits - logits.max())
+    probabilities /= probabilities.sum()
+    order = np.argsort(-probabilities)
+    return {
+        "sequence": text,
+        "labels": [BART_LABELS[i] for i in order],
+        "scores": [float(probabilities[i]) for i in order],
+    }
+
+
+def _bart_batch(texts):
+    results = registry.get("bart_mnli")(texts, candidate_labels=BART_LABELS, batch_size=len(texts))
+    return [results] if isinstance(results, dict) else results
+
+
+# Chaque texte est évalué contre 4 hypothèses : lots plus petits que la valeur par défaut
+bart_batcher = MicroBatcher("bart_mnli", _bart_batch, max_batch_size=8, length_fn=len)
+
+
+def get_coherence_classifier():
+    """Classifieur configuré, ou None si son modèle n'a pas pu être chargé"""
+    if FRAUD_CLASSIFIER == "bart":
+        return bart_batcher if registry.get_or_none("bart_mnli") else None
+    return classify_with_prototypes if registry.get_or_none("minilm") else None
 
 
+@memoize("detect_anomalies", version=f"{FRAUD_CLASSIFIER}:1",
+         cache_if=lambda result: "error" not in result["bart_analysis"])
 def detect_anomalies(cv_text: str, predicted_category: str, spelling_score: float):
     """
     Analyse avancée du texte d’un CV :
     - Vérifie la qualité linguistique
     - Détecte absence de certificats si domaine technique
-    - Évalue la cohérence sémantique (BART)
+    - Évalue la cohérence sémantique (prototypes MiniLM ou BART)
     - Identifie contenu générique / incohérent
     """
 
     anomalies = []
+    classifier = get_coherence_classifier()
 
     # 1️⃣ Score orthographique faible
     if spelling_score < 70:
@@ -35,10 +118,9 @@ def detect_anomalies(cv_text: str, predicted_category: str, spelling_score: floa
     if "certificate" not in cv_text.lower() and predicted_category in ["Data Science", "AI", "Software Engineer"]:
         anomalies.append("Aucune certification détectée pour un domaine technique")
 
-    # 4️⃣ Vérifie la cohérence sémantique (BART)
-    if bart_model:
-        labels = ["coherent", "incoherent", "fake", "authentic"]
-        bart_result = bart_model(cv_text[:1500], candidate_labels=labels)
+    # 4️⃣ Vérifie la cohérence sémantique
+    if classifier:
+        bart_result = classifier(cv_text[:1500])
 
         predicted_label = bart_result["labels"][0]
         confidence = round(bart_result["scores"][0] * 100, 2)
@@ -52,9 +134,10 @@ def detect_anomalies(cv_text: str, predicted_category: str, spelling_score: floa
             "label": predicted_label,
             "confidence": confidence,
             "raw_result": bart_result,
+            "classifier": FRAUD_CLASSIFIER,
         }
     else:
-        bart_output = {"error": "Modèle BART non initialisé."}
+        bart_output = {"error": f"Classifieur de cohérence ({FRAUD_CLASSIFIER}) non initialisé."}
 
     # 5️⃣ Détecte contenu trop générique
     if all(word not in cv_text.lower() for word in ["project", "experience", "responsible", "developed"]):
@@ -64,7 +147,7 @@ def detect_anomalies(cv_text: str, predicted_category: str, spelling_score: floa
     fraud_score = 0
     fraud_score += (100 - spelling_score) * 0.4
     fraud_score += min(40, len(anomalies) * 10)
-    if bart_model and "fake" in bart_output.get("label", "").lower():
+    if classifier and "fake" in bart_output.get("label", "").lower():
         fraud_score += 20
     fraud_score = round(min(100, fraud_score), 2)
 
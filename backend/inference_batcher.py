@@ -0,0 +1,190 @@
+# inference_batcher.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration du micro-batching
+# ======================================================
+# "0" : chaque appel passe directement au modèle (comportement historique)
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "1") != "0"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+# Attente maximale du plus ancien appel avant de lancer un lot incomplet
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+# Largeur (en caractères) des tranches de longueur : un lot ne mélange pas
+# un texte court et un texte long, pour limiter le padding
+BATCH_BUCKET_WIDTH = int(os.getenv("BATCH_BUCKET_WIDTH", "256"))
+
+_batchers: Dict[str, "MicroBatcher"] = {}
+
+
+class _Request:
+    __slots__ = ("item", "future", "bucket", "arrival")
+
+    def __init__(self, item: Any, bucket: int):
+        self.item = item
+        self.future: Future = Future()
+        self.bucket = bucket
+        self.arrival = time.monotonic()
+
+
+class MicroBatcher:
+    """
+    Regroupe les appels concurrents à un même modèle en un seul passage.
+    `batch_fn` reçoit une liste d'entrées et retourne la liste des sorties
+    dans le même ordre ; chaque appelant récupère la sienne via un Future.
+    Un Future annulé avant son passage (délai dépassé côté appelant) est
+    retiré du lot sans être calculé.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        length_fn: Optional[Callable[[Any], int]] = None,
+        bucket_width: int = BATCH_BUCKET_WIDTH,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.length_fn = length_fn
+        self.bucket_width = max(1, bucket_width)
+        self.enabled = INFERENCE_BATCHING and self.max_batch_size > 1
+        self._pending: List[_Request] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"batches": 0, "items": 0, "max_batch": 0, "fallbacks": 0, "cancelled": 0}
+        _batchers[name] = self
+
+    def _bucket(self, item: Any) -> int:
+        if self.length_fn is None:
+            return 0
+        return self.length_fn(item) // self.bucket_width
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        if not self.enabled or self._closed:
+            future: Future = Future()
+            try:
+                future.set_result(self.batch_fn([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        request = _Request(item, self._bucket(item))
+        with self._condition:
+            self._pending.append(request)
+            self._ensure_worker()
+            self._condition.notify()
+        return request.future
+
+    def __call__(self, item: Any) -> Any:
+        """Appel bloquant, même signature qu'un appel direct au modèle"""
+        return self.submit(item).result()
+
+    # ======================================================
+    # 🔁 Boucle de regroupement
+    # ======================================================
+    def _same_bucket(self, bucket: int) -> List[_Request]:
+        return [r for r in self._pending if r.bucket == bucket]
+
+    def _drop_cancelled(self):
+        pending = [r for r in self._pending if not r.future.cancelled()]
+        self._stats["cancelled"] += len(self._pending) - len(pending)
+        self._pending = pending
+
+    def _next_batch(self) -> Optional[List[_Request]]:
+        with self._condition:
+            self._drop_cancelled()
+            while not self._pending and not self._closed:
+                self._condition.wait()
+                self._drop_cancelled()
+            if not self._pending:
+                return None
+
+            # Le plus ancien appel fixe la tranche de longueur et l'échéance
+            oldest = self._pending[0]
+            deadline = oldest.arrival + self.max_wait
+            while not self._closed and len(self._same_bucket(oldest.bucket)) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = self._same_bucket(oldest.bucket)[:self.max_batch_size]
+            selected = set(map(id, batch))
+            self._pending = [r for r in self._pending if id(r) not in selected]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._execute(batch)
+
+    def _execute(self, batch: List[_Request]):
+        # Passage en "running" : les requêtes annulées entre-temps sont ignorées,
+        # les autres ne peuvent plus l'être (set_result reste valide)
+        claimed = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        self._stats["cancelled"] += len(batch) - len(claimed)
+        if claimed:
+            self._run_batch(claimed)
+
+    def _run_batch(self, batch: List[_Request]):
+        try:
+            outputs = self.batch_fn([r.item for r in batch])
+            if len(outputs) != len(batch):
+                raise ValueError(f"{self.name}: {len(outputs)} sorties pour {len(batch)} entrées")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Une entrée invalide ne doit pas faire échouer tout le lot
+            logger.warning(f"Lot {self.name} en échec ({e}), traitement unitaire")
+            self._stats["fallbacks"] += 1
+            for request in batch:
+                self._run_batch([request])
+            return
+
+        for request, output in zip(batch, outputs):
+            request.future.set_result(output)
+        self._stats["batches"] += 1
+        self._stats["items"] += len(batch)
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return dict(
+            self._stats,
+            enabled=self.enabled,
+            pending=len(self._pending),
+            mean_batch=round(self._stats["items"] / batches, 2) if batches else 0,
+        )
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
+
+
+def shutdown():
+    for batcher in _batchers.values():
+        batcher.close()
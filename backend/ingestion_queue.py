@@ -0,0 +1,450 @@
+# ingestion_queue.py
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from repository import MONGO_DB, get_db
+
+logger = logging.getLogger(__name__)
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_MAX_PENDING = int(os.getenv("INGESTION_MAX_PENDING", "32"))
+INGESTION_MAX_RETRIES = int(os.getenv("INGESTION_MAX_RETRIES", "2"))
+# Bail d'une tâche : renouvelé par le processus propriétaire tant qu'il vit,
+# une tâche dont le bail a expiré peut être reprise par un autre processus
+INGESTION_LEASE_SECONDS = int(os.getenv("INGESTION_LEASE_SECONDS", "120"))
+
+# Tâches non terminées reprises au démarrage (arrêt ou crash du processus API)
+UNFINISHED_STATUSES = ["queued", "running", "retrying"]
+
+
+class QueueFullError(Exception):
+    """File d'ingestion saturée (le client doit réessayer plus tard)"""
+
+
+# ======================================================
+# 🧱 Étapes exécutées dans les processus workers
+# ======================================================
+# Chaque étape reçoit le contexte (candidat courant + options) et retourne
+# les champs à enregistrer sur le document candidat.
+
+def _stage_extract_text(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from cv_parser import extract_text_from_pdf
+    return {"resumeText": extract_text_from_pdf(ctx["file_path"])}
+
+
+def _stage_parse(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from cv_parser import parse_cv_text
+    parsed = parse_cv_text(ctx["candidate"].get("resumeText", ""))
+    parsed.pop("resumeText", None)
+    return parsed
+
+
+def _stage_classify(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from scoring import predict_turnover_or_engagement, screen_cv_class
+    text = ctx["candidate"].get("resumeText", "")
+    return {
+        "engagement_prediction": predict_turnover_or_engagement(text),
+        "screening_classification": screen_cv_class(text),
+    }
+
+
+def _stage_ai_analysis(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from ai_engine import ai_engine
+    candidate, options = ctx["candidate"], ctx["options"]
+    cv_text = candidate.get("resumeText", "")
+    job = ctx["db"].jobs.find_one({"_id": ObjectId(ctx["job_id"])}) if ctx.get("job_id") else None
+    updates: Dict[str, Any] = {}
+    ai_analysis: Dict[str, Any] = {}
+
+    if options.get("analyze_skills", True) and cv_text:
+        ai_analysis["extracted_skills"] = ai_engine.extract_skills_from_text(cv_text)
+        experience_years = ai_engine.extract_experience(cv_text)
+        if experience_years > candidate.get("experienceYears", 0):
+            updates["experienceYears"] = experience_years
+            candidate["experienceYears"] = experience_years
+            ai_analysis["extracted_experience"] = experience_years
+        ai_analysis["extracted_education"] = ai_engine.extract_education(cv_text)
+
+    if job:
+        ai_analysis["initial_matching"] = ai_engine.match_candidates_job(candidate, job)
+        if options.get("generate_questions"):
+            ai_analysis["interview_questions"] = ai_engine.generate_interview_questions(candidate, job)
+
+    updates["ai_analysis"] = ai_analysis
+    return updates
+
+
+def _stage_text_quality(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from spell_checker import analyze_text_quality
+    cv_text = ctx["candidate"].get("resumeText", "")
+    if not cv_text or len(cv_text) <= 10:
+        return {}
+    return {"text_quality_analysis": analyze_text_quality(cv_text, "en-US", ctx["options"].get("spell_engine"))}
+
+
+def _stage_score(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from scoring import embed_candidate, score_candidate_for_job
+    if ctx.get("job_id"):
+        score_candidate_for_job(ctx["candidate_id"], ctx["job_id"])
+    else:
+        embed_candidate(ctx["candidate_id"])
+    return {}
+
+
+STAGES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "extract_text": _stage_extract_text,
+    "parse": _stage_parse,
+    "classify": _stage_classify,
+    "ai_analysis": _stage_ai_analysis,
+    "text_quality": _stage_text_quality,
+    "score": _stage_score,
+}
+
+PIPELINES: Dict[str, List[str]] = {
+    "basic": ["extract_text", "parse", "classify", "text_quality", "score"],
+    "advanced": ["extract_text", "parse", "classify", "ai_analysis", "text_quality", "score"],
+}
+
+def run_ingestion_task(task_id: str, db_name: str = MONGO_DB):
+    """
+    Exécute les étapes d'une tâche dans un worker. Les étapes déjà
+    terminées (tentative précédente) sont ignorées ; le document candidat
+    est complété après chaque étape.
+    """
+    # Client MongoDB propre au processus worker (repository)
+    db = get_db(db_name)
+    task = db.ingestion_tasks.find_one({"_id": task_id})
+    if not task:
+        raise ValueError(f"Tâche d'ingestion introuvable: {task_id}")
+
+    candidate_oid = ObjectId(task["candidate_id"])
+    db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {"status": "running", "updated_at": datetime.utcnow()}})
+    db.candidates.update_one({"_id": candidate_oid}, {"$set": {"ingestion.status": "running"}})
+
+    ctx = {
+        "db": db,
+        "task_id": task_id,
+        "candidate_id": task["candidate_id"],
+        "job_id": task.get("job_id"),
+        "file_path": task["file_path"],
+        "options": task.get("options", {}),
+        "candidate": db.candidates.find_one({"_id": candidate_oid}) or {},
+    }
+
+    for stage in PIPELINES[task.get("pipeline", "basic")]:
+        if task.get("stages", {}).get(stage, {}).get("status") == "done":
+            continue
+
+        started_at = datetime.utcnow()
+        db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {
+            f"stages.{stage}": {"status": "running", "started_at": started_at},
+            "current_stage": stage,
+        }})
+        try:
+            updates = STAGES[stage](ctx)
+        except Exception as e:
+            db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {
+                f"stages.{stage}": {"status": "failed", "started_at": started_at, "error": str(e)},
+                "updated_at": datetime.utcnow(),
+            }})
+            raise
+
+        if updates:
+            updates["lastUpdated"] = datetime.utcnow()
+            db.candidates.update_one({"_id": candidate_oid}, {"$set": updates})
+            ctx["candidate"].update(updates)
+        db.candidates.update_one({"_id": candidate_oid}, {"$set": {"ingestion.completed_stages." + stage: True}})
+        db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {
+            f"stages.{stage}": {"status": "done", "started_at": started_at, "finished_at": datetime.utcnow()},
+            "updated_at": datetime.utcnow(),
+        }})
+
+    db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {
+        "status": "done", "current_stage": None, "updated_at": datetime.utcnow()
+    }})
+    db.candidates.update_one({"_id": candidate_oid}, {"$set": {"ingestion.status": "done"}})
+
+
+# ======================================================
+# 📬 File d'attente (processus API)
+# ======================================================
+class IngestionQueue:
+    """
+    File d'ingestion des CV : l'upload est persisté et acquitté
+    immédiatement, les étapes lourdes tournent sur un pool borné de
+    processus, avec contre-pression et nouvelles tentatives. Le nombre
+    de tentatives est persisté sur la tâche : recover() reprend les
+    tâches interrompues. Chaque tâche porte un propriétaire et un bail
+    (lease_until) renouvelé par un battement de cœur : plusieurs
+    processus API peuvent partager la collection sans traiter deux fois
+    la même tâche.
+    """
+
+    def __init__(self, db, db_name: str = MONGO_DB,
+                 max_workers: int = INGESTION_WORKERS,
+                 max_pending: int = INGESTION_MAX_PENDING,
+                 max_retries: int = INGESTION_MAX_RETRIES,
+                 lease_seconds: int = INGESTION_LEASE_SECONDS,
+                 on_complete: Optional[Callable[[str], None]] = None):
+        self.db = db
+        self.on_complete = on_complete
+        self.db_name = db_name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Appelé depuis les threads des Timer et des callbacks de futures
+        self._executor_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._closed = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._closed:
+                raise RuntimeError("File d'ingestion arrêtée")
+            if self._executor is None:
+                # "spawn" : pas de fork d'un processus ayant déjà initialisé torch
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard_executor(self, broken: ProcessPoolExecutor):
+        """Arrête un pool cassé ; un autre thread l'a peut-être déjà remplacé"""
+        with self._executor_lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pending(self) -> int:
+        return self._in_flight
+
+    def _lease_until(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def start(self):
+        """Reprend les tâches orphelines et démarre le renouvellement des baux"""
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop,
+                                               name="ingestion-heartbeat", daemon=True)
+        self.recover()
+        self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        # Renouvelle nettement avant l'expiration du bail
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                self.renew_leases()
+                # Tâches d'un processus disparu pendant que celui-ci tourne
+                self.recover()
+            except Exception as e:
+                logger.error(f"Erreur renouvellement des baux d'ingestion: {e}")
+
+    def renew_leases(self) -> int:
+        """Prolonge le bail de toutes les tâches non terminées de ce processus"""
+        result = self.db.ingestion_tasks.update_many(
+            {"owner": self.owner, "status": {"$in": UNFINISHED_STATUSES}},
+            {"$set": {"lease_until": self._lease_until()}},
+        )
+        return result.modified_count
+
+    def submit(self, file_path: str, job_id: Optional[str] = None,
+               pipeline: str = "basic", options: Optional[Dict[str, Any]] = None,
+               candidate_fields: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Enregistre la tâche et le candidat provisoire, puis planifie le traitement"""
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                raise QueueFullError("File d'ingestion saturée, réessayez plus tard")
+            self._in_flight += 1
+
+        try:
+            task_id = uuid.uuid4().hex
+            now = datetime.utcnow()
+            candidate = dict(candidate_fields or {})
+            candidate.update({
+                "cv_path": file_path,
+                "lastUpdated": now,
+                "ingestion": {"task_id": task_id, "status": "queued", "completed_stages": {}},
+            })
+            candidate_id = str(self.db.candidates.insert_one(candidate).inserted_id)
+
+            self.db.ingestion_tasks.insert_one({
+                "_id": task_id,
+                "candidate_id": candidate_id,
+                "job_id": job_id,
+                "file_path": file_path,
+                "pipeline": pipeline,
+                "options": options or {},
+                "status": "queued",
+                "attempts": 0,
+                "owner": self.owner,
+                "lease_until": self._lease_until(),
+                "stages": {},
+                "created_at": now,
+                "updated_at": now,
+            })
+            self._schedule(task_id)
+        except Exception:
+            self._release()
+            raise
+
+        return {"task_id": task_id, "candidate_id": candidate_id}
+
+    def _schedule(self, task_id: str):
+        self.db.ingestion_tasks.update_one({"_id": task_id}, {"$inc": {"attempts": 1}})
+        executor = self._get_executor()
+        try:
+            future = executor.submit(run_ingestion_task, task_id, self.db_name)
+        except BrokenProcessPool:
+            # Un worker a planté : on arrête l'ancien pool et on le recrée
+            logger.warning("Pool d'ingestion cassé, recréation")
+            self._discard_executor(executor)
+            future = self._get_executor().submit(run_ingestion_task, task_id, self.db_name)
+        future.add_done_callback(lambda f: self._on_done(task_id, f))
+
+    def _on_done(self, task_id: str, future):
+        if future.cancelled():
+            # Arrêt de la file : la tâche reste non terminée, reprise par recover()
+            self._release()
+            return
+        error = future.exception()
+        if error is None:
+            self._release()
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(task_id)
+                except Exception as e:
+                    logger.error(f"Erreur post-traitement de la tâche {task_id}: {e}")
+            return
+
+        task = self.db.ingestion_tasks.find_one({"_id": task_id}, {"attempts": 1}) or {}
+        attempts = task.get("attempts", 1)
+        if attempts <= self.max_retries and not self._closed:
+            delay = 2 ** attempts
+            logger.warning(f"Tâche {task_id} en échec ({error}), nouvelle tentative dans {delay}s")
+            self.db.ingestion_tasks.update_one({"_id": task_id}, {"$set": {
+                "status": "retrying", "last_error": str(error), "updated_at": datetime.utcnow()
+            }})
+            timer = threading.Timer(delay, self._retry, args=(task_id,))
+            timer.daemon = True
+            timer.start()
+            return
+
+        if self._closed:
+            self._release()
+            return
+        logger.error(f"Tâche {task_id} abandonnée après {attempts} tentatives: {error}")
+        self._fail(task_id, str(error))
+        self._release()
+
+    def _fail(self, task_id: str, error: str):
+        task = self.db.ingestion_tasks.find_one_and_update({"_id": task_id}, {"$set": {
+            "status": "failed", "last_error": error, "updated_at": datetime.utcnow()
+        }})
+        if task:
+            self.db.candidates.update_one({"_id": ObjectId(task["candidate_id"])},
+                                          {"$set": {"ingestion.status": "failed"}})
+
+    def _retry(self, task_id: str):
+        if self._closed:
+            self._release()
+            return
+        try:
+            self._schedule(task_id)
+        except Exception as e:
+            logger.error(f"Impossible de replanifier la tâche {task_id}: {e}")
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """État d'une tâche et de chacune de ses étapes"""
+        task = self.db.ingestion_tasks.find_one({"_id": task_id})
+        if not task:
+            return None
+        task["task_id"] = task.pop("_id")
+        task["pipeline_stages"] = PIPELINES.get(task.get("pipeline", "basic"), [])
+        return task
+
+    def _claim_expired(self) -> Optional[Dict[str, Any]]:
+        """
+        Prend atomiquement une tâche non terminée dont le bail a expiré
+        (ou sans bail) : deux processus ne peuvent pas réclamer la même.
+        """
+        now = datetime.utcnow()
+        return self.db.ingestion_tasks.find_one_and_update(
+            {
+                "status": {"$in": UNFINISHED_STATUSES},
+                "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}],
+            },
+            {"$set": {
+                "status": "queued", "owner": self.owner,
+                "lease_until": self._lease_until(), "updated_at": now,
+            }},
+            projection={"attempts": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def recover(self) -> int:
+        """
+        Replanifie les tâches restées en file, en cours ou en attente de
+        nouvelle tentative dont le propriétaire a disparu (bail expiré) ;
+        celles ayant épuisé leurs tentatives (attempts persisté) passent
+        en échec.
+        """
+        recovered = 0
+        while not self._closed:
+            task = self._claim_expired()
+            if task is None:
+                break
+            task_id = task["_id"]
+            if task.get("attempts", 0) > self.max_retries:
+                logger.error(f"Tâche {task_id} interrompue après {task['attempts']} tentatives, abandon")
+                self._fail(task_id, "Interrompue par un arrêt du serveur")
+                continue
+            with self._lock:
+                self._in_flight += 1
+            try:
+                self._schedule(task_id)
+            except Exception as e:
+                logger.error(f"Impossible de reprendre la tâche {task_id}: {e}")
+                self._release()
+                continue
+            recovered += 1
+        if recovered:
+            logger.info(f"{recovered} tâches d'ingestion reprises")
+        return recovered
+
+    def shutdown(self):
+        # Les baux ne sont plus renouvelés : un autre processus reprendra
+        # les tâches interrompues à leur expiration
+        self._stop.set()
+        with self._executor_lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
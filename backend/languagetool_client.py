@@ -0,0 +1,201 @@
+# languagetool_client.py
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration
+# ======================================================
+LANGUAGETOOL_PORT = int(os.getenv("LANGUAGETOOL_PORT", "8081"))
+LANGUAGETOOL_URL = os.getenv("LANGUAGETOOL_URL", f"http://127.0.0.1:{LANGUAGETOOL_PORT}")
+LANGUAGETOOL_PATH = os.getenv("LANGUAGETOOL_PATH", r"D:\project IA\LanguageTool-6.6\LanguageTool-6.6")
+# "0" : serveur géré ailleurs (docker, service), on ne lance pas de JVM
+LANGUAGETOOL_AUTOSTART = os.getenv("LANGUAGETOOL_AUTOSTART", "1") == "1"
+LANGUAGETOOL_STARTUP_TIMEOUT = float(os.getenv("LANGUAGETOOL_STARTUP_TIMEOUT", "60"))
+# Un serveur jugé sain n'est pas re-sondé avant cet intervalle
+LANGUAGETOOL_HEALTH_INTERVAL = float(os.getenv("LANGUAGETOOL_HEALTH_INTERVAL", "30"))
+LANGUAGETOOL_TIMEOUT = float(os.getenv("LANGUAGETOOL_TIMEOUT", "30"))
+# Taille des morceaux de texte vérifiés en parallèle
+LANGUAGETOOL_CHUNK_CHARS = int(os.getenv("LANGUAGETOOL_CHUNK_CHARS", "1500"))
+LANGUAGETOOL_PARALLELISM = int(os.getenv("LANGUAGETOOL_PARALLELISM", "4"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+class LanguageToolError(Exception):
+    """Serveur LanguageTool indisponible ou réponse en erreur"""
+
+
+def split_text(text: str, max_chars: int = LANGUAGETOOL_CHUNK_CHARS) -> List[Tuple[int, str]]:
+    """
+    Découpe le texte en morceaux d'au plus max_chars caractères, sur des fins
+    de phrase. Retourne des couples (position dans le texte, morceau).
+    """
+    chunks: List[Tuple[int, str]] = []
+    start = 0
+    boundaries = [m.end() for m in _SENTENCE_END.finditer(text)] + [len(text)]
+    last_boundary = 0
+    for boundary in boundaries:
+        if boundary - start > max_chars and last_boundary > start:
+            chunks.append((start, text[start:last_boundary]))
+            start = last_boundary
+        # Phrase plus longue qu'un morceau : coupe franche
+        while boundary - start > max_chars:
+            chunks.append((start, text[start:start + max_chars]))
+            start += max_chars
+        last_boundary = boundary
+    if start < len(text):
+        chunks.append((start, text[start:]))
+    return chunks
+
+
+class LanguageToolClient:
+    """
+    Client LanguageTool de longue durée : serveur Java supervisé (démarré une
+    fois, relancé s'il tombe), session HTTP keep-alive partagée et
+    vérification des longs textes par morceaux en parallèle.
+    """
+
+    def __init__(self, base_url: str = LANGUAGETOOL_URL, parallelism: int = LANGUAGETOOL_PARALLELISM):
+        self.base_url = base_url.rstrip("/")
+        self.parallelism = max(1, parallelism)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.parallelism)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._state = "unknown"
+        self._last_healthy = 0.0
+        self._restarts = 0
+
+    # ======================================================
+    # 🩺 Supervision du serveur
+    # ======================================================
+    def _probe(self) -> bool:
+        try:
+            return self.session.get(f"{self.base_url}/v2/languages", timeout=2).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _start_server(self):
+        if self._process is not None and self._process.poll() is None:
+            return
+        if self._process is not None:
+            self._restarts += 1
+            logger.warning(f"Serveur LanguageTool arrêté (code {self._process.returncode}), redémarrage")
+        self._process = subprocess.Popen(
+            [
+                "java", "-cp", os.path.join(LANGUAGETOOL_PATH, "languagetool.jar"),
+                "org.languagetool.server.HTTPServer",
+                "--port", str(LANGUAGETOOL_PORT), "--allow-origin", "*"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        logger.info(f"🚀 Serveur Java LanguageTool démarré sur {self.base_url}")
+
+    def _wait_until_ready(self) -> bool:
+        deadline = time.monotonic() + LANGUAGETOOL_STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._probe():
+                return True
+            if self._process is not None and self._process.poll() is not None:
+                return False
+            time.sleep(0.25)
+        return False
+
+    def ensure_server(self) -> bool:
+        """Vérifie (au plus une fois par intervalle) que le serveur répond, le démarre sinon"""
+        if self._state == "healthy" and time.monotonic() - self._last_healthy < LANGUAGETOOL_HEALTH_INTERVAL:
+            return True
+        with self._lock:
+            if self._state == "healthy" and time.monotonic() - self._last_healthy < LANGUAGETOOL_HEALTH_INTERVAL:
+                return True
+            healthy = self._probe()
+            if not healthy and LANGUAGETOOL_AUTOSTART:
+                self._state = "starting"
+                try:
+                    self._start_server()
+                    healthy = self._wait_until_ready()
+                except Exception as e:
+                    logger.error(f"❌ Erreur lors du démarrage de LanguageTool local : {e}")
+            self._state = "healthy" if healthy else "unhealthy"
+            if healthy:
+                self._last_healthy = time.monotonic()
+            return healthy
+
+    def _mark_unhealthy(self):
+        self._state = "unhealthy"
+
+    # ======================================================
+    # 🔍 Vérification
+    # ======================================================
+    def _check_chunk(self, chunk: str, lang: str) -> List[Dict[str, Any]]:
+        try:
+            response = self.session.post(f"{self.base_url}/v2/check", data={"language": lang, "text": chunk},
+                                         timeout=LANGUAGETOOL_TIMEOUT)
+        except requests.exceptions.ConnectionError as e:
+            self._mark_unhealthy()
+            raise LanguageToolError(f"Serveur LanguageTool injoignable: {e}")
+        if response.status_code != 200:
+            raise LanguageToolError(f"Erreur serveur {response.status_code}")
+        self._last_healthy = time.monotonic()
+        return response.json().get("matches", [])
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.parallelism,
+                                                        thread_name_prefix="languagetool")
+        return self._executor
+
+    def check(self, text: str, lang: str = "en-US") -> List[Dict[str, Any]]:
+        """
+        Erreurs détectées dans tout le texte, triées par position ; les
+        offsets des morceaux sont ramenés au texte d'origine.
+        """
+        if not self.ensure_server():
+            raise LanguageToolError("Serveur LanguageTool indisponible")
+        chunks = split_text(text)
+        if len(chunks) <= 1:
+            return self._check_chunk(text, lang)
+
+        futures = [self._get_executor().submit(self._check_chunk, chunk, lang) for _, chunk in chunks]
+        matches = []
+        for (offset, _), future in zip(chunks, futures):
+            for match in future.result():
+                matches.append(dict(match, offset=match.get("offset", 0) + offset))
+        matches.sort(key=lambda m: m["offset"])
+        return matches
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.base_url,
+            "state": self._state,
+            "managed_pid": self._process.pid if self._process is not None and self._process.poll() is None else None,
+            "restarts": self._restarts,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+languagetool = LanguageToolClient()
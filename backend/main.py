@@ -5,14 +5,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from pymongo import MongoClient
 import os
-import shutil
 from datetime import datetime
 import requests
 import json
 import logging
-from PyPDF2 import PdfReader  # Ajout de l'import manquant
+import inference_batcher
+import memoization
+from languagetool_client import languagetool
+import pdf_extraction
+from pdf_extraction import extract_text as extract_pdf_text
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -33,9 +35,10 @@ DOCUMENTS_DIR = "documents"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(DOCUMENTS_DIR, exist_ok=True)
 
-# Configuration MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["recruit_ai"]
+# Configuration MongoDB : client unique avec pool (repository)
+import repository
+from repository import EMBEDDING_PROJECTION, MATCHING_PROJECTION
+db = repository.get_db()
 
 # ---------------- Importations sécurisées ----------------
 def safe_import(module_name, function_name=None, default=None):
@@ -63,11 +66,25 @@ except ImportError:
         }
     )
 
+try:
+    from similarity_checker import similarity_verdict
+except ImportError:
+    similarity_verdict = lambda score: ("Module non disponible", "error")
+
+try:
+    from similarity_index import get_candidate_index, cluster_pairs
+    from embedding_store import embedding_fingerprint
+    from scoring import get_resume_embedding
+    SIMILARITY_INDEX_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"Index de similarité non disponible: {e}")
+    SIMILARITY_INDEX_AVAILABLE = False
+
 try:
     from spell_checker import analyze_text_quality
 except ImportError:
     analyze_text_quality = safe_import('spell_checker', 'analyze_text_quality', 
-        lambda t, l="en-US": {
+        lambda t, l="en-US", e=None: {
             "error": "Module spell_checker non disponible", 
             "quality_score": 0,
             "nb_errors": 0,
@@ -77,7 +94,7 @@ except ImportError:
     )
 
 try:
-    from document_authenticator import analyze_document_authenticity
+    from document_authenticator import analyze_document_authenticity, analyze_documents_authenticity
 except ImportError:
     analyze_document_authenticity = safe_import('document_authenticator', 'analyze_document_authenticity', 
         lambda t, p: {
@@ -87,6 +104,7 @@ except ImportError:
             "image_verification": {"error": "Module non disponible"}
         }
     )
+    analyze_documents_authenticity = lambda t, paths: [analyze_document_authenticity(t, p) for p in paths]
 
 # Import des fonctions manquantes avec gestion d'erreur
 try:
@@ -97,10 +115,7 @@ except ImportError:
         """Fonction de secours pour l'analyse de CV"""
         try:
             # Extraction basique du texte PDF
-            reader = PdfReader(cv_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
+            text = extract_pdf_text(cv_path)
             
             return {
                 "raw_text": text,
@@ -130,18 +145,14 @@ except ImportError:
             }
 
 try:
-    from app.ai.fraud_detector import detect_anomalies
+    from fraud_detector import detect_anomalies
 except ImportError:
-    logger.warning("Module fraud_detector non disponible, création d'une fonction de secours")
-    def detect_anomalies(cv_text, predicted_category, spelling_score):
-        """Fonction de secours pour la détection d'anomalies"""
-        return {
-            "fraud_probability": 15.0,
-            "risk_level": "LOW",
-            "anomalies_detected": [],
-            "recommendations": ["CV semble authentique"],
-            "verdict": "VALID"
+    # Pas de verdict inventé : l'étape fraud_detection sera marquée "skipped"
+    detect_anomalies = safe_import('fraud_detector', 'detect_anomalies',
+        lambda cv_text, predicted_category, spelling_score: {
+            "error": "Module fraud_detector non disponible"
         }
+    )
 
 # Import des modèles
 try:
@@ -238,6 +249,10 @@ score_candidate_for_job = safe_import('scoring', 'score_candidate_for_job',
     lambda c, j: logger.info("Scoring non disponible")
 )
 
+embed_candidate = safe_import('scoring', 'embed_candidate', 
+    lambda c: logger.info("Embedding non disponible")
+)
+
 cv_matcher = safe_import('cv_matching', 'cv_matcher', None)
 
 # Import du moteur IA
@@ -276,9 +291,43 @@ except ImportError:
         
         def calculate_similarity(self, text1, text2):
             return 0.5
+        
+        def batch_match_candidates_job(self, candidates, job, threshold=0.0, top_k=None, score_sink=None):
+            results = [dict(self.match_candidates_job(c, job), index=i) for i, c in enumerate(candidates)]
+            if score_sink is not None:
+                score_sink(results)
+            results = [r for r in results if r["overall_score"] >= threshold]
+            # Même ordre que le moteur réel : score décroissant, tri stable
+            results.sort(key=lambda r: r["overall_score"], reverse=True)
+            return results[:top_k] if top_k is not None else results
     
     ai_engine = DummyAIEngine()
 
+# Registre des modèles (chargement paresseux, une instance par modèle)
+try:
+    from model_registry import registry as model_registry, PRELOAD_MODELS
+except ImportError:
+    model_registry, PRELOAD_MODELS = None, []
+
+# Modèle TF-IDF partagé (appris sur le corpus candidats + offres)
+try:
+    from tfidf_model import get_tfidf_model
+except ImportError:
+    get_tfidf_model = None
+
+# Stockage des uploads par empreinte SHA-256 (déduplication des analyses)
+from upload_storage import CV_ANALYZER_VERSION, DOCUMENT_TYPES, PDF_TYPES, UploadRejected, store_upload
+
+# Exécuteurs dédiés : pymongo et inférence hors de la boucle d'événements
+from executors import run_db, run_inference, route_limiter, shutdown_executors
+from pipeline_graph import Stage, StageGraph
+
+# File d'ingestion asynchrone des CV (pool de processus)
+try:
+    from ingestion_queue import IngestionQueue, QueueFullError
+except ImportError:
+    IngestionQueue, QueueFullError = None, None
+
 # ---------------- Helper Functions ----------------
 def convert_objectid(obj):
     """Convertit les ObjectId en string pour la sérialisation JSON"""
@@ -291,6 +340,9 @@ def convert_objectid(obj):
     else:
         return obj
 
+# Taille maximale d'une page des listes paginées
+MAX_PAGE_SIZE = 200
+
 def is_valid_objectid(id_str):
     """Vérifie si une string est un ObjectId valide"""
     try:
@@ -318,15 +370,115 @@ class CVComparisonRequest(BaseModel):
 class TextQualityRequest(BaseModel):
     text: str
     language: str = "en-US"
+    engine: Optional[str] = None  # "languagetool" ou "symspell" (défaut : SPELL_ENGINE)
 
 class BatchCVComparisonRequest(BaseModel):
     job_id: str
     threshold: float = 0.75
+    k: int = 10
 
 class CVMatchingRequest(BaseModel):
     candidate_id: str
     job_id: str
 
+# ---------------- Démarrage ----------------
+@app.on_event("startup")
+def prepare_match_scores():
+    """Index de la collection match_scores et migration des anciens score_cache"""
+    try:
+        repository.ensure_indexes()
+        repository.migrate_score_cache()
+    except Exception as e:
+        logger.error(f"Erreur préparation de match_scores: {e}")
+
+@app.on_event("startup")
+def preload_models():
+    """Précharge en arrière-plan les modèles listés dans PRELOAD_MODELS"""
+    if model_registry is not None and PRELOAD_MODELS:
+        model_registry.preload(PRELOAD_MODELS, background=True)
+
+@app.on_event("startup")
+def refresh_tfidf_model():
+    """Apprend (ou ré-apprend si trop ancien) le modèle TF-IDF au démarrage"""
+    if get_tfidf_model is None:
+        return
+    try:
+        get_tfidf_model().refresh(repository.iter_corpus_texts)
+    except Exception as e:
+        logger.error(f"Erreur apprentissage TF-IDF: {e}")
+
+def observe_tfidf_document(text):
+    """
+    Signale un nouveau document au modèle TF-IDF (mise à jour incrémentale
+    de l'IDF, ou premier apprentissage) : bloquant, via run_inference depuis
+    les routes async
+    """
+    if get_tfidf_model is not None and text:
+        get_tfidf_model().observe(text)
+
+def on_ingestion_complete(task_id):
+    """Fin d'une tâche d'ingestion : le texte du CV alimente le modèle TF-IDF"""
+    task = repository.get_ingestion_task(task_id, {"candidate_id": 1})
+    if task:
+        candidate = repository.get_candidate(task["candidate_id"], {"resumeText": 1})
+        observe_tfidf_document((candidate or {}).get("resumeText", ""))
+
+ingestion_queue = IngestionQueue(db, on_complete=on_ingestion_complete) if IngestionQueue is not None else None
+
+@app.on_event("startup")
+def recover_ingestion_tasks():
+    """Reprend les tâches d'ingestion orphelines et démarre le renouvellement des baux"""
+    if ingestion_queue is None:
+        return
+    try:
+        ingestion_queue.start()
+    except Exception as e:
+        logger.error(f"Erreur reprise des tâches d'ingestion: {e}")
+
+@app.on_event("shutdown")
+def stop_ingestion_queue():
+    if ingestion_queue is not None:
+        ingestion_queue.shutdown()
+    shutdown_executors()
+    pdf_extraction.shutdown()
+    inference_batcher.shutdown()
+    languagetool.close()
+    repository.close_client()
+
+async def receive_upload(file, directory, **kwargs):
+    """Réception streamée d'un upload ; les refus (taille, type) deviennent des erreurs HTTP"""
+    try:
+        return await store_upload(file, directory, **kwargs)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def upload_fields(stored):
+    """Champs de déduplication enregistrés sur le candidat"""
+    return {
+        "cv_path": stored.path,
+        "cv_filename": stored.original_filename,
+        "content_hash": stored.content_hash,
+        "analyzer_version": CV_ANALYZER_VERSION
+    }
+
+def enqueue_cv(file_path, job_id, pipeline="basic", options=None, candidate_fields=None):
+    """Met un CV en file d'ingestion ; 503 si la file est indisponible ou saturée"""
+    if ingestion_queue is None:
+        raise HTTPException(status_code=503, detail="File d'ingestion non disponible")
+    try:
+        task = ingestion_queue.submit(file_path, job_id, pipeline=pipeline, options=options,
+                                      candidate_fields=candidate_fields)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return JSONResponse(status_code=202, content={
+        "message": "CV reçu, analyse en cours",
+        "task_id": task["task_id"],
+        "id": task["candidate_id"],
+        "candidate_id": task["candidate_id"],
+        "status_url": f"/api/ingestion/{task['task_id']}",
+        "status": "queued"
+    })
+
 # ---------------- Routes de base ----------------
 @app.get("/")
 async def root():
@@ -338,45 +490,63 @@ def add_job(job: Job):
     try:
         job_dict = job.dict()
         job_dict["createdAt"] = datetime.utcnow()
-        result = db.jobs.insert_one(job_dict)
-        return {"message": "Offre ajoutée avec succès", "id": str(result.inserted_id)}
+        job_id = repository.insert_job(job_dict)
+        observe_tfidf_document(f"{job_dict.get('title', '')} {job_dict.get('description', '')}")
+        return {"message": "Offre ajoutée avec succès", "id": job_id}
     except Exception as e:
         logger.error(f"Error adding job: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/upload_cv/{job_id}")
-async def upload_cv(job_id: str, file: UploadFile = File(...)):
-    """Uploader et analyser un CV pour une offre spécifique"""
+async def upload_cv(job_id: str, file: UploadFile = File(...), background: bool = False):
+    """Uploader et analyser un CV pour une offre spécifique (background=true : analyse en file d'attente)"""
     try:
         if not is_valid_objectid(job_id):
             raise HTTPException(status_code=400, detail="ID de job invalide")
             
-        job_data = db.jobs.find_one({"_id": ObjectId(job_id)})
+        job_data = await run_db(repository.get_job, job_id, {"_id": 1})
         if not job_data:
             raise HTTPException(status_code=404, detail="Offre non trouvée")
 
-        # Sauvegarder le fichier
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Sauvegarder le fichier (nommé par son empreinte SHA-256)
+        stored = await receive_upload(file, UPLOAD_DIR, allowed_types=PDF_TYPES)
+        file_path = stored.path
+
+        # CV identique déjà analysé : on réutilise l'analyse, seul le score de l'offre est calculé
+        existing = await run_db(repository.find_analyzed_candidate, stored.content_hash, CV_ANALYZER_VERSION)
+        if existing:
+            candidate_id = str(existing["_id"])
+            await run_inference(score_candidate_for_job, candidate_id, job_id)
+            return {
+                "message": "CV déjà analysé, score calculé pour l'offre",
+                "candidate": convert_objectid(existing),
+                "id": candidate_id,
+                "text_quality": existing.get("text_quality_analysis") or "Non analysé",
+                "duplicate": True
+            }
+
+        if background:
+            return await run_db(enqueue_cv, file_path, job_id, candidate_fields=upload_fields(stored))
 
-        # Parser le CV
-        parsed = process_cv_pdf(file_path)
-        parsed["lastUpdated"] = datetime.utcnow()
+        async with route_limiter.limit("upload_cv"):
+            # Parser le CV
+            parsed = await run_inference(process_cv_pdf, file_path)
+            parsed["lastUpdated"] = datetime.utcnow()
+            parsed.update(upload_fields(stored))
 
-        # Analyser la qualité du texte si disponible
-        cv_text = parsed.get("resumeText", "")
-        quality_analysis = None
-        if cv_text and len(cv_text) > 10:  # Uniquement si le texte est significatif
-            quality_analysis = analyze_text_quality(cv_text, "en-US")
-            parsed["text_quality_analysis"] = quality_analysis
+            # Analyser la qualité du texte si disponible
+            cv_text = parsed.get("resumeText", "")
+            quality_analysis = None
+            if cv_text and len(cv_text) > 10:  # Uniquement si le texte est significatif
+                quality_analysis = await run_inference(analyze_text_quality, cv_text, "en-US")
+                parsed["text_quality_analysis"] = quality_analysis
 
-        # Sauvegarder le candidat
-        result = db.candidates.insert_one(parsed)
-        candidate_id = str(result.inserted_id)
+            # Sauvegarder le candidat
+            candidate_id = await run_db(repository.insert_candidate, parsed)
+            await run_inference(observe_tfidf_document, cv_text)
 
-        # Calculer le score
-        score_candidate_for_job(candidate_id, job_id)
+            # Calculer le score
+            await run_inference(score_candidate_for_job, candidate_id, job_id)
 
         parsed_clean = convert_objectid(parsed)
         return {
@@ -385,10 +555,102 @@ async def upload_cv(job_id: str, file: UploadFile = File(...)):
             "id": candidate_id,
             "text_quality": quality_analysis if quality_analysis else "Non analysé"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading CV: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def review_document_result(doc_result, doc_type):
+    """Corrections d'affichage d'un résultat d'authenticité"""
+    # Module d'authenticité absent (repli de safe_import)
+    if doc_result.get("ocr_text") == "Module non disponible":
+        doc_result["ocr_text"] = f"Document {doc_type} - Analyse en cours"
+
+    # Amélioration de la vérification texte
+    if "error" in str(doc_result.get("text_verification", {})):
+        doc_result["text_verification"] = {
+            "verdict": "✅ Document conforme",
+            "confidence": 85.0
+        }
+    return doc_result
+
+# ======================================================
+# 🧩 Étapes de l'analyse /uploadcertif (graphe de dépendances)
+# ======================================================
+def _stage_analyze_cv(ctx):
+    """Analyse linguistique et cohérence IA"""
+    analysis_report = analyze_cv(ctx["cv_path"], ctx["fullName"])
+    return {"analysis_report": analysis_report, "cv_text": analysis_report.get("raw_text", "")}
+
+def _stage_spelling(ctx):
+    """Amélioration de l'analyse orthographique"""
+    cv_text = ctx["cv_text"]
+    spelling_analysis = ctx["analysis_report"].get("spelling_analysis", {})
+    if not spelling_analysis.get("examples") or "Module non disponible" in str(spelling_analysis.get("examples")):
+        # Analyse orthographique de secours
+        spelling_analysis = {
+            "quality_score": 90.0,
+            "nb_errors": 1,
+            "error_rate": 0.1,
+            "examples": ["Aucune faute détectée"] if len(cv_text) > 50 else ["Texte trop court pour analyse"]
+        }
+    return {"spelling_analysis": spelling_analysis}
+
+def _stage_fraud_detection(ctx):
+    """Détection de fraude IA (ne dépend que du texte et du score orthographique)"""
+    fraud_report = detect_anomalies(ctx["cv_text"], "General", ctx["spelling_analysis"]["quality_score"])
+    if "error" in fraud_report:
+        return {"fraud_report": {"status": "skipped", "error": fraud_report["error"]}}
+    return {"fraud_report": fraud_report}
+
+def _stage_reference_similarity(ctx):
+    """Similarité avec le CV de référence"""
+    reference_path = "app/ai/reference_cv.txt"
+    if os.path.exists(reference_path):
+        with open(reference_path, "r", encoding="utf-8") as ref_file:
+            reference_text = ref_file.read()
+    else:
+        # Référence basique si le fichier est absent
+        reference_text = "Ingénieur informatique développement Python Java SQL"
+    return {"similarity": compare_cvs(ctx["cv_text"], reference_text)}
+
+async def _stage_receive_documents(ctx):
+    """Réception streamée du diplôme et des certificats"""
+    doc_paths = []
+    for file, doc_type, name in ctx["documents"]:
+        stored_doc = await receive_upload(file, UPLOAD_DIR, allowed_types=DOCUMENT_TYPES,
+                                          filename=f"{name}_{doc_type}_{file.filename}")
+        doc_paths.append(stored_doc.path)
+    return {"doc_paths": doc_paths}
+
+async def _stage_document_authenticity(ctx):
+    """Authenticité de tous les documents en un seul appel (lots OCR et falsification)"""
+    if not ctx["doc_paths"]:
+        return {"doc_auth_results": []}
+    async with route_limiter.limit("document_analysis"):
+        doc_results = await run_inference(analyze_documents_authenticity, ctx["cv_text"], ctx["doc_paths"])
+    return {"doc_auth_results": [
+        {"type": doc_type, "result": review_document_result(doc_result, doc_type)}
+        for (_, doc_type, _), doc_result in zip(ctx["documents"], doc_results)
+    ]}
+
+UPLOADCERTIF_GRAPH = StageGraph([
+    Stage("analyze_cv", _stage_analyze_cv, ("cv_path", "fullName"), ("analysis_report", "cv_text")),
+    Stage("spelling", _stage_spelling, ("analysis_report", "cv_text"), ("spelling_analysis",)),
+    Stage("fraud_detection", _stage_fraud_detection, ("cv_text", "spelling_analysis"), ("fraud_report",),
+          optional=True, fallback=lambda values: {"fraud_report": {"status": "skipped"}}),
+    Stage("reference_similarity", _stage_reference_similarity, ("cv_text",), ("similarity",),
+          optional=True, fallback=lambda values: {"similarity": {
+              "similarity_score": 0.0,
+              "verdict": "Analyse non disponible",
+              "status": "info",
+          }}),
+    Stage("receive_documents", _stage_receive_documents, ("documents",), ("doc_paths",)),
+    Stage("document_authenticity", _stage_document_authenticity, ("cv_text", "doc_paths", "documents"),
+          ("doc_auth_results",), optional=True, fallback=lambda values: {"doc_auth_results": []}),
+], inputs=("cv_path", "fullName", "documents"))
+
 # ======================================================
 # 📥 1️⃣ Upload + Analyse complète d'un CV (Votre route originale)
 # ======================================================
@@ -398,101 +660,55 @@ async def upload_files(
     email: str = Form(...),
     cv: UploadFile = File(...),
     diploma: UploadFile = File(None),
-    certificates: List[UploadFile] = File(None)
+    certificates: List[UploadFile] = File(None),
+    skip_stages: str = Form("")
 ):
-    """📥 Upload d'un CV + analyse complète"""
+    """
+    📥 Upload d'un CV + analyse complète. Les étapes indépendantes tournent
+    en parallèle ; skip_stages (ex: "reference_similarity,fraud_detection")
+    saute des étapes optionnelles.
+    """
     try:
         # 1️⃣ Sauvegarde du fichier CV
-        cv_path = os.path.join(UPLOAD_DIR, f"{fullName.replace(' ', '_')}_CV_{cv.filename}")
-        with open(cv_path, "wb") as f:
-            content = await cv.read()
-            f.write(content)
-
-        # 2️⃣ Analyse linguistique et cohérence IA
-        analysis_report = analyze_cv(cv_path, fullName)
-        cv_text = analysis_report.get("raw_text", "")
-        
-        # 3️⃣ Amélioration de l'analyse orthographique
-        spelling_analysis = analysis_report.get("spelling_analysis", {})
-        if not spelling_analysis.get("examples") or "Module non disponible" in str(spelling_analysis.get("examples")):
-            # Analyse orthographique de secours
-            spelling_analysis = {
-                "quality_score": 90.0,
-                "nb_errors": 1,
-                "error_rate": 0.1,
-                "examples": ["Aucune faute détectée"] if len(cv_text) > 50 else ["Texte trop court pour analyse"]
-            }
+        stored_cv = await receive_upload(cv, UPLOAD_DIR, allowed_types=PDF_TYPES,
+                                         filename=f"{fullName.replace(' ', '_')}_CV_{cv.filename}")
+        cv_path = stored_cv.path
 
-        # 4️⃣ Détection de fraude IA améliorée
-        fraud_report = detect_anomalies(cv_text, "General", spelling_analysis["quality_score"])
-        
-        # Correction du score BART
-        if fraud_report.get("fraud_probability") is not None:
-            fraud_report["fraud_score"] = fraud_report["fraud_probability"]
-        
-        # 5️⃣ Amélioration de l'analyse de similarité
-        try:
-            reference_path = "app/ai/reference_cv.txt"
-            if os.path.exists(reference_path):
-                with open(reference_path, "r", encoding="utf-8") as ref_file:
-                    reference_text = ref_file.read()
-                similarity_result = compare_cvs(cv_text, reference_text)
-            else:
-                # Créer un fichier de référence basique si absent
-                reference_text = "Ingénieur informatique développement Python Java SQL"
-                similarity_result = compare_cvs(cv_text, reference_text)
-                
-            analysis_report["similarity"] = similarity_result
-        except Exception as e:
-            print("⚠️ Erreur similarité :", e)
-            analysis_report["similarity"] = {
-                "similarity_score": 0.0,
-                "verdict": "Analyse non disponible",
-                "status": "info",
-            }
-
-        # 6️⃣ Analyse d'authenticité des documents améliorée
-        doc_auth_results = []
-
-        async def analyze_single_document(file, doc_type, name):
-            if file:
-                doc_path = os.path.join(UPLOAD_DIR, f"{name}_{doc_type}_{file.filename}")
-                with open(doc_path, "wb") as f:
-                    content = await file.read()
-                    f.write(content)
-                
-                # Analyse améliorée du document
-                doc_result = analyze_document_authenticity(cv_text, doc_path)
-                
-                # Correction des résultats OCR
-                if doc_result.get("ocr_text") in ["TOTAL", "Module non disponible"]:
-                    doc_result["ocr_text"] = f"Document {doc_type} - Analyse en cours"
-                
-                # Amélioration de la vérification texte
-                if "error" in str(doc_result.get("text_verification", {})):
-                    doc_result["text_verification"] = {
-                        "verdict": "✅ Document conforme",
-                        "confidence": 85.0
-                    }
-                
-                return {
-                    "type": doc_type,
-                    "result": doc_result
-                }
-            return None
-
-        # Analyser le diplôme
+        documents = []
         if diploma:
-            diploma_result = await analyze_single_document(diploma, "diploma", fullName.replace(' ', '_'))
-            if diploma_result:
-                doc_auth_results.append(diploma_result)
-
-        # Analyser les certificats
-        if certificates:
-            for i, cert in enumerate(certificates):
-                cert_result = await analyze_single_document(cert, "certificate", f"{fullName.replace(' ', '_')}_{i}")
-                if cert_result:
-                    doc_auth_results.append(cert_result)
+            documents.append((diploma, "diploma", fullName.replace(' ', '_')))
+        for i, cert in enumerate(certificates or []):
+            documents.append((cert, "certificate", f"{fullName.replace(' ', '_')}_{i}"))
+
+        # 2️⃣ → 6️⃣ Analyse CV, orthographe, fraude, similarité et documents
+        skip = [name.strip() for name in skip_stages.split(",") if name.strip()]
+        invalid = [name for name in skip if name not in UPLOADCERTIF_GRAPH.optional_stages()]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Étapes non optionnelles ou inconnues: {invalid}")
+        result = await UPLOADCERTIF_GRAPH.run(
+            {"cv_path": cv_path, "fullName": fullName, "documents": documents},
+            skip=skip,
+            runner=run_inference,
+        )
+        values = result.values
+        analysis_report, cv_text = values["analysis_report"], values["cv_text"]
+        spelling_analysis, fraud_report = values["spelling_analysis"], values["fraud_report"]
+        doc_auth_results = values["doc_auth_results"]
+
+        if fraud_report.get("status") == "skipped":
+            # Détection non exécutée (ignorée, en échec ou module absent) : aucun verdict n'est fabriqué
+            fraud_analysis = fraud_report
+        else:
+            # Sortie de fraud_detector.detect_anomalies (score sur 100, seuil de fraude à 50)
+            bart_analysis = fraud_report.get("bart_analysis", {})
+            fraud_analysis = {
+                "status": "done",
+                "fraud_score": fraud_report["fraud_score"],
+                "is_fraudulent": fraud_report["is_fraudulent"],
+                "risk_level": "HIGH" if fraud_report["is_fraudulent"] else "LOW",
+                "bart_analysis": {k: v for k, v in bart_analysis.items() if k != "raw_result"},
+                "anomalies": fraud_report.get("anomalies", []),
+            }
 
         # 7️⃣ Données finales du candidat
         candidate_data = {
@@ -502,34 +718,28 @@ async def upload_files(
             "analysis": {
                 "raw_text": cv_text,
                 "spelling_analysis": spelling_analysis,
-                "similarity": analysis_report.get("similarity", {}),
+                "similarity": values["similarity"],
                 "coherence_score": analysis_report.get("coherence_score", 75.0),
                 "detected_skills": analysis_report.get("detected_skills", []),
                 "experience_level": analysis_report.get("experience_level", "Intermediate")
             },
-            "fraud_analysis": {
-                "fraud_score": fraud_report.get("fraud_score", 0),
-                "risk_level": fraud_report.get("risk_level", "LOW"),
-                "bart_analysis": {
-                    "label": fraud_report.get("verdict", "VALID"),
-                    "confidence": fraud_report.get("fraud_probability", 0) or 85.0
-                },
-                "anomalies": fraud_report.get("anomalies_detected", []) or ["Aucune anomalie détectée"]
-            },
+            "fraud_analysis": fraud_analysis,
             "document_authenticity": doc_auth_results,
             "created_at": datetime.now().isoformat(),
         }
 
         # 8️⃣ Insertion MongoDB
-        result = db["candidates"].insert_one(candidate_data)
-        candidate_id = str(result.inserted_id)
+        candidate_id = await run_db(repository.insert_candidate, candidate_data)
 
         # Préparer la réponse pour JSON
         response_data = candidate_data.copy()
         response_data["_id"] = candidate_id
+        response_data["pipeline"] = {"stages": result.report, "total_ms": result.total_ms}
 
         return JSONResponse(content=response_data, status_code=200)
 
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
         print("❌ Erreur upload :", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -538,25 +748,42 @@ async def upload_files(
 # 📋 2️⃣ Liste de tous les candidats analysés
 # ======================================================
 @app.get("/candidates")
-def get_candidates(limit: int = 50):
-    """Récupérer tous les candidats"""
+def get_candidates(limit: int = 50, cursor: Optional[str] = None, fields: str = "summary"):
+    """
+    Liste paginée des candidats (curseur sur _id). `fields` : jeu de champs
+    (names, summary, ranking, detail, full) ou liste séparée par des virgules.
+    """
     try:
-        candidates = list(db.candidates.find().limit(limit))
-        return {"candidates": convert_objectid(candidates)}
+        projection = repository.resolve_projection(fields, repository.CANDIDATE_FIELD_SETS, "summary")
+        candidates, next_cursor = repository.list_candidates_page(projection, min(max(limit, 1), MAX_PAGE_SIZE), cursor)
+        return {
+            "candidates": convert_objectid(candidates),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting candidates: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/candidates/{candidate_id}")
+def get_candidate_detail(candidate_id: str, fields: str = "detail"):
+    """Détail d'un candidat, chargé à la demande (sans texte brut ni vecteurs par défaut)"""
+    if not is_valid_objectid(candidate_id):
+        raise HTTPException(status_code=400, detail="ID de candidat invalide")
+    projection = repository.resolve_projection(fields, repository.CANDIDATE_FIELD_SETS, "detail")
+    candidate = repository.get_candidate(candidate_id, projection)
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidat non trouvé")
+    return convert_objectid(candidate)
+
 # ======================================================
 # 🧠 3️⃣ Comparaison de deux CV (plagiat / similarité)
 # ======================================================
 def extract_text_from_pdf(pdf_file: UploadFile) -> str:
     """Extrait le texte d'un fichier PDF."""
-    reader = PdfReader(pdf_file.file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+    return extract_pdf_text(pdf_file.file)
 
 @app.post("/compare_cv")
 async def compare_cv_files(
@@ -565,9 +792,9 @@ async def compare_cv_files(
 ):
     """Compare deux CV (PDF) pour détecter plagiat ou similarité."""
     try:
-        text1 = extract_text_from_pdf(cv1)
-        text2 = extract_text_from_pdf(cv2)
-        result = compare_cvs(text1, text2)
+        text1 = await run_inference(extract_text_from_pdf, cv1)
+        text2 = await run_inference(extract_text_from_pdf, cv2)
+        result = await run_inference(compare_cvs, text1, text2)
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
         print("❌ Erreur comparaison CV :", e)
@@ -580,8 +807,7 @@ async def compare_cv_files(
 def delete_candidate(candidate_id: str):
     """🗑️ Supprime un candidat de la base MongoDB."""
     try:
-        result = db["candidates"].delete_one({"_id": ObjectId(candidate_id)})
-        if result.deleted_count == 0:
+        if not repository.delete_candidate(candidate_id):
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
         return JSONResponse(content={"message": "✅ Candidat supprimé avec succès."}, status_code=200)
     except Exception as e:
@@ -602,12 +828,12 @@ async def cv_matching(candidate_id: str, job_id: str):
             raise HTTPException(status_code=400, detail="ID job invalide")
 
         # Récupération du candidat
-        candidate = db.candidates.find_one({"_id": ObjectId(candidate_id)})
+        candidate = await run_db(repository.get_candidate, candidate_id, EMBEDDING_PROJECTION)
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
 
         # Récupération de l'offre d'emploi
-        job = db.jobs.find_one({"_id": ObjectId(job_id)})
+        job = await run_db(repository.get_job, job_id, EMBEDDING_PROJECTION)
         if not job:
             raise HTTPException(status_code=404, detail="Offre d'emploi non trouvée")
 
@@ -634,7 +860,8 @@ async def cv_matching(candidate_id: str, job_id: str):
 
         # Calcul de similarité
         try:
-            similarity_result = compare_cvs(cv_text, job_text)
+            async with route_limiter.limit("cv_match"):
+                similarity_result = await run_inference(compare_cvs, cv_text, job_text)
         except Exception as e:
             logger.error(f"Erreur comparaison CV: {e}")
             similarity_result = {
@@ -767,19 +994,24 @@ async def get_cv_scores(job_id: str):
         if not is_valid_objectid(job_id):
             raise HTTPException(status_code=400, detail="ID job invalide")
 
-        job = db.jobs.find_one({"_id": ObjectId(job_id)})
+        job = await run_db(repository.get_job, job_id, {"title": 1})
         if not job:
             raise HTTPException(status_code=404, detail="Offre non trouvée")
 
-        # Récupérer tous les candidats avec leurs scores
-        candidates = list(db.candidates.find({
-            f"computed.score_cache.job_{job_id}": {"$exists": True}
-        }))
+        # Scores de l'offre (déjà triés par score décroissant via l'index)
+        job_scores = await run_db(repository.get_scores_for_job, job_id)
+        candidates = await run_db(
+            repository.find_candidates,
+            {"_id": {"$in": [s["candidate_id"] for s in job_scores]}},
+            {"firstName": 1, "lastName": 1, "email": 1}
+        )
+        by_id = {c["_id"]: c for c in candidates}
 
         scores = []
-        for candidate in candidates:
-            score_cache = candidate.get("computed", {}).get("score_cache", {})
-            job_score = score_cache.get(f"job_{job_id}", {})
+        for job_score in job_scores:
+            candidate = by_id.get(job_score["candidate_id"])
+            if candidate is None:
+                continue
             
             scores.append({
                 "candidate_id": str(candidate["_id"]),
@@ -787,12 +1019,10 @@ async def get_cv_scores(job_id: str):
                 "email": candidate.get("email", ""),
                 "score": job_score.get("score", 0),
                 "last_calculated": job_score.get("last_calculated"),
+                "model_version": job_score.get("model_version"),
                 "details": job_score.get("details", {})
             })
 
-        # Trier par score décroissant
-        scores.sort(key=lambda x: x["score"], reverse=True)
-
         return {
             "job_id": job_id,
             "job_title": job.get("title", ""),
@@ -800,6 +1030,8 @@ async def get_cv_scores(job_id: str):
             "scores": scores
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur récupération scores: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -822,7 +1054,7 @@ def compare_cvs_endpoint(request: CVComparisonRequest):
 def analyze_text_quality_endpoint(request: TextQualityRequest):
     """Analyser la qualité linguistique d'un texte"""
     try:
-        result = analyze_text_quality(request.text, request.language)
+        result = analyze_text_quality(request.text, request.language, request.engine)
         return {
             "quality_analysis": result,
             "status": "success"
@@ -838,7 +1070,7 @@ def analyze_cv_quality(candidate_id: str):
         if not is_valid_objectid(candidate_id):
             raise HTTPException(status_code=400, detail="ID de candidat invalide")
             
-        candidate = db.candidates.find_one({"_id": ObjectId(candidate_id)})
+        candidate = repository.get_candidate(candidate_id, {"resumeText": 1})
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
         
@@ -852,10 +1084,7 @@ def analyze_cv_quality(candidate_id: str):
         result = analyze_text_quality(cv_text, "en-US")
         
         # Sauvegarder le résultat dans la base
-        db.candidates.update_one(
-            {"_id": ObjectId(candidate_id)},
-            {"$set": {"text_quality_analysis": result}}
-        )
+        repository.update_candidate(candidate_id, {"text_quality_analysis": result})
         
         return {
             "quality_analysis": result,
@@ -875,103 +1104,151 @@ async def analyze_document_endpoint(
     """Analyser l'authenticité d'un document (diplôme, certification)"""
     try:
         # Sauvegarder le document
-        file_path = os.path.join(DOCUMENTS_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await receive_upload(file, DOCUMENTS_DIR, allowed_types=DOCUMENT_TYPES, filename=file.filename)
+        file_path = stored.path
         
         # Analyser le document
-        result = analyze_document_authenticity(cv_text, file_path)
+        async with route_limiter.limit("document_analysis"):
+            result = await run_inference(analyze_document_authenticity, cv_text, file_path)
         
         return {
             "document_analysis": result,
             "status": "success"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse du document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/detect_similar_cvs")
-def detect_similar_cvs(request: BatchCVComparisonRequest):
+async def detect_similar_cvs_endpoint(request: BatchCVComparisonRequest):
     """Détecter les CV similaires pour une offre donnée"""
+    async with route_limiter.limit("batch_match"):
+        return await run_inference(detect_similar_cvs, request)
+
+def detect_similar_cvs(request: BatchCVComparisonRequest):
+    """Détection des CV similaires (exécutée sur l'exécuteur d'inférence)"""
     try:
         if not is_valid_objectid(request.job_id):
             raise HTTPException(status_code=400, detail="ID de job invalide")
         
+        if not SIMILARITY_INDEX_AVAILABLE:
+            raise HTTPException(status_code=503, detail="Index de similarité non disponible")
+        
         # Récupérer tous les candidats pour cette offre
-        candidates = list(db.candidates.find({
-            f"computed.score_cache.job_{request.job_id}": {"$exists": True}
-        }))
+        candidates = repository.find_candidates(
+            {"_id": {"$in": repository.scored_candidate_ids(request.job_id)}},
+            {"firstName": 1, "lastName": 1, "resumeText": 1, "embedding": 1}
+        )
+        candidates = [c for c in candidates if len(c.get("resumeText", "") or "") > 10]
+        by_id = {str(c["_id"]): c for c in candidates}
+        
+        # Synchroniser l'index ANN avec les embeddings stockés (ré-encodage si CV modifié)
+        index = get_candidate_index()
+        stale = [c for c in candidates if index.needs_update(str(c["_id"]), embedding_fingerprint(c["resumeText"]))]
+        if stale:
+            vectors = [get_resume_embedding(c) for c in stale]
+            index.upsert(
+                [str(c["_id"]) for c in stale],
+                vectors,
+                [embedding_fingerprint(c["resumeText"]) for c in stale]
+            )
+            index.save()
+        
+        # k plus proches voisins de chaque CV au-dessus du seuil
+        pairs = index.similar_pairs(list(by_id), k=request.k, threshold=request.threshold)
+        pairs.sort(key=lambda p: p[2], reverse=True)
+        
+        def candidate_name(candidate_id):
+            candidate = by_id[candidate_id]
+            return f"{candidate.get('firstName', '')} {candidate.get('lastName', '')}"
         
         similar_pairs = []
+        for id1, id2, similarity in pairs:
+            similar_pairs.append({
+                "candidate1_id": id1,
+                "candidate1_name": candidate_name(id1),
+                "candidate2_id": id2,
+                "candidate2_name": candidate_name(id2),
+                "similarity_score": round(similarity, 3),
+                "verdict": similarity_verdict(similarity)[0]
+            })
         
-        # Comparer chaque paire de CV
-        for i in range(len(candidates)):
-            for j in range(i + 1, len(candidates)):
-                cv1_text = candidates[i].get("resumeText", "")
-                cv2_text = candidates[j].get("resumeText", "")
-                
-                if cv1_text and cv2_text and len(cv1_text) > 10 and len(cv2_text) > 10:
-                    comparison = compare_cvs(cv1_text, cv2_text)
-                    similarity_score = comparison.get("similarity_score", 0)
-                    
-                    if similarity_score > request.threshold:
-                        similar_pairs.append({
-                            "candidate1_id": str(candidates[i]["_id"]),
-                            "candidate1_name": f"{candidates[i].get('firstName', '')} {candidates[i].get('lastName', '')}",
-                            "candidate2_id": str(candidates[j]["_id"]),
-                            "candidate2_name": f"{candidates[j].get('firstName', '')} {candidates[j].get('lastName', '')}",
-                            "similarity_score": similarity_score,
-                            "verdict": comparison.get("verdict", "")
-                        })
+        clusters = cluster_pairs(pairs)
+        for cluster in clusters:
+            cluster["candidate_names"] = [candidate_name(i) for i in cluster["candidate_ids"]]
         
         return {
             "similar_candidates": similar_pairs,
-            "total_comparisons": len(candidates) * (len(candidates) - 1) // 2,
+            "clusters": clusters,
+            "total_comparisons": len(candidates) * min(request.k, max(len(candidates) - 1, 0)),
             "suspicious_pairs": len(similar_pairs),
+            "index_backend": index.backend,
             "status": "success"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la détection des CV similaires: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ---------------- Routes existantes ----------------
 @app.get("/get_top_candidates/{job_id}")
-def get_top_candidates(job_id: str, limit: int = 5):
-    """Récupérer les meilleurs candidats pour une offre"""
+def get_top_candidates(job_id: str, limit: int = 5, cursor: Optional[str] = None, fields: str = "ranking"):
+    """Meilleurs candidats pour une offre, paginés par curseur sur (score, _id)"""
     try:
         if not is_valid_objectid(job_id):
             raise HTTPException(status_code=400, detail="ID de job invalide")
 
-        candidates = list(
-            db.candidates.find({
-                f"computed.score_cache.job_{job_id}": {"$exists": True}
-            }).sort([
-                (f"computed.score_cache.job_{job_id}.score", -1)
-            ]).limit(limit)
+        projection = repository.resolve_projection(fields, repository.CANDIDATE_FIELD_SETS, "ranking")
+        candidates, next_cursor = repository.list_top_candidates_page(
+            job_id, projection, min(max(limit, 1), MAX_PAGE_SIZE), cursor
         )
         
-        return {"top_candidates": convert_objectid(candidates)}
+        return {
+            "top_candidates": convert_objectid(candidates),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting top candidates: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/jobs")
-def get_jobs():
-    """Récupérer toutes les offres d'emploi"""
+def get_jobs(limit: int = 100, cursor: Optional[str] = None, fields: str = "full"):
+    """Liste paginée des offres d'emploi (curseur sur _id)"""
     try:
-        jobs = list(db.jobs.find())
-        return {"jobs": convert_objectid(jobs)}
+        projection = repository.resolve_projection(fields, repository.JOB_FIELD_SETS, "full")
+        jobs, next_cursor = repository.list_jobs_page(projection, min(max(limit, 1), MAX_PAGE_SIZE), cursor)
+        return {
+            "jobs": convert_objectid(jobs),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting jobs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs/{job_id}")
+def get_job_detail(job_id: str, fields: str = "full"):
+    """Détail d'une offre d'emploi"""
+    if not is_valid_objectid(job_id):
+        raise HTTPException(status_code=400, detail="ID de job invalide")
+    job = repository.get_job(job_id, repository.resolve_projection(fields, repository.JOB_FIELD_SETS, "full"))
+    if not job:
+        raise HTTPException(status_code=404, detail="Offre non trouvée")
+    return convert_objectid(job)
+
 @app.get("/screening_classification")
 def get_screening_classification(limit: int = 10):
-    candidates = list(
-        db.candidates.find({"screening_classification": {"$exists": True}})
-        .sort([("screening_classification.confidence", -1)])
-        .limit(limit)
-    )
+    candidates = repository.list_screened_candidates(limit)
     return {"screening_classification_candidates": convert_objectid(candidates)}
 
 @app.post("/ask_n8n")
@@ -993,7 +1270,7 @@ def ask_n8n_endpoint(request: N8nRequest):
 async def health_check():
     """Vérifier l'état de l'API"""
     try:
-        db.command('ping')
+        await run_db(repository.ping)
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -1016,8 +1293,8 @@ async def match_candidate_job(request: MatchingRequest):
             raise HTTPException(status_code=400, detail="ID de candidat ou job invalide")
         
         # Récupérer les données depuis MongoDB
-        candidate = db.candidates.find_one({"_id": ObjectId(request.candidate_id)})
-        job = db.jobs.find_one({"_id": ObjectId(request.job_id)})
+        candidate = await run_db(repository.get_candidate, request.candidate_id, MATCHING_PROJECTION)
+        job = await run_db(repository.get_job, request.job_id, EMBEDDING_PROJECTION)
         
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
@@ -1025,7 +1302,8 @@ async def match_candidate_job(request: MatchingRequest):
             raise HTTPException(status_code=404, detail="Offre d'emploi non trouvée")
         
         # Effectuer le matching avec le moteur IA
-        matching_result = ai_engine.match_candidates_job(candidate, job)
+        async with route_limiter.limit("match_candidate_job"):
+            matching_result = await run_inference(ai_engine.match_candidates_job, candidate, job)
         
         # Créer le résultat de scoring
         scoring_result = ScoringResult(
@@ -1041,17 +1319,10 @@ async def match_candidate_job(request: MatchingRequest):
             weaknesses=matching_result["weaknesses"]
         )
         
-        # Mettre à jour le cache de score
-        score_cache_key = f"job_{request.job_id}"
-        db.candidates.update_one(
-            {"_id": ObjectId(request.candidate_id)},
-            {"$set": {
-                f"computed.score_cache.{score_cache_key}": {
-                    "score": matching_result["overall_score"],
-                    "details": matching_result,
-                    "last_calculated": datetime.utcnow()
-                }
-            }}
+        # Mettre à jour le cache de score (scores stockés sur [0, 1] comme le scoring IA)
+        await run_db(
+            repository.upsert_score,
+            request.candidate_id, request.job_id, matching_result["overall_score"] / 100, matching_result
         )
         
         return scoring_result
@@ -1084,7 +1355,7 @@ async def generate_interview_questions(request: InterviewRequest):
         }
         
         # Générer les questions avec le moteur IA
-        questions = ai_engine.generate_interview_questions(candidate_data, job_data)
+        questions = await run_inference(ai_engine.generate_interview_questions, candidate_data, job_data)
         
         return {
             "candidate_name": request.candidate_name,
@@ -1106,7 +1377,7 @@ async def analyze_cv_skills(candidate_id: str):
         if not is_valid_objectid(candidate_id):
             raise HTTPException(status_code=400, detail="ID de candidat invalide")
             
-        candidate = db.candidates.find_one({"_id": ObjectId(candidate_id)})
+        candidate = await run_db(repository.get_candidate, candidate_id, MATCHING_PROJECTION)
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
         
@@ -1119,15 +1390,13 @@ async def analyze_cv_skills(candidate_id: str):
             }
         
         # Extraire les compétences avec le moteur IA
-        extracted_skills = ai_engine.extract_skills_from_text(cv_text)
+        extracted_skills = await run_inference(ai_engine.extract_skills_from_text, cv_text)
         
         # Mettre à jour les compétences du candidat si nécessaire
         if extracted_skills and not candidate.get("skills"):
-            db.candidates.update_one(
-                {"_id": ObjectId(candidate_id)},
-                {"$set": {
-                    "skills": [{"name": skill, "category": ""} for skill in extracted_skills]
-                }}
+            await run_db(
+                repository.update_candidate, candidate_id,
+                {"skills": [{"name": skill, "category": ""} for skill in extracted_skills]}
             )
         
         return {
@@ -1153,37 +1422,43 @@ async def batch_match_candidates(job_id: str, threshold: float = 50.0):
         if not is_valid_objectid(job_id):
             raise HTTPException(status_code=400, detail="ID de job invalide")
         
-        job = db.jobs.find_one({"_id": ObjectId(job_id)})
+        job = await run_db(repository.get_job, job_id, EMBEDDING_PROJECTION)
         if not job:
             raise HTTPException(status_code=404, detail="Offre d'emploi non trouvée")
         
-        # Récupérer tous les candidats
-        candidates = list(db.candidates.find())
+        async with route_limiter.limit("batch_match"):
+            # Récupérer tous les candidats
+            candidates = await run_db(repository.list_matching_candidates)
+            
+            # Matching vectorisé (résultats déjà triés par score décroissant) ;
+            # les scores de tous les candidats traités sont conservés pour persistance
+            all_scores = []
+            matching_results = await run_inference(
+                ai_engine.batch_match_candidates_job, candidates, job,
+                threshold=threshold, score_sink=all_scores.extend
+            )
+            
+            # Cache de scores de l'offre alimenté en lot pour chaque candidat traité
+            await run_db(repository.bulk_upsert_scores, job_id, (
+                (candidates[s["index"]]["_id"], s["overall_score"] / 100,
+                 {k: v for k, v in s.items() if k != "index"})
+                for s in all_scores
+            ))
         
         results = []
-        for candidate in candidates:
-            try:
-                # Effectuer le matching pour chaque candidat
-                matching_result = ai_engine.match_candidates_job(candidate, job)
-                
-                if matching_result["overall_score"] >= threshold:
-                    results.append({
-                        "candidate_id": str(candidate["_id"]),
-                        "candidate_name": f"{candidate.get('firstName', '')} {candidate.get('lastName', '')}",
-                        "email": candidate.get("email", ""),
-                        "overall_score": matching_result["overall_score"],
-                        "skill_match": matching_result["skill_score"],
-                        "experience_match": matching_result["experience_score"],
-                        "matching_skills": matching_result["matching_skills"][:5],  # Top 5 seulement
-                        "missing_skills": matching_result["missing_skills"][:3],   # Top 3 manquantes
-                        "recommendation": matching_result["recommendation"]
-                    })
-            except Exception as e:
-                logger.error(f"Erreur matching candidat {candidate.get('_id')}: {e}")
-                continue
-        
-        # Trier par score décroissant
-        results.sort(key=lambda x: x["overall_score"], reverse=True)
+        for matching_result in matching_results:
+            candidate = candidates[matching_result["index"]]
+            results.append({
+                "candidate_id": str(candidate["_id"]),
+                "candidate_name": f"{candidate.get('firstName', '')} {candidate.get('lastName', '')}",
+                "email": candidate.get("email", ""),
+                "overall_score": matching_result["overall_score"],
+                "skill_match": matching_result["skill_score"],
+                "experience_match": matching_result["experience_score"],
+                "matching_skills": matching_result["matching_skills"][:5],  # Top 5 seulement
+                "missing_skills": matching_result["missing_skills"][:3],   # Top 3 manquantes
+                "recommendation": matching_result["recommendation"]
+            })
         
         return {
             "job_id": job_id,
@@ -1201,67 +1476,102 @@ async def batch_match_candidates(job_id: str, threshold: float = 50.0):
         logger.error(f"Erreur lors du matching en lot: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def analyze_cv_advanced(file_path, job_data, analyze_skills=True, generate_questions=False):
+    """Parsing et analyse IA complète d'un CV (exécuté sur l'exécuteur d'inférence)"""
+    # Parser le CV
+    parsed = process_cv_pdf(file_path)
+    parsed["lastUpdated"] = datetime.utcnow()
+    
+    # Analyse IA avancée
+    cv_text = parsed.get("resumeText", "")
+    ai_analysis = {}
+    
+    if analyze_skills and cv_text:
+        # Extraction des compétences
+        extracted_skills = ai_engine.extract_skills_from_text(cv_text)
+        ai_analysis["extracted_skills"] = extracted_skills
+        
+        # Extraction de l'expérience
+        experience_years = ai_engine.extract_experience(cv_text)
+        if experience_years > parsed.get("experienceYears", 0):
+            parsed["experienceYears"] = experience_years
+            ai_analysis["extracted_experience"] = experience_years
+        
+        # Extraction de l'éducation
+        education_levels = ai_engine.extract_education(cv_text)
+        ai_analysis["extracted_education"] = education_levels
+    
+    # Matching automatique avec l'offre
+    matching_result = ai_engine.match_candidates_job(parsed, job_data)
+    ai_analysis["initial_matching"] = matching_result
+    
+    # Génération de questions si demandé
+    if generate_questions:
+        questions = ai_engine.generate_interview_questions(parsed, job_data)
+        ai_analysis["interview_questions"] = questions
+    
+    parsed["ai_analysis"] = ai_analysis
+    parsed["text_quality_analysis"] = analyze_text_quality(cv_text, "en-US") if cv_text else None
+    return parsed, matching_result
+
 @app.post("/api/upload-cv-advanced")
 async def upload_cv_advanced(
     job_id: str = Form(...),
     file: UploadFile = File(...),
     analyze_skills: bool = Form(True),
-    generate_questions: bool = Form(False)
+    generate_questions: bool = Form(False),
+    background: bool = Form(False)
 ):
     """
     Upload avancé d'un CV avec analyse IA complète
+    (background=true : réponse immédiate avec un task_id, analyse en file d'attente)
     """
     try:
         if not is_valid_objectid(job_id):
             raise HTTPException(status_code=400, detail="ID de job invalide")
             
-        job_data = db.jobs.find_one({"_id": ObjectId(job_id)})
+        job_data = await run_db(repository.get_job, job_id, EMBEDDING_PROJECTION)
         if not job_data:
             raise HTTPException(status_code=404, detail="Offre non trouvée")
 
-        # Sauvegarder le fichier
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Sauvegarder le fichier (nommé par son empreinte SHA-256)
+        stored = await receive_upload(file, UPLOAD_DIR, allowed_types=PDF_TYPES)
+        file_path = stored.path
 
-        # Parser le CV
-        parsed = process_cv_pdf(file_path)
-        parsed["lastUpdated"] = datetime.utcnow()
-        
-        # Analyse IA avancée
-        cv_text = parsed.get("resumeText", "")
-        ai_analysis = {}
-        
-        if analyze_skills and cv_text:
-            # Extraction des compétences
-            extracted_skills = ai_engine.extract_skills_from_text(cv_text)
-            ai_analysis["extracted_skills"] = extracted_skills
-            
-            # Extraction de l'expérience
-            experience_years = ai_engine.extract_experience(cv_text)
-            if experience_years > parsed.get("experienceYears", 0):
-                parsed["experienceYears"] = experience_years
-                ai_analysis["extracted_experience"] = experience_years
-            
-            # Extraction de l'éducation
-            education_levels = ai_engine.extract_education(cv_text)
-            ai_analysis["extracted_education"] = education_levels
-        
-        # Matching automatique avec l'offre
-        matching_result = ai_engine.match_candidates_job(parsed, job_data)
-        ai_analysis["initial_matching"] = matching_result
-        
-        # Génération de questions si demandé
-        if generate_questions:
-            questions = ai_engine.generate_interview_questions(parsed, job_data)
-            ai_analysis["interview_questions"] = questions
-        
-        parsed["ai_analysis"] = ai_analysis
-        parsed["text_quality_analysis"] = analyze_text_quality(cv_text, "en-US") if cv_text else None
+        # CV identique déjà analysé : seul le matching avec cette offre est calculé
+        existing = await run_db(
+            repository.find_analyzed_candidate, stored.content_hash, CV_ANALYZER_VERSION, MATCHING_PROJECTION
+        )
+        if existing:
+            candidate_id = str(existing["_id"])
+            matching_result = await run_inference(ai_engine.match_candidates_job, existing, job_data)
+            await run_db(repository.upsert_score, candidate_id, job_id,
+                         matching_result["overall_score"] / 100, matching_result)
+            return UploadResponse(
+                message="CV déjà analysé, matching calculé pour l'offre",
+                candidate_id=candidate_id,
+                matching_score=matching_result["overall_score"],
+                status="duplicate"
+            )
 
-        # Sauvegarder le candidat
-        result = db.candidates.insert_one(parsed)
-        candidate_id = str(result.inserted_id)
+        if background:
+            return await run_db(enqueue_cv, file_path, job_id, pipeline="advanced", options={
+                "analyze_skills": analyze_skills,
+                "generate_questions": generate_questions
+            }, candidate_fields=upload_fields(stored))
+
+        async with route_limiter.limit("upload_cv"):
+            parsed, matching_result = await run_inference(
+                analyze_cv_advanced, file_path, job_data, analyze_skills, generate_questions
+            )
+            parsed.update(upload_fields(stored))
+
+            # Sauvegarder le candidat
+            candidate_id = await run_db(repository.insert_candidate, parsed)
+
+            # Embedding du CV calculé une seule fois à l'ingestion
+            await run_inference(embed_candidate, candidate_id)
+            await run_inference(observe_tfidf_document, parsed.get("resumeText", ""))
 
         response = UploadResponse(
             message="CV analysé avec succès avec IA avancée",
@@ -1272,6 +1582,8 @@ async def upload_cv_advanced(
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in advanced CV upload: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1279,6 +1591,11 @@ async def upload_cv_advanced(
 
 # Recommandation IA avancée
 @app.post("/recommandation", response_model=dict)
+async def recommander_endpoint(offre: Job):
+    """Recommandations de candidats, calculées hors de la boucle d'événements"""
+    async with route_limiter.limit("recommandation"):
+        return await run_inference(recommander, offre)
+
 def recommander(offre: Job):
     """
     Génère des recommandations de candidats pour une offre d'emploi
@@ -1290,7 +1607,7 @@ def recommander(offre: Job):
             raise HTTPException(status_code=500, detail="Base de données non disponible")
         
         # Récupération des candidats
-        candidats = list(db.candidates.find({}))
+        candidats = repository.list_matching_candidates()
         if not candidats:
             return {
                 "message": "Aucun candidat disponible pour la recommandation.",
@@ -1301,48 +1618,25 @@ def recommander(offre: Job):
 
         recommandations = []
         
-        # Analyser chaque candidat avec le moteur IA
-        for candidat in candidats:
-            try:
-                # Convertir ObjectId en string pour la sérialisation
-                candidat_id = str(candidat["_id"])
-                
-                # Préparer les données du candidat
-                candidat_data = {
-                    "_id": candidat_id,
-                    "firstName": candidat.get("firstName", ""),
-                    "lastName": candidat.get("lastName", ""),
-                    "email": candidat.get("email", ""),
-                    "experienceYears": candidat.get("experienceYears", 0),
-                    "skills": candidat.get("skills", []),
-                    "education": candidat.get("education", []),
-                    "resumeText": candidat.get("resumeText", "")
-                }
-                
-                # Utiliser le moteur IA existant pour le matching
-                matching_result = ai_engine.match_candidates_job(candidat_data, offre.dict())
-                
-                recommandations.append({
-                    "candidat_id": candidat_id,
-                    "nom": f"{candidat.get('firstName', '')} {candidat.get('lastName', '')}".strip(),
-                    "email": candidat.get("email", ""),
-                    "score_final": matching_result["overall_score"],
-                    "skill_score": matching_result["skill_score"],
-                    "experience_score": matching_result["experience_score"],
-                    "education_score": matching_result["education_score"],
-                    "matching_skills": matching_result["matching_skills"],
-                    "missing_skills": matching_result["missing_skills"][:3],  # Limiter à 3
-                    "strengths": matching_result["strengths"],
-                    "weaknesses": matching_result["weaknesses"],
-                    "recommandation": matching_result["recommendation"]
-                })
-                
-            except Exception as e:
-                logger.error(f"Erreur matching candidat {candidat.get('_id')}: {e}")
-                continue
-
-        # Trier par score décroissant
-        recommandations.sort(key=lambda x: x["score_final"], reverse=True)
+        # Matching vectorisé : seuls les 10 meilleurs reçoivent l'analyse détaillée
+        matching_results = ai_engine.batch_match_candidates_job(candidats, offre.dict(), top_k=10)
+        
+        for matching_result in matching_results:
+            candidat = candidats[matching_result["index"]]
+            recommandations.append({
+                "candidat_id": str(candidat["_id"]),
+                "nom": f"{candidat.get('firstName', '')} {candidat.get('lastName', '')}".strip(),
+                "email": candidat.get("email", ""),
+                "score_final": matching_result["overall_score"],
+                "skill_score": matching_result["skill_score"],
+                "experience_score": matching_result["experience_score"],
+                "education_score": matching_result["education_score"],
+                "matching_skills": matching_result["matching_skills"],
+                "missing_skills": matching_result["missing_skills"][:3],  # Limiter à 3
+                "strengths": matching_result["strengths"],
+                "weaknesses": matching_result["weaknesses"],
+                "recommandation": matching_result["recommendation"]
+            })
 
         # Préparer l'ID de l'offre
         offre_id = "new"
@@ -1351,28 +1645,28 @@ def recommander(offre: Job):
         elif hasattr(offre, 'id') and offre.id:
             offre_id = str(offre.id)
 
-        # Sauvegarder l'historique des top 5 recommandations
-        for rec in recommandations[:5]:
-            db.historique_recommandations.insert_one({
-                "offre_id": offre_id,
-                "offre_titre": offre.title,
-                "candidat_id": rec["candidat_id"],
-                "candidat_nom": rec["nom"],
-                "score_final": rec["score_final"],
-                "details_matching": {
-                    "skill_score": rec.get("skill_score", 0),
-                    "experience_score": rec.get("experience_score", 0),
-                    "education_score": rec.get("education_score", 0)
-                },
-                "timestamp": datetime.utcnow()
-            })
+        # Sauvegarder l'historique des top 5 recommandations (une seule écriture en lot)
+        timestamp = datetime.utcnow()
+        repository.insert_recommendation_history({
+            "offre_id": offre_id,
+            "offre_titre": offre.title,
+            "candidat_id": rec["candidat_id"],
+            "candidat_nom": rec["nom"],
+            "score_final": rec["score_final"],
+            "details_matching": {
+                "skill_score": rec.get("skill_score", 0),
+                "experience_score": rec.get("experience_score", 0),
+                "education_score": rec.get("education_score", 0)
+            },
+            "timestamp": timestamp
+        } for rec in recommandations[:5])
 
         return {
             "offre_id": offre_id,
             "poste": offre.title,
             "company": getattr(offre, 'company', 'Non spécifiée'),
             "total_candidats": len(candidats),
-            "candidats_analyses": len(recommandations),
+            "candidats_analyses": len(candidats),
             "top_candidats": recommandations[:10],
             "status": "success"
         }
@@ -1390,7 +1684,7 @@ async def get_candidate_analysis(candidate_id: str):
         if not is_valid_objectid(candidate_id):
             raise HTTPException(status_code=400, detail="ID de candidat invalide")
             
-        candidate = db.candidates.find_one({"_id": ObjectId(candidate_id)})
+        candidate = await run_db(repository.get_candidate, candidate_id, EMBEDDING_PROJECTION)
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidat non trouvé")
         
@@ -1417,14 +1711,14 @@ async def health_advanced():
     """
     try:
         # Vérification de la base de données
-        db.command('ping')
+        await run_db(repository.ping)
         db_status = "connected"
         
         # Vérification des modèles IA
         ai_status = "healthy"
         try:
             # Test du moteur IA avec un texte simple
-            test_skills = ai_engine.extract_skills_from_text("Python Java JavaScript")
+            test_skills = await run_inference(ai_engine.extract_skills_from_text, "Python Java JavaScript")
             if len(test_skills) == 0:
                 ai_status = "warning: skill extraction test failed"
         except Exception as e:
@@ -1456,13 +1750,44 @@ async def health_advanced():
             timestamp=datetime.utcnow().isoformat()
         )
 
+@app.get("/api/models/status")
+def models_status():
+    """État des modèles IA : chargé, temps de chargement, mémoire"""
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Registre des modèles non disponible")
+    return {
+        "models": model_registry.stats(),
+        "preload": PRELOAD_MODELS,
+        "route_limits": route_limiter.stats(),
+        "batching": inference_batcher.stats(),
+        "languagetool": languagetool.status(),
+        "status": "success"
+    }
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Compteurs du cache des analyseurs (succès, échecs, éviction)"""
+    return {"cache": memoization.stats(), "status": "success"}
+
+@app.get("/api/ingestion/{task_id}")
+def ingestion_status(task_id: str):
+    """État d'une tâche d'ingestion de CV et de chacune de ses étapes"""
+    if ingestion_queue is None:
+        raise HTTPException(status_code=503, detail="File d'ingestion non disponible")
+    task = ingestion_queue.status(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Tâche d'ingestion non trouvée")
+    task = convert_objectid(task)
+    task["queue"] = {"pending": ingestion_queue.pending, "max_pending": ingestion_queue.max_pending}
+    return task
+
 @app.post("/api/extract-experience")
 async def extract_experience_from_text(text: str = Form(...)):
     """
     Extrait les années d'expérience d'un texte de CV
     """
     try:
-        experience_years = ai_engine.extract_experience(text)
+        experience_years = await run_inference(ai_engine.extract_experience, text)
         
         return {
             "extracted_experience": experience_years,
@@ -1480,7 +1805,7 @@ async def calculate_text_similarity(text1: str = Form(...), text2: str = Form(..
     Calcule la similarité cosinus entre deux textes
     """
     try:
-        similarity_score = ai_engine.calculate_similarity(text1, text2)
+        similarity_score = await run_inference(ai_engine.calculate_similarity, text1, text2)
         
         return {
             "similarity_score": similarity_score,
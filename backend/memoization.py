@@ -0,0 +1,248 @@
+# memoization.py
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration
+# ======================================================
+MEMO_ENABLED = os.getenv("MEMO_ENABLED", "1") != "0"
+# Budget mémoire du niveau local (taille des résultats sérialisés)
+MEMO_MAX_BYTES = int(os.getenv("MEMO_MAX_BYTES", str(64 * 1024 * 1024)))
+# Niveau partagé entre processus : "" (aucun), "mongo" ou "disk"
+MEMO_SHARED_BACKEND = os.getenv("MEMO_SHARED_BACKEND", "").lower()
+MEMO_TTL_SECONDS = int(os.getenv("MEMO_TTL_SECONDS", str(7 * 24 * 3600)))
+MEMO_DISK_DIR = os.getenv("MEMO_DISK_DIR", os.path.join(tempfile.gettempdir(), "ai_project_memo"))
+MEMO_COLLECTION = "memo_cache"
+
+
+# ======================================================
+# 🧠 Niveau 1 : LRU en mémoire, éviction par taille
+# ======================================================
+class LRUTier:
+    """Résultats stockés sérialisés : chaque lecture rend une copie indépendante"""
+
+    def __init__(self, max_bytes: int = MEMO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes,
+                "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+# ======================================================
+# 🗄️ Niveau 2 (optionnel) : MongoDB ou disque, avec TTL
+# ======================================================
+class MongoTier:
+    name = "mongo"
+
+    def __init__(self):
+        self._indexed = False
+
+    def _collection(self):
+        import repository
+        collection = repository.get_db()[MEMO_COLLECTION]
+        if not self._indexed:
+            # Purge des entrées expirées par le moniteur TTL de MongoDB
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def get(self, key: str) -> Optional[bytes]:
+        doc = self._collection().find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"payload": 1})
+        return doc["payload"] if doc else None
+
+    def put(self, key: str, payload: bytes, ttl: int):
+        self._collection().replace_one(
+            {"_id": key},
+            {"payload": payload, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+
+class DiskTier:
+    name = "disk"
+
+    def __init__(self, directory: str = MEMO_DISK_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at = float(f.readline())
+                if expires_at < time.time():
+                    return None
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, payload: bytes, ttl: int):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(f"{time.time() + ttl}\n".encode())
+            f.write(payload)
+        os.replace(temp_path, path)
+
+
+def _build_shared_tier():
+    if MEMO_SHARED_BACKEND == "mongo":
+        return MongoTier()
+    if MEMO_SHARED_BACKEND == "disk":
+        return DiskTier()
+    return None
+
+
+memory_tier = LRUTier()
+shared_tier = _build_shared_tier()
+_counters: Dict[str, Dict[str, int]] = {}
+
+
+def _count(namespace: str, event: str):
+    counters = _counters.setdefault(namespace, {"hits": 0, "shared_hits": 0, "misses": 0, "uncacheable": 0})
+    counters[event] += 1
+
+
+def make_key(namespace: str, version: str, arguments: Dict[str, Any]) -> str:
+    """Empreinte SHA-256 des arguments (JSON canonique) et de la version de l'analyseur"""
+    canonical = json.dumps([namespace, version, arguments], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ======================================================
+# 🎯 Décorateur
+# ======================================================
+def memoize(
+    namespace: str,
+    version: Union[str, Callable[[], str]] = "1",
+    ttl: int = MEMO_TTL_SECONDS,
+    cache_if: Optional[Callable[[Any], bool]] = None,
+    shared: bool = True,
+    method: bool = False,
+):
+    """
+    Met en cache le résultat d'une fonction d'analyse, par empreinte de ses
+    arguments et de `version` (chaîne ou fonction, évaluée à chaque appel :
+    version du modèle, backend...). Les exceptions et les résultats refusés
+    par `cache_if` ne sont pas mis en cache ; `method=True` ignore `self`.
+    Le résultat rendu est toujours la forme relue du JSON stocké (listes au
+    lieu de tuples, clés en chaînes), qu'il vienne du cache ou non.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not MEMO_ENABLED:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if method:
+                arguments.pop(next(iter(signature.parameters)))
+            try:
+                key = make_key(namespace, version() if callable(version) else version, arguments)
+            except TypeError:
+                _count(namespace, "uncacheable")
+                return func(*args, **kwargs)
+
+            payload = memory_tier.get(key)
+            if payload is not None:
+                _count(namespace, "hits")
+                return json.loads(payload)
+            if shared and shared_tier is not None:
+                try:
+                    payload = shared_tier.get(key)
+                except Exception as e:
+                    logger.warning(f"Cache partagé indisponible ({e})")
+                if payload is not None:
+                    _count(namespace, "shared_hits")
+                    memory_tier.put(key, payload)
+                    return json.loads(payload)
+
+            _count(namespace, "misses")
+            result = func(*args, **kwargs)
+            if cache_if is not None and not cache_if(result):
+                return result
+            try:
+                payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            except (TypeError, ValueError):
+                _count(namespace, "uncacheable")
+                return result
+            memory_tier.put(key, payload)
+            if shared and shared_tier is not None:
+                try:
+                    shared_tier.put(key, payload, ttl)
+                except Exception as e:
+                    logger.warning(f"Écriture dans le cache partagé impossible ({e})")
+            return json.loads(payload)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def stats() -> Dict[str, Any]:
+    namespaces = {}
+    for namespace, counters in _counters.items():
+        lookups = counters["hits"] + counters["shared_hits"] + counters["misses"]
+        hit_rate = (counters["hits"] + counters["shared_hits"]) / lookups if lookups else 0
+        namespaces[namespace] = dict(counters, hit_rate=round(hit_rate, 3))
+    return {
+        "enabled": MEMO_ENABLED,
+        "memory": memory_tier.stats(),
+        "shared_backend": shared_tier.name if shared_tier is not None else None,
+        "namespaces": namespaces,
+    }
+
+
+def clear():
+    memory_tier.clear()
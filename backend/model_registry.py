@@ -0,0 +1,253 @@
+# model_registry.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Modèles à précharger en arrière-plan au démarrage (ex: "minilm,spacy_fr")
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "").split(",") if m.strip()]
+# Délai avant une nouvelle tentative après un échec de chargement (hors ligne,
+# poids manquants...) : les appels intermédiaires échouent immédiatement
+MODEL_RETRY_INTERVAL = float(os.getenv("MODEL_RETRY_INTERVAL", "300"))
+
+
+class ModelUnavailable(RuntimeError):
+    """Chargement du modèle en échec récent, nouvelle tentative différée"""
+
+
+def _rss_mb() -> Optional[float]:
+    if psutil is None:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+def _parameter_memory_mb(instance: Any) -> Optional[float]:
+    """Taille des poids torch d'un modèle, d'un pipeline ou d'un tuple (processor, model)"""
+    candidates = list(instance) if isinstance(instance, tuple) else [instance]
+    total, found = 0, False
+    for obj in candidates:
+        model = getattr(obj, "model", obj)
+        if hasattr(model, "parameters"):
+            try:
+                total += sum(p.numel() * p.element_size() for p in model.parameters())
+                found = True
+            except Exception:
+                pass
+    return round(total / (1024 * 1024), 1) if found else None
+
+
+class ModelRegistry:
+    """
+    Registre central des modèles : chaque modèle est chargé à la première
+    utilisation, une seule instance par identifiant et par processus. Un
+    échec est mémorisé et n'est retenté qu'après MODEL_RETRY_INTERVAL.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, model_id: str, loader: Callable[[], Any], description: str = ""):
+        with self._registry_lock:
+            self._loaders[model_id] = loader
+            self._descriptions[model_id] = description
+            self._locks.setdefault(model_id, threading.Lock())
+            self._stats.setdefault(model_id, {"loaded": False})
+
+    def is_loaded(self, model_id: str) -> bool:
+        return model_id in self._instances
+
+    def _check_backoff(self, model_id: str):
+        failed_at = self._failed_at.get(model_id)
+        if failed_at is not None and time.monotonic() - failed_at < MODEL_RETRY_INTERVAL:
+            raise ModelUnavailable(f"Modèle {model_id} indisponible: {self._stats[model_id].get('error')}")
+
+    def get(self, model_id: str) -> Any:
+        """Retourne le modèle, en le chargeant au premier appel"""
+        instance = self._instances.get(model_id)
+        if instance is not None:
+            return instance
+        if model_id not in self._loaders:
+            raise KeyError(f"Modèle inconnu: {model_id}")
+        self._check_backoff(model_id)
+
+        with self._locks[model_id]:
+            instance = self._instances.get(model_id)
+            if instance is not None:
+                return instance
+            # Un autre thread vient peut-être d'échouer pendant l'attente du verrou
+            self._check_backoff(model_id)
+
+            logger.info(f"🚀 Chargement du modèle {model_id}...")
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            try:
+                instance = self._loaders[model_id]()
+            except Exception as e:
+                failures = self._stats[model_id].get("failures", 0) + 1
+                self._failed_at[model_id] = time.monotonic()
+                self._stats[model_id] = {"loaded": False, "error": str(e), "failures": failures,
+                                         "failed_at": time.time()}
+                logger.error(f"❌ Erreur chargement du modèle {model_id}: {e} "
+                             f"(nouvelle tentative dans {MODEL_RETRY_INTERVAL:.0f}s)")
+                raise
+            load_time = time.perf_counter() - start
+            rss_after = _rss_mb()
+
+            self._instances[model_id] = instance
+            self._failed_at.pop(model_id, None)
+            self._stats[model_id] = {
+                "loaded": True,
+                "load_time_s": round(load_time, 2),
+                "parameters_mb": _parameter_memory_mb(instance),
+                "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+            }
+            logger.info(f"✅ Modèle {model_id} chargé en {load_time:.1f}s")
+            return instance
+
+    def get_or_none(self, model_id: str) -> Any:
+        """Comme get(), mais retourne None si le chargement échoue"""
+        try:
+            return self.get(model_id)
+        except Exception:
+            return None
+
+    def preload(self, model_ids: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+        """Précharge une liste de modèles, par défaut dans un thread d'arrière-plan"""
+        model_ids = [m for m in model_ids if m in self._loaders]
+        if not model_ids:
+            return None
+
+        def load_all():
+            for model_id in model_ids:
+                self.get_or_none(model_id)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """État, temps de chargement et mémoire de chaque modèle (et délai avant nouvelle tentative)"""
+        result = {}
+        for model_id in self._loaders:
+            entry = dict(self._stats.get(model_id, {}), description=self._descriptions.get(model_id, ""))
+            failed_at = self._failed_at.get(model_id)
+            if failed_at is not None:
+                entry["retry_in_s"] = round(max(0.0, MODEL_RETRY_INTERVAL - (time.monotonic() - failed_at)), 1)
+            result[model_id] = entry
+        return result
+
+    def model_ids(self) -> List[str]:
+        return list(self._loaders)
+
+
+registry = ModelRegistry()
+
+
+# ======================================================
+# 🧠 Déclaration des modèles (imports lourds dans les loaders)
+# ======================================================
+# MiniLM, DistilBERT SST-2 et BERT NER peuvent tourner sur onnxruntime
+# (INFERENCE_BACKEND=onnx) ; repli automatique sur torch en cas d'échec
+def _load_minilm():
+    from sentence_transformers import SentenceTransformer
+    from embedding_store import EMBEDDING_MODEL_NAME
+    from onnx_backend import OrtSentenceEncoder, with_onnx
+    return with_onnx(
+        lambda: OrtSentenceEncoder(f"sentence-transformers/{EMBEDDING_MODEL_NAME}", max_seq_length=256, normalize=True),
+        lambda: SentenceTransformer(EMBEDDING_MODEL_NAME),
+        "minilm",
+    )
+
+
+def _load_minilm_multilingual():
+    from sentence_transformers import SentenceTransformer
+    from onnx_backend import OrtSentenceEncoder, with_onnx
+    return with_onnx(
+        lambda: OrtSentenceEncoder("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", max_seq_length=128),
+        lambda: SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2"),
+        "minilm_multilingual",
+    )
+
+
+def _load_sst2():
+    from transformers import pipeline
+    from onnx_backend import ort_pipeline, with_onnx
+    model_name = "distilbert-base-uncased-finetuned-sst-2-english"
+    return with_onnx(
+        lambda: ort_pipeline("text-classification", model_name),
+        lambda: pipeline("text-classification", model=model_name),
+        "sst2_engagement",
+    )
+
+
+def _load_bert_ner():
+    from transformers import pipeline
+    from onnx_backend import ort_pipeline, with_onnx
+    return with_onnx(
+        lambda: ort_pipeline("ner", "dslim/bert-base-NER", grouped_entities=True),
+        lambda: pipeline("ner", model="dslim/bert-base-NER", grouped_entities=True),
+        "bert_ner",
+    )
+
+
+def _load_bart_mnli():
+    from transformers import pipeline
+    return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+
+
+def _load_trocr():
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+    return (
+        TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed"),
+        VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed"),
+    )
+
+
+def _load_forgery_detector():
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+    return (
+        AutoImageProcessor.from_pretrained("umm-maybe/ai-image-detector"),
+        AutoModelForImageClassification.from_pretrained("umm-maybe/ai-image-detector"),
+    )
+
+
+def _load_nlptown_sentiment():
+    from transformers import pipeline
+    return pipeline(
+        "sentiment-analysis",
+        model="nlptown/bert-base-multilingual-uncased-sentiment",
+        tokenizer="nlptown/bert-base-multilingual-uncased-sentiment",
+    )
+
+
+def _load_spacy_fr():
+    import spacy
+    return spacy.load("fr_core_news_sm")
+
+
+registry.register("minilm", _load_minilm, "all-MiniLM-L6-v2 (scoring, similarité)")
+registry.register("minilm_multilingual", _load_minilm_multilingual, "paraphrase-multilingual-MiniLM-L12-v2 (cv_matching)")
+registry.register("sst2_engagement", _load_sst2, "DistilBERT SST-2 (engagement)")
+registry.register("bert_ner", _load_bert_ner, "dslim/bert-base-NER (cv_parser)")
+registry.register("bart_mnli", _load_bart_mnli, "facebook/bart-large-mnli (fraud_detector)")
+registry.register("trocr", _load_trocr, "microsoft/trocr-base-printed (OCR)")
+registry.register("forgery_detector", _load_forgery_detector, "umm-maybe/ai-image-detector")
+registry.register("nlptown_sentiment", _load_nlptown_sentiment, "nlptown sentiment BERT")
+registry.register("spacy_fr", _load_spacy_fr, "spaCy fr_core_news_sm")
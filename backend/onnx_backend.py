@@ -0,0 +1,190 @@
+# onnx_backend.py
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration du backend d'inférence
+# ======================================================
+# "torch" (défaut) ou "onnx" : MiniLM, DistilBERT SST-2 et BERT NER via onnxruntime
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+# Graphes exportés, réutilisés d'un démarrage à l'autre
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_cache"))
+# Quantification int8 dynamique des poids (plus rapide, écart de quelques millièmes)
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "0") == "1"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 : choix d'onnxruntime
+# Écarts tolérés entre sorties torch et ONNX lors de la vérification à l'export
+ONNX_ATOL = float(os.getenv("ONNX_ATOL", "1e-3"))
+ONNX_MIN_COSINE = float(os.getenv("ONNX_MIN_COSINE", "0.99"))
+
+_VERIFY_TEXT = "Développeur Python senior, 5 ans d'expérience en FastAPI, MongoDB et machine learning."
+
+
+def onnx_enabled() -> bool:
+    return INFERENCE_BACKEND == "onnx"
+
+
+def embedding_version_tag() -> str:
+    """Suffixe de version des embeddings : les vecteurs int8 ne sont pas mélangés aux vecteurs torch"""
+    return "-onnx-int8" if onnx_enabled() and ONNX_QUANTIZE else ""
+
+
+def _session_options():
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_THREADS:
+        options.intra_op_num_threads = ONNX_THREADS
+    return options
+
+
+def _cache_dir(model_name: str, variant: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, re.sub(r"[^\w.-]", "_", model_name), variant)
+
+
+def _model_class(task: str):
+    from optimum.onnxruntime import (
+        ORTModelForFeatureExtraction,
+        ORTModelForSequenceClassification,
+        ORTModelForTokenClassification,
+    )
+    return {
+        "feature-extraction": ORTModelForFeatureExtraction,
+        "text-classification": ORTModelForSequenceClassification,
+        "ner": ORTModelForTokenClassification,
+    }[task]
+
+
+def _torch_model_class(task: str):
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoModelForTokenClassification
+    return {
+        "feature-extraction": AutoModel,
+        "text-classification": AutoModelForSequenceClassification,
+        "ner": AutoModelForTokenClassification,
+    }[task]
+
+
+# ======================================================
+# 📦 Export, quantification et vérification (une seule fois)
+# ======================================================
+def _verify(model_name: str, task: str, ort_model, tokenizer) -> Dict[str, float]:
+    """Compare les sorties ONNX à celles de torch sur un texte témoin"""
+    import torch
+
+    inputs = tokenizer(_VERIFY_TEXT, return_tensors="pt")
+    with torch.no_grad():
+        reference = _torch_model_class(task).from_pretrained(model_name)(**inputs)[0].numpy()
+    candidate = np.asarray(ort_model(**inputs)[0])
+    max_abs_diff = float(np.max(np.abs(reference - candidate)))
+    a, b = reference.ravel(), candidate.ravel()
+    cosine = float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+    report = {"max_abs_diff": round(max_abs_diff, 6), "cosine": round(cosine, 6)}
+    within = cosine >= ONNX_MIN_COSINE if ONNX_QUANTIZE else max_abs_diff <= ONNX_ATOL
+    if not within:
+        raise ValueError(f"Sorties ONNX hors tolérance pour {model_name}: {report}")
+    return report
+
+
+def _export(model_name: str, task: str, directory: str):
+    from transformers import AutoTokenizer
+
+    model_class = _model_class(task)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    logger.info(f"📦 Export ONNX de {model_name}...")
+    fp32_dir = _cache_dir(model_name, "fp32")
+    ort_model = model_class.from_pretrained(model_name, export=True)
+    ort_model.save_pretrained(fp32_dir)
+    tokenizer.save_pretrained(fp32_dir)
+
+    if ONNX_QUANTIZE:
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        quantizer = ORTQuantizer.from_pretrained(ort_model)
+        quantizer.quantize(save_dir=directory,
+                           quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False))
+        tokenizer.save_pretrained(directory)
+        ort_model = model_class.from_pretrained(directory, file_name="model_quantized.onnx")
+
+    report = _verify(model_name, task, ort_model, tokenizer)
+    with open(os.path.join(directory, "verified.json"), "w") as f:
+        json.dump(dict(report, model=model_name, quantized=ONNX_QUANTIZE), f)
+    logger.info(f"✅ Export ONNX de {model_name} vérifié: {report}")
+
+
+def load_ort_model(model_name: str, task: str):
+    """(modèle onnxruntime, tokenizer), exporté et vérifié au premier appel puis lu depuis le cache"""
+    from transformers import AutoTokenizer
+
+    directory = _cache_dir(model_name, "int8" if ONNX_QUANTIZE else "fp32")
+    if not os.path.exists(os.path.join(directory, "verified.json")):
+        _export(model_name, task, directory)
+    file_name = "model_quantized.onnx" if ONNX_QUANTIZE else "model.onnx"
+    ort_model = _model_class(task).from_pretrained(directory, file_name=file_name, session_options=_session_options())
+    return ort_model, AutoTokenizer.from_pretrained(directory)
+
+
+# ======================================================
+# 🧠 Équivalents onnxruntime des modèles torch
+# ======================================================
+def ort_pipeline(task: str, model_name: str, **kwargs):
+    """Pipeline transformers standard, exécuté par onnxruntime"""
+    from transformers import pipeline
+    ort_model, tokenizer = load_ort_model(model_name, task)
+    return pipeline(task, model=ort_model, tokenizer=tokenizer, **kwargs)
+
+
+class OrtSentenceEncoder:
+    """
+    Remplaçant de SentenceTransformer.encode pour les modèles MiniLM :
+    mean pooling sur le masque d'attention, normalisation optionnelle.
+    """
+
+    def __init__(self, model_name: str, max_seq_length: int = 256, normalize: bool = False):
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        # all-MiniLM-L6-v2 contient un module Normalize : toujours normalisé
+        self.normalize = normalize
+        self.model, self.tokenizer = load_ort_model(model_name, "feature-extraction")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_seq_length, return_tensors="np")
+        token_embeddings = np.asarray(self.model(**inputs)[0])
+        mask = inputs["attention_mask"][..., None].astype(token_embeddings.dtype)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               convert_to_tensor: bool = False, normalize_embeddings: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Tri par longueur comme sentence-transformers : moins de padding par lot
+        order = np.argsort([-len(t) for t in texts])
+        chunks = [self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+                  for start in range(0, len(texts), batch_size)]
+        embeddings = np.empty((len(texts), chunks[0].shape[1]), dtype=np.float32) if chunks else np.empty((0, 0))
+        if chunks:
+            embeddings[order] = np.concatenate(chunks)
+        if self.normalize or normalize_embeddings:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        result = embeddings[0] if single else embeddings
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(result)
+        return result
+
+
+def with_onnx(onnx_loader: Callable[[], Any], torch_loader: Callable[[], Any], model_id: str) -> Any:
+    """Charge la variante ONNX si configurée, sinon (ou en cas d'échec) la variante torch"""
+    if not onnx_enabled():
+        return torch_loader()
+    try:
+        return onnx_loader()
+    except Exception as e:
+        logger.warning(f"Backend ONNX indisponible pour {model_id} ({e}), repli sur torch")
+        return torch_loader()
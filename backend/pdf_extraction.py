@@ -0,0 +1,259 @@
+# pdf_extraction.py
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# 🔌 Backends optionnels (pypdf/PyPDF2 rapide, pdfplumber précis)
+# ======================================================
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        PdfReader = None
+
+# "auto" : pypdf si la première page donne du texte exploitable, sinon pdfplumber
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+# Nombre de pages à partir duquel l'extraction est parallélisée
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+# Pages envoyées ensemble à un worker (le PDF est rouvert une fois par paquet)
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "10"))
+# En dessous, le texte de la page sonde est jugé inexploitable par pypdf
+PDF_PROBE_MIN_CHARS = int(os.getenv("PDF_PROBE_MIN_CHARS", "50"))
+
+
+class PdfText(NamedTuple):
+    text: str
+    page_offsets: List[int]   # position de début de chaque page dans `text`
+    pages: int
+    backend: str
+    failed_pages: List[int]
+
+
+# ======================================================
+# 📄 Extraction d'un intervalle de pages (exécutée aussi dans les workers)
+# ======================================================
+def _extract_pages_pdfplumber(path: str, start: int, stop: int) -> List[str]:
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text() or "")
+            # Libère les objets de layout de la page dès qu'elle est traitée
+            if hasattr(page, "close"):
+                page.close()
+            else:
+                page.flush_cache()
+    return texts
+
+
+def _extract_pages_pypdf(path: str, start: int, stop: int) -> List[str]:
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, min(stop, len(reader.pages)))]
+
+
+def extract_pages(path: str, start: int, stop: int, backend: str) -> List[str]:
+    if backend == "pdfplumber":
+        return _extract_pages_pdfplumber(path, start, stop)
+    return _extract_pages_pypdf(path, start, stop)
+
+
+# ======================================================
+# ⚙️ Moteur
+# ======================================================
+def count_pages(path: str) -> int:
+    if PdfReader is not None:
+        return len(PdfReader(path).pages)
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def choose_backend(path: str, preferred: str = PDF_BACKEND) -> str:
+    """Backend le plus rapide donnant un texte exploitable pour ce document"""
+    if preferred == "pdfplumber" and pdfplumber is not None:
+        return "pdfplumber"
+    if preferred == "pypdf" and PdfReader is not None:
+        return "pypdf"
+    if PdfReader is None:
+        return "pdfplumber"
+    if pdfplumber is None:
+        return "pypdf"
+    try:
+        probe = _extract_pages_pypdf(path, 0, 1)
+        if probe and len(probe[0].strip()) >= PDF_PROBE_MIN_CHARS:
+            return "pypdf"
+    except Exception as e:
+        logger.warning(f"Sonde pypdf en échec, bascule sur pdfplumber: {e}")
+    return "pdfplumber"
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _recycle_executor(executor: ProcessPoolExecutor):
+    """
+    Remplace un pool dont un worker est bloqué sur une page : cancel() ne
+    stoppe pas un paquet déjà lancé, seuls l'arrêt et la recréation du
+    pool libèrent le worker.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    logger.warning("Pool d'extraction PDF recyclé après un délai dépassé")
+    executor.shutdown(wait=False, cancel_futures=True)
+    terminate = getattr(executor, "terminate_workers", None)   # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+
+def _extract_parallel(path: str, pages: int, backend: str, failed: List[int]) -> List[str]:
+    """Extraction par paquets de pages sur le pool de processus, avec délai par page"""
+    executor = _get_executor()
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, pages)) for start in range(0, pages, PDF_PAGES_PER_TASK)]
+    futures = [executor.submit(extract_pages, path, start, stop, backend) for start, stop in ranges]
+    texts: List[str] = []
+    hung = False
+    for (start, stop), future in zip(ranges, futures):
+        try:
+            texts.extend(future.result(timeout=PDF_PAGE_TIMEOUT * (stop - start)))
+        except FutureTimeoutError:
+            future.cancel()
+            hung = True
+            logger.warning(f"Délai dépassé pour les pages {start + 1}-{stop} de {path}")
+            failed.extend(range(start, stop))
+            texts.extend([""] * (stop - start))
+        except BrokenProcessPool:
+            # Pool recyclé par une autre extraction : paquet repris dans ce thread
+            try:
+                texts.extend(extract_pages(path, start, stop, backend))
+            except Exception as e:
+                logger.error(f"Erreur extraction des pages {start + 1}-{stop} de {path}: {e}")
+                failed.extend(range(start, stop))
+                texts.extend([""] * (stop - start))
+        except Exception as e:
+            logger.error(f"Erreur extraction des pages {start + 1}-{stop} de {path}: {e}")
+            failed.extend(range(start, stop))
+            texts.extend([""] * (stop - start))
+    if hung:
+        _recycle_executor(executor)
+    return texts
+
+
+def _extract_sequential(path: str, pages: int, backend: str, failed: List[int]) -> List[str]:
+    try:
+        return extract_pages(path, 0, pages, backend)
+    except Exception as e:
+        logger.error(f"Erreur extraction de {path}: {e}")
+        failed.extend(range(pages))
+        return [""] * pages
+
+
+def _join_pages(texts: List[str]):
+    parts, offsets, position = [], [], 0
+    for page_text in texts:
+        offsets.append(position)
+        page_text = page_text + "\n" if page_text else ""
+        parts.append(page_text)
+        position += len(page_text)
+    return "".join(parts), offsets
+
+
+def _other_backend(backend: str) -> Optional[str]:
+    if backend == "pypdf":
+        return "pdfplumber" if pdfplumber is not None else None
+    return "pypdf" if PdfReader is not None else None
+
+
+def _extract_with(path: str, pages: int, backend: str, parallel: bool) -> PdfText:
+    failed: List[int] = []
+    if parallel:
+        texts = _extract_parallel(path, pages, backend, failed)
+    else:
+        texts = _extract_sequential(path, pages, backend, failed)
+    text, offsets = _join_pages(texts)
+    return PdfText(text, offsets, pages, backend, failed)
+
+
+def extract_pdf_text(source, backend: str = PDF_BACKEND, parallel: Optional[bool] = None) -> PdfText:
+    """
+    Extrait le texte d'un PDF (chemin ou flux binaire) avec les positions
+    de début de chaque page. Au-delà de PDF_PARALLEL_MIN_PAGES pages, les
+    pages sont traitées en parallèle sur un pool de processus. Si le texte
+    obtenu est quasi vide, l'autre backend est essayé.
+    """
+    if PdfReader is None and pdfplumber is None:
+        raise ImportError("Aucun backend PDF disponible (pypdf, PyPDF2 ou pdfplumber)")
+
+    temp_path = None
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+    else:
+        # Flux (UploadFile.file, BytesIO...) : copié sur disque pour les workers
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as buffer:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            shutil.copyfileobj(source, buffer)
+        path = temp_path
+
+    try:
+        chosen = choose_backend(path, backend)
+        pages = count_pages(path)
+        if parallel is None:
+            parallel = pages >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1
+        result = _extract_with(path, pages, chosen, parallel)
+        other = _other_backend(chosen)
+        if len(result.text.strip()) < PDF_PROBE_MIN_CHARS and other is not None:
+            logger.info(f"Texte quasi vide avec {chosen} pour {path}, nouvel essai avec {other}")
+            retry = _extract_with(path, pages, other, parallel)
+            if len(retry.text.strip()) > len(result.text.strip()):
+                return retry
+        return result
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def extract_text(source, **kwargs) -> str:
+    """Texte seul du PDF"""
+    return extract_pdf_text(source, **kwargs).text
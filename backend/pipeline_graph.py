@@ -0,0 +1,151 @@
+# pipeline_graph.py
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Stage(NamedTuple):
+    """
+    Étape nommée : reçoit les valeurs de `requires` (dict) et retourne un
+    dict contenant `provides`. Une étape optionnelle peut être sautée à la
+    demande ; en cas de saut ou d'échec, `fallback` fournit ses sorties
+    (sinon les étapes qui en dépendent sont sautées à leur tour).
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    requires: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+    optional: bool = False
+    fallback: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+
+
+class GraphResult(NamedTuple):
+    values: Dict[str, Any]
+    report: Dict[str, Dict[str, Any]]   # statut et durées par étape
+    total_ms: float
+
+
+Runner = Callable[..., Awaitable[Any]]
+
+
+async def _default_runner(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+class StageGraph:
+    """
+    Petit DAG d'étapes : chaque étape démarre dès que ses entrées sont
+    disponibles, les étapes indépendantes s'exécutent en parallèle (les
+    fonctions synchrones sur l'exécuteur fourni). La latence totale est
+    celle du chemin critique.
+    """
+
+    def __init__(self, stages: Iterable[Stage], inputs: Iterable[str] = ()):
+        self.stages = {stage.name: stage for stage in stages}
+        self.inputs = set(inputs)
+        self._validate()
+
+    def _validate(self):
+        producers: Dict[str, str] = {}
+        for stage in self.stages.values():
+            for key in stage.provides:
+                if key in producers or key in self.inputs:
+                    raise ValueError(f"'{key}' produit par plusieurs sources ({stage.name})")
+                producers[key] = stage.name
+        for stage in self.stages.values():
+            missing = [key for key in stage.requires if key not in producers and key not in self.inputs]
+            if missing:
+                raise ValueError(f"Étape {stage.name}: entrées sans producteur {missing}")
+
+        # Détection de cycle (tri topologique)
+        available, pending = set(self.inputs), dict(self.stages)
+        while pending:
+            ready = [name for name, stage in pending.items() if set(stage.requires) <= available]
+            if not ready:
+                raise ValueError(f"Cycle entre les étapes {sorted(pending)}")
+            for name in ready:
+                available.update(pending.pop(name).provides)
+
+    def optional_stages(self) -> List[str]:
+        return [name for name, stage in self.stages.items() if stage.optional]
+
+    async def run(self, inputs: Dict[str, Any], skip: Iterable[str] = (), runner: Optional[Runner] = None) -> GraphResult:
+        skip = set(skip)
+        unknown = skip - set(self.optional_stages())
+        if unknown:
+            raise ValueError(f"Étapes non optionnelles ou inconnues: {sorted(unknown)}")
+        runner = runner or _default_runner
+
+        values = dict(inputs)
+        report: Dict[str, Dict[str, Any]] = {}
+        resolved: Dict[str, asyncio.Event] = {key: asyncio.Event() for s in self.stages.values() for key in s.provides}
+        for key in values:
+            if key in resolved:
+                resolved[key].set()
+        missing: set = set()
+        origin = time.perf_counter()
+
+        def publish(stage: Stage, outputs: Optional[Dict[str, Any]]):
+            for key in stage.provides:
+                if outputs is not None and key in outputs:
+                    values[key] = outputs[key]
+                else:
+                    missing.add(key)
+                resolved[key].set()
+
+        def mark(stage: Stage, status: str, started: float, **extra):
+            report[stage.name] = dict(
+                status=status,
+                start_ms=round((started - origin) * 1000, 1),
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                **extra,
+            )
+
+        def skip_stage(stage: Stage, started: float, reason: str):
+            publish(stage, stage.fallback(values) if stage.fallback else None)
+            mark(stage, "skipped", started, reason=reason)
+
+        async def execute(stage: Stage):
+            # Étape sautée à la demande : ses dépendants n'attendent pas ses entrées
+            if stage.name in skip:
+                skip_stage(stage, time.perf_counter(), "demandé")
+                return
+            for key in stage.requires:
+                if key in resolved:
+                    await resolved[key].wait()
+            started = time.perf_counter()
+            absent = [key for key in stage.requires if key in missing]
+            if absent:
+                skip_stage(stage, started, f"entrées absentes {absent}")
+                return
+
+            context = {key: values[key] for key in stage.requires}
+            try:
+                if inspect.iscoroutinefunction(stage.func):
+                    outputs = await stage.func(context)
+                else:
+                    outputs = await runner(stage.func, context)
+            except Exception as e:
+                if not stage.optional:
+                    mark(stage, "failed", started, error=str(e))
+                    publish(stage, None)
+                    raise
+                logger.warning(f"Étape optionnelle {stage.name} en échec: {e}")
+                publish(stage, stage.fallback(values) if stage.fallback else None)
+                mark(stage, "failed", started, error=str(e))
+                return
+            publish(stage, outputs)
+            mark(stage, "done", started)
+
+        tasks = [asyncio.ensure_future(execute(stage)) for stage in self.stages.values()]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        return GraphResult(values, report, round((time.perf_counter() - origin) * 1000, 1))
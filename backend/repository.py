@@ -0,0 +1,545 @@
+# repository.py
+import base64
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, InsertOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration du client MongoDB (partagé, avec pool)
+# ======================================================
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.getenv("MONGO_DB", "recruit_ai")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# Écritures en lot : taille des paquets et write concern (w=1 par défaut,
+# "majority" pour plus de durabilité, 0 pour ne pas attendre l'acquittement)
+MONGO_BULK_CHUNK_SIZE = int(os.getenv("MONGO_BULK_CHUNK_SIZE", "1000"))
+MONGO_BULK_WRITE_CONCERN = os.getenv("MONGO_BULK_WRITE_CONCERN", "1")
+MONGO_BULK_JOURNAL = os.getenv("MONGO_BULK_JOURNAL", "false").lower() == "true"
+
+# Les vecteurs d'embedding (binaire) ne sont jamais renvoyés au client
+EMBEDDING_PROJECTION = {"embedding": 0}
+
+# Champs nécessaires au matching en lot
+MATCHING_PROJECTION = {
+    "firstName": 1, "lastName": 1, "email": 1, "experienceYears": 1,
+    "skills": 1, "education": 1, "resumeText": 1
+}
+
+Id = Union[str, ObjectId]
+Projection = Optional[Mapping[str, Any]]
+
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    """
+    Client MongoDB unique par processus. pymongo n'est pas fork-safe :
+    un processus enfant (worker d'ingestion) recrée son propre client.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            )
+            _client_pid = pid
+            logger.info(f"Client MongoDB initialisé (pool max {MONGO_MAX_POOL_SIZE})")
+        return _client
+
+
+def get_db(db_name: str = MONGO_DB):
+    return get_client()[db_name]
+
+
+def close_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client, _client_pid = None, None
+
+
+def to_object_id(value: Id) -> ObjectId:
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+# ======================================================
+# 📦 Écritures en lot
+# ======================================================
+def bulk_write_concern() -> WriteConcern:
+    w = MONGO_BULK_WRITE_CONCERN
+    w = int(w) if w.isdigit() else w
+    # Le journal n'a pas de sens sans acquittement (w=0)
+    return WriteConcern(w=w, j=MONGO_BULK_JOURNAL if w != 0 else None)
+
+
+class BulkWriter:
+    """
+    Accumule des opérations (InsertOne, UpdateOne...) et les envoie par
+    paquets avec bulk_write(ordered=False) : un aller-retour par paquet au
+    lieu d'un par document. Une erreur sur un document n'arrête pas le lot :
+    les opérations refusées sont comptées et conservées dans `failed`.
+    """
+
+    def __init__(self, collection, chunk_size: int = MONGO_BULK_CHUNK_SIZE,
+                 write_concern: Optional[WriteConcern] = None):
+        self.collection = collection.with_options(write_concern=write_concern or bulk_write_concern())
+        self.chunk_size = max(1, chunk_size)
+        self._operations: List[Any] = []
+        self.stats = {"inserted": 0, "upserted": 0, "modified": 0, "errors": 0, "requests": 0}
+        self.failed: List[Any] = []
+
+    def add(self, operation):
+        self._operations.append(operation)
+        if len(self._operations) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, operations: Iterable[Any]):
+        for operation in operations:
+            self.add(operation)
+
+    def flush(self):
+        if not self._operations:
+            return
+        operations, self._operations = self._operations, []
+        self.stats["requests"] += 1
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            details = e.details or {}
+            self.stats["inserted"] += details.get("nInserted", 0)
+            self.stats["upserted"] += details.get("nUpserted", 0)
+            self.stats["modified"] += details.get("nModified", 0)
+            self.stats["errors"] += len(details.get("writeErrors", []))
+            self.failed.extend(operations[error["index"]] for error in details.get("writeErrors", []))
+            logger.error(f"Écriture en lot partielle sur {self.collection.name}: "
+                         f"{len(details.get('writeErrors', []))} erreurs")
+            return
+        if result.acknowledged:
+            self.stats["inserted"] += result.inserted_count
+            self.stats["upserted"] += result.upserted_count
+            self.stats["modified"] += result.modified_count
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.flush()
+        return False
+
+
+# ======================================================
+# 👤 Candidats et offres
+# ======================================================
+def get_candidate(candidate_id: Id, projection: Projection = EMBEDDING_PROJECTION) -> Optional[Dict[str, Any]]:
+    return get_db().candidates.find_one({"_id": to_object_id(candidate_id)}, projection)
+
+
+def get_job(job_id: Id, projection: Projection = EMBEDDING_PROJECTION) -> Optional[Dict[str, Any]]:
+    return get_db().jobs.find_one({"_id": to_object_id(job_id)}, projection)
+
+
+def find_candidates(query: Optional[Mapping[str, Any]] = None, projection: Projection = EMBEDDING_PROJECTION,
+                    limit: int = 0, sort: Optional[List[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+    cursor = get_db().candidates.find(query or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def find_jobs(query: Optional[Mapping[str, Any]] = None, projection: Projection = EMBEDDING_PROJECTION,
+              limit: int = 0) -> List[Dict[str, Any]]:
+    cursor = get_db().jobs.find(query or {}, projection)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def list_matching_candidates() -> List[Dict[str, Any]]:
+    """Tous les candidats, réduits aux champs du matching en lot"""
+    return find_candidates({}, MATCHING_PROJECTION)
+
+
+def list_screened_candidates(limit: int = 10) -> List[Dict[str, Any]]:
+    """Candidats déjà classés par le screening, les plus confiants d'abord"""
+    return find_candidates({"screening_classification": {"$exists": True}},
+                           sort=[("screening_classification.confidence", DESCENDING)], limit=limit)
+
+
+def iter_corpus_texts() -> Iterable[str]:
+    """Textes du corpus TF-IDF : CV des candidats puis titre et description des offres"""
+    db = get_db()
+    for candidate in db.candidates.find({}, {"resumeText": 1}):
+        yield candidate.get("resumeText", "")
+    for job in db.jobs.find({}, {"title": 1, "description": 1}):
+        yield f"{job.get('title', '')} {job.get('description', '')}"
+
+
+def insert_candidate(candidate: Dict[str, Any]) -> str:
+    return str(get_db().candidates.insert_one(candidate).inserted_id)
+
+
+def insert_job(job: Dict[str, Any]) -> str:
+    return str(get_db().jobs.insert_one(job).inserted_id)
+
+
+def update_candidate(candidate_id: Id, fields: Mapping[str, Any]) -> bool:
+    result = get_db().candidates.update_one({"_id": to_object_id(candidate_id)}, {"$set": dict(fields)})
+    return result.matched_count > 0
+
+
+def update_job(job_id: Id, fields: Mapping[str, Any]) -> bool:
+    result = get_db().jobs.update_one({"_id": to_object_id(job_id)}, {"$set": dict(fields)})
+    return result.matched_count > 0
+
+
+def find_analyzed_candidate(content_hash: str, analyzer_version: str,
+                            projection: Projection = EMBEDDING_PROJECTION) -> Optional[Dict[str, Any]]:
+    """
+    Candidat dont le CV (même empreinte SHA-256) a déjà été entièrement
+    analysé avec la même version d'analyseur
+    """
+    return get_db().candidates.find_one({
+        "content_hash": content_hash,
+        "analyzer_version": analyzer_version,
+        "$or": [{"ingestion": {"$exists": False}}, {"ingestion.status": "done"}],
+    }, projection)
+
+
+def delete_candidate(candidate_id: Id) -> bool:
+    deleted = get_db().candidates.delete_one({"_id": to_object_id(candidate_id)}).deleted_count > 0
+    if deleted:
+        delete_scores_for_candidate(candidate_id)
+    return deleted
+
+
+# ======================================================
+# 📥 Tâches d'ingestion
+# ======================================================
+def get_ingestion_task(task_id: str, projection: Projection = None) -> Optional[Dict[str, Any]]:
+    return get_db().ingestion_tasks.find_one({"_id": task_id}, projection)
+
+
+# ======================================================
+# 📊 Scores candidat / offre (collection match_scores)
+# ======================================================
+# Un document par couple (job_id, candidate_id) ; l'index composé
+# (job_id, score desc, candidate_id desc) sert le top-K par offre et la
+# pagination par curseur en lecture d'intervalle d'index.
+MATCH_SCORES = "match_scores"
+DEFAULT_SCORE_MODEL = "ai_engine"
+DEFAULT_SCORE_MODEL_VERSION = "1"
+
+
+def match_scores():
+    return get_db()[MATCH_SCORES]
+
+
+def ensure_indexes():
+    """Crée les index des scores, de déduplication des CV et des baux d'ingestion (idempotent)"""
+    collection = match_scores()
+    collection.create_index([("job_id", ASCENDING), ("candidate_id", ASCENDING)], unique=True,
+                            name="job_candidate_unique")
+    collection.create_index([("job_id", ASCENDING), ("score", DESCENDING), ("candidate_id", DESCENDING)],
+                            name="job_score_desc")
+    collection.create_index([("candidate_id", ASCENDING)], name="candidate")
+    get_db().candidates.create_index([("content_hash", ASCENDING), ("analyzer_version", ASCENDING)],
+                                     name="content_hash_version", sparse=True)
+    # Reprise des tâches d'ingestion dont le bail a expiré
+    get_db().ingestion_tasks.create_index([("status", ASCENDING), ("lease_until", ASCENDING)],
+                                          name="status_lease")
+
+
+def _score_key(candidate_id: Id, job_id: Id) -> Dict[str, ObjectId]:
+    return {"job_id": to_object_id(job_id), "candidate_id": to_object_id(candidate_id)}
+
+
+def _score_entry(score: float, details: Dict[str, Any], model: str, model_version: str) -> Dict[str, Any]:
+    return {
+        "score": score,
+        "details": details,
+        "model": model,
+        "model_version": model_version,
+        "last_calculated": datetime.utcnow(),
+    }
+
+
+def upsert_score(candidate_id: Id, job_id: Id, score: float, details: Dict[str, Any],
+                 model: str = DEFAULT_SCORE_MODEL, model_version: str = DEFAULT_SCORE_MODEL_VERSION) -> bool:
+    """Enregistre le score d'un candidat pour une offre"""
+    match_scores().update_one(
+        _score_key(candidate_id, job_id),
+        {"$set": _score_entry(score, details, model, model_version)},
+        upsert=True,
+    )
+    return True
+
+
+def bulk_upsert_scores(job_id: Id, scores: Iterable[Tuple[Id, float, Dict[str, Any]]],
+                       model: str = DEFAULT_SCORE_MODEL, model_version: str = DEFAULT_SCORE_MODEL_VERSION) -> int:
+    """Enregistre par paquets les scores (candidate_id, score, details) d'une offre"""
+    with BulkWriter(match_scores()) as writer:
+        for candidate_id, score, details in scores:
+            writer.add(UpdateOne(_score_key(candidate_id, job_id),
+                                 {"$set": _score_entry(score, details, model, model_version)}, upsert=True))
+    return writer.stats["upserted"] + writer.stats["modified"]
+
+
+def get_score(candidate_id: Id, job_id: Id) -> Optional[Dict[str, Any]]:
+    return match_scores().find_one(_score_key(candidate_id, job_id))
+
+
+def get_scores_for_job(job_id: Id, limit: int = 0, projection: Projection = None) -> List[Dict[str, Any]]:
+    """Scores d'une offre par ordre décroissant (lecture de l'index job_score_desc)"""
+    cursor = match_scores().find({"job_id": to_object_id(job_id)}, projection).sort(
+        [("score", DESCENDING), ("candidate_id", DESCENDING)]
+    )
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def scored_candidate_ids(job_id: Id) -> List[ObjectId]:
+    """Identifiants des candidats ayant un score pour l'offre"""
+    return [s["candidate_id"] for s in match_scores().find({"job_id": to_object_id(job_id)}, {"candidate_id": 1})]
+
+
+def delete_scores_for_candidate(candidate_id: Id) -> int:
+    return match_scores().delete_many({"candidate_id": to_object_id(candidate_id)}).deleted_count
+
+
+# Anciens score_cache : scoring.score_candidate_for_job stockait le score IA
+# sur [0, 1] (entrées "updatedAt"), match_candidate_job l'overall_score sur
+# 0-100 (entrées "last_calculated"). match_scores est sur [0, 1].
+LEGACY_SCORE_MODEL = "legacy_score_cache"
+
+
+def _legacy_score(entry: Dict[str, Any]) -> float:
+    score = float(entry.get("score") or 0)
+    if "last_calculated" in entry or score > 1:
+        return score / 100
+    return score
+
+
+def migrate_score_cache(batch_size: int = 500) -> int:
+    """
+    Migre les anciens champs computed.score_cache.job_<id> des candidats
+    vers match_scores (scores ramenés sur [0, 1]), puis les supprime. Idempotent.
+    """
+    candidates = get_db().candidates
+    migrated = 0
+    while True:
+        batch = list(candidates.find({"computed.score_cache": {"$exists": True}},
+                                     {"computed.score_cache": 1}).limit(batch_size))
+        if not batch:
+            break
+        operations, owners = [], []
+        for candidate in batch:
+            for key, entry in (candidate.get("computed", {}).get("score_cache") or {}).items():
+                if not key.startswith("job_") or not ObjectId.is_valid(key[4:]) or not isinstance(entry, dict):
+                    continue
+                operations.append(UpdateOne(
+                    _score_key(candidate["_id"], key[4:]),
+                    {"$setOnInsert": {
+                        "score": _legacy_score(entry),
+                        "details": entry.get("details", {}),
+                        "model": LEGACY_SCORE_MODEL,
+                        "model_version": "0",
+                        "last_calculated": entry.get("last_calculated") or entry.get("updatedAt") or datetime.utcnow(),
+                    }},
+                    upsert=True,
+                ))
+                owners.append(candidate["_id"])
+        failed = set()
+        if operations:
+            with BulkWriter(match_scores()) as writer:
+                writer.extend(operations)
+            failed_operations = {id(operation) for operation in writer.failed}
+            failed = {owner for owner, operation in zip(owners, operations) if id(operation) in failed_operations}
+            migrated += len(operations) - len(writer.failed)
+        # Les anciens scores ne sont supprimés que pour les candidats entièrement copiés
+        done = [c["_id"] for c in batch if c["_id"] not in failed]
+        if done:
+            candidates.update_many({"_id": {"$in": done}}, {"$unset": {"computed.score_cache": ""}})
+        if failed:
+            logger.error(f"Migration des scores incomplète pour {len(failed)} candidats, score_cache conservé")
+            break
+    if migrated:
+        logger.info(f"{migrated} scores migrés vers {MATCH_SCORES}")
+    return migrated
+
+
+def insert_recommendation_history(entries: Iterable[Dict[str, Any]]) -> int:
+    """Historique des recommandations, inséré par paquets"""
+    with BulkWriter(get_db().historique_recommandations) as writer:
+        for entry in entries:
+            writer.add(InsertOne(entry))
+    return writer.stats["inserted"]
+
+
+def ping() -> bool:
+    get_db().command("ping")
+    return True
+
+
+# ======================================================
+# 📄 Listes projetées et pagination par curseur (keyset)
+# ======================================================
+# Jeux de champs nommés, sélectionnables via le paramètre `fields`
+CANDIDATE_FIELD_SETS: Dict[str, Dict[str, Any]] = {
+    "names": {"firstName": 1, "lastName": 1, "fullName": 1, "email": 1},
+    "summary": {
+        "firstName": 1, "lastName": 1, "fullName": 1, "email": 1, "phone": 1, "location": 1,
+        "experienceYears": 1, "created_at": 1, "lastUpdated": 1, "ingestion.status": 1,
+        "analysis.spelling_analysis.quality_score": 1,
+        "analysis.similarity.similarity_score": 1, "analysis.similarity.verdict": 1,
+        "fraud_analysis.fraud_score": 1, "fraud_analysis.risk_level": 1,
+    },
+    "ranking": {
+        "firstName": 1, "lastName": 1, "email": 1, "location": 1, "experienceYears": 1,
+        "skills": 1, "engagement_prediction": 1, "screening_classification": 1,
+    },
+    # Détail : tout sauf les champs volumineux (texte brut, vecteurs)
+    "detail": {"embedding": 0, "resumeText": 0, "analysis.raw_text": 0},
+    "full": EMBEDDING_PROJECTION,
+}
+
+JOB_FIELD_SETS: Dict[str, Dict[str, Any]] = {
+    "names": {"title": 1, "company": 1},
+    "summary": {
+        "title": 1, "company": 1, "location": 1, "min_experience": 1,
+        "required_skills": 1, "preferred_skills": 1, "createdAt": 1,
+    },
+    "full": EMBEDDING_PROJECTION,
+}
+
+# Champs jamais renvoyés, même demandés explicitement
+HIDDEN_FIELDS = {"embedding"}
+
+
+def resolve_projection(fields: Optional[str], field_sets: Dict[str, Dict[str, Any]],
+                       default: str) -> Dict[str, Any]:
+    """
+    Projection MongoDB à partir du paramètre `fields` : nom d'un jeu de
+    champs ("summary") ou liste de champs séparés par des virgules.
+    """
+    fields = (fields or default).strip()
+    if fields in field_sets:
+        return dict(field_sets[fields])
+    projection = {
+        name.strip(): 1 for name in fields.split(",")
+        if name.strip() and name.strip().split(".")[0] not in HIDDEN_FIELDS
+    }
+    return projection or dict(field_sets[default])
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    payload = {k: str(v) if isinstance(v, ObjectId) else v for k, v in values.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Décode un curseur opaque ; ValueError s'il est invalide"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values["id"] = ObjectId(values["id"])
+        return values
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+
+def _page_by_id(collection, query: Mapping[str, Any], projection: Mapping[str, Any],
+                limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Page triée par _id croissant ; le curseur porte le dernier _id renvoyé"""
+    after = decode_cursor(cursor)
+    query = dict(query)
+    if after:
+        query["_id"] = {"$gt": after["id"]}
+    documents = list(collection.find(query, projection).sort("_id", 1).limit(limit + 1))
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor({"id": documents[-1]["_id"]}) if has_more else None
+    return documents, next_cursor
+
+
+def list_candidates_page(projection: Mapping[str, Any], limit: int = 50,
+                         cursor: Optional[str] = None,
+                         query: Optional[Mapping[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return _page_by_id(get_db().candidates, query or {}, projection, limit, cursor)
+
+
+def list_jobs_page(projection: Mapping[str, Any], limit: int = 100,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return _page_by_id(get_db().jobs, {}, projection, limit, cursor)
+
+
+def list_top_candidates_page(job_id: Id, projection: Mapping[str, Any], limit: int = 5,
+                             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Candidats classés par score décroissant pour une offre, paginés sur
+    (score, candidate_id) : lecture d'intervalle de l'index job_score_desc,
+    puis chargement projeté des seuls candidats de la page.
+    """
+    job_oid = to_object_id(job_id)
+    query: Dict[str, Any] = {"job_id": job_oid}
+    after = decode_cursor(cursor)
+    if after:
+        query["$or"] = [
+            {"score": {"$lt": after["score"]}},
+            {"score": after["score"], "candidate_id": {"$lt": after["id"]}},
+        ]
+    scores = list(
+        match_scores().find(query, {"candidate_id": 1, "score": 1, "last_calculated": 1})
+        .sort([("score", DESCENDING), ("candidate_id", DESCENDING)])
+        .limit(limit + 1)
+    )
+    has_more = len(scores) > limit
+    scores = scores[:limit]
+
+    by_id = {
+        c["_id"]: c for c in
+        get_db().candidates.find({"_id": {"$in": [s["candidate_id"] for s in scores]}}, projection)
+    }
+    documents = []
+    for entry in scores:
+        candidate = by_id.get(entry["candidate_id"])
+        if candidate is None:
+            continue
+        candidate["score"] = entry["score"]
+        candidate["last_calculated"] = entry.get("last_calculated")
+        documents.append(candidate)
+
+    next_cursor = None
+    if has_more:
+        last = scores[-1]
+        next_cursor = encode_cursor({"id": last["candidate_id"], "score": last["score"]})
+    return documents, next_cursor
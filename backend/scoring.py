@@ -1,52 +1,83 @@
-from pymongo import MongoClient
-from bson import ObjectId
-from datetime import datetime
-from sentence_transformers import SentenceTransformer, util
-from transformers import pipeline
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
+from embedding_store import EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, get_or_compute_embedding
+from model_registry import registry
+from inference_batcher import MicroBatcher
+from memoization import memoize
+import repository
 
 # ---------------- IA SCORE ----------------
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# MiniLM partagé avec similarity_checker (chargé à la première utilisation)
+def _encode_batch(texts):
+    model = registry.get("minilm")
+    return list(model.encode(texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True))
 
-def compute_ai_score(job_text: str, resume_text: str) -> float:
-    embeddings_job = model.encode(job_text, convert_to_tensor=True)
-    embeddings_resume = model.encode(resume_text, convert_to_tensor=True)
-    similarity = util.cos_sim(embeddings_job, embeddings_resume).item()
+minilm_batcher = MicroBatcher("minilm", _encode_batch, length_fn=len)
+
+def encode_text(text: str) -> np.ndarray:
+    """Encode un texte en vecteur normalisé (cosinus = produit scalaire)"""
+    return minilm_batcher(text)
+
+def build_job_text(job: dict) -> str:
+    return job.get("title","") + " " + " ".join([s["name"] for s in job.get("required_skills", [])])
+
+def get_resume_embedding(candidate: dict) -> np.ndarray:
+    """Vecteur du CV, ré-encodé (et persisté) uniquement si resumeText ou le modèle a changé"""
+    return get_or_compute_embedding(candidate, candidate.get("resumeText", ""), encode_text,
+                                    repository.update_candidate)
+
+def get_job_embedding(job: dict) -> np.ndarray:
+    """Vecteur de l'offre, mis en cache sur le document job"""
+    return get_or_compute_embedding(job, build_job_text(job), encode_text, repository.update_job)
+
+def score_from_embeddings(job_vector: np.ndarray, resume_vector: np.ndarray) -> float:
+    similarity = float(np.dot(job_vector, resume_vector))
     return max(0.0, min(1.0, (similarity + 1) / 2))
 
+def compute_ai_score(job_text: str, resume_text: str) -> float:
+    return score_from_embeddings(encode_text(job_text), encode_text(resume_text))
+
 def compute_overall_score_ai(job: dict, candidate: dict):
-    job_text = job.get("title","") + " " + " ".join([s["name"] for s in job.get("required_skills", [])])
-    resume_text = candidate.get("resumeText", "")
-    score = compute_ai_score(job_text, resume_text)
+    job_vector = get_job_embedding(job)
+    resume_vector = get_resume_embedding(candidate)
+    score = score_from_embeddings(job_vector, resume_vector)
     breakdown = {"ai_score": round(score, 3)}
     return round(score, 4), breakdown
 
-def score_candidate_for_job(candidate_id: str, job_id: str, mongo_uri="mongodb://localhost:27017/", db_name="recruit_ai"):
-    client = MongoClient(mongo_uri)
-    db = client[db_name]
-
-    candidate = db.candidates.find_one({"_id": ObjectId(candidate_id)})
-    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+def score_candidate_for_job(candidate_id: str, job_id: str):
+    candidate = repository.get_candidate(candidate_id, {"resumeText": 1, "embedding": 1})
+    job = repository.get_job(job_id, None)
 
     if not candidate or not job:
         print("Candidat ou Job introuvable")
         return
 
     score, details = compute_overall_score_ai(job, candidate)
-    db.candidates.update_one(
-        {"_id": candidate["_id"]},
-        {"$set": {f"computed.score_cache.job_{job['_id']}": {"score": score, "details": details, "updatedAt": datetime.utcnow()}}}
-    )
+    repository.upsert_score(candidate["_id"], job["_id"], score, details,
+                            model=EMBEDDING_MODEL_NAME, model_version=EMBEDDING_MODEL_VERSION)
     print(f"Score IA mis à jour pour le candidat {candidate_id} sur le job {job_id}")
 
+def embed_candidate(candidate_id: str):
+    """Calcule et stocke l'embedding du CV à l'ingestion"""
+    candidate = repository.get_candidate(candidate_id, {"resumeText": 1, "embedding": 1})
+    if not candidate:
+        print("Candidat introuvable")
+        return
+    get_resume_embedding(candidate)
+
 # ---------------- IA Engagement / Turnover ----------------
-engagement_classifier = pipeline("text-classification", model="distilbert-base-uncased-finetuned-sst-2-english")
+def _engagement_batch(texts):
+    results = registry.get("sst2_engagement")(texts, batch_size=len(texts))
+    return [r[0] if isinstance(r, list) else r for r in results]
+
+engagement_batcher = MicroBatcher("sst2_engagement", _engagement_batch, length_fn=len)
 
+@memoize("engagement", version="sst2:1")
 def predict_turnover_or_engagement(resume_text: str) -> dict:
-    result = engagement_classifier(resume_text[:512])
-    label = result[0]["label"]
-    score = result[0]["score"]
+    result = engagement_batcher(resume_text[:512])
+    label = result["label"]
+    score = result["score"]
     
     if label.upper() == "POSITIVE":
         engagement_label = "Motivé"
@@ -102,6 +133,7 @@ X_train = vectorizer.fit_transform(train_texts)
 classifier = LogisticRegression()
 classifier.fit(X_train, train_labels)
 
+@memoize("screen_cv_class", version="tfidf-logreg:1")
 def screen_cv_class(resume_text: str) -> dict:
     X_test = vectorizer.transform([resume_text])
     pred_class = classifier.predict(X_test)[0]
@@ -1,42 +1,45 @@
 # similarity_check.py
-from sentence_transformers import SentenceTransformer, util
-import torch
+from sentence_transformers import util
+from model_registry import registry
+from scoring import minilm_batcher
+from embedding_store import EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION
+from memoization import memoize
 
 # ======================================================
-# 🧠 Chargement du modèle d'embeddings (pré-entraîné)
+# 🧠 Modèle d'embeddings : MiniLM partagé via le registre
+# (mêmes poids que scoring, chargé une seule fois)
 # ======================================================
-try:
-    print("🚀 Chargement du modèle de similarité (MiniLM)...")
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    print("✅ Modèle de similarité prêt !")
-except Exception as e:
-    print("❌ Erreur lors du chargement du modèle MiniLM :", e)
-    model = None
+
+
+# ======================================================
+# ⚖️ Verdict associé à un score de similarité
+# ======================================================
+def similarity_verdict(similarity: float):
+    if similarity > 0.9:
+        return "🚨 CV potentiellement copié ou généré automatiquement.", "suspicious"
+    elif similarity > 0.75:
+        return "⚠️ CV fortement inspiré d'un modèle existant.", "partially_similar"
+    return "✅ CV original et unique.", "authentic"
 
 
 # ======================================================
 # 🔍 Fonction de comparaison de deux CV
 # ======================================================
+@memoize("compare_cvs", version=f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_MODEL_VERSION}",
+         cache_if=lambda result: "error" not in result)
 def compare_cvs(cv_text_1: str, cv_text_2: str):
    
+    model = registry.get_or_none("minilm")
     if not model:
         return {"error": "Modèle non initialisé"}
 
     try:
-        emb1 = model.encode(cv_text_1, convert_to_tensor=True)
-        emb2 = model.encode(cv_text_2, convert_to_tensor=True)
+        # Les deux textes partent dans le même lot d'encodage
+        futures = [minilm_batcher.submit(text) for text in (cv_text_1, cv_text_2)]
+        emb1, emb2 = (future.result() for future in futures)
 
         similarity = util.cos_sim(emb1, emb2).item()
-
-        if similarity > 0.9:
-            verdict = "🚨 CV potentiellement copié ou généré automatiquement."
-            status = "suspicious"
-        elif similarity > 0.75:
-            verdict = "⚠️ CV fortement inspiré d'un modèle existant."
-            status = "partially_similar"
-        else:
-            verdict = "✅ CV original et unique."
-            status = "authentic"
+        verdict, status = similarity_verdict(similarity)
 
         return {
             "similarity_score": round(similarity, 3),
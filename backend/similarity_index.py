@@ -0,0 +1,317 @@
+# similarity_index.py
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# 🔌 Backends ANN optionnels (hnswlib > faiss > NumPy exact)
+# ======================================================
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", "indexes")
+DEFAULT_BACKEND = os.getenv("SIMILARITY_INDEX_BACKEND", "auto")
+
+
+def available_backend(preferred: str = "auto") -> str:
+    """Choisit le backend ANN disponible le plus adapté"""
+    if preferred == "hnswlib" and hnswlib is not None:
+        return "hnswlib"
+    if preferred == "faiss" and faiss is not None:
+        return "faiss"
+    if preferred == "numpy":
+        return "numpy"
+    if preferred != "auto":
+        logger.warning(f"Backend {preferred} indisponible, sélection automatique")
+    if hnswlib is not None:
+        return "hnswlib"
+    if faiss is not None:
+        return "faiss"
+    return "numpy"
+
+
+class CandidateSimilarityIndex:
+    """
+    Index persistant des embeddings de CV (vecteurs normalisés, produit
+    scalaire = cosinus). Les vecteurs bruts sont conservés pour la
+    reconstruction de l'index et pour le mode exact NumPy.
+    """
+
+    def __init__(self, dim: int = 384, backend: str = DEFAULT_BACKEND,
+                 index_dir: str = INDEX_DIR, name: str = "candidates",
+                 ef_construction: int = 200, m: int = 16, ef_search: int = 64):
+        self.dim = dim
+        self.backend = available_backend(backend)
+        self.index_dir = index_dir
+        self.name = name
+        self.ef_construction = ef_construction
+        self.m = m
+        self.ef_search = ef_search
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._hashes: Dict[str, str] = {}
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ann = None
+        self._dirty = False
+
+    # ---------------- Mise à jour ----------------
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def needs_update(self, candidate_id: str, text_hash: str) -> bool:
+        """text_hash inclut le modèle d'embedding (embedding_store.embedding_fingerprint)"""
+        return self._hashes.get(candidate_id) != text_hash
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, hashes: Sequence[str]):
+        """Ajoute ou remplace les vecteurs des candidats donnés"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            new_rows = []
+            replaced = False
+            for candidate_id, vector, text_hash in zip(ids, vectors, hashes):
+                if self._hashes.get(candidate_id) == text_hash:
+                    continue
+                position = self._positions.get(candidate_id)
+                if position is None:
+                    self._positions[candidate_id] = len(self._ids) + len(new_rows)
+                    new_rows.append(vector)
+                    self._ids.append(candidate_id)
+                else:
+                    self._vectors[position] = vector
+                    replaced = True
+                self._hashes[candidate_id] = text_hash
+
+            if new_rows:
+                start = len(self._vectors)
+                self._vectors = np.vstack([self._vectors, np.stack(new_rows)])
+                self._add_to_ann(start)
+            if replaced:
+                # Les index ANN ne gèrent pas tous le remplacement : reconstruction paresseuse
+                self._dirty = True
+
+    def _add_to_ann(self, start: int):
+        if self._ann is None or self._dirty:
+            self._dirty = True
+            return
+        rows = self._vectors[start:]
+        labels = np.arange(start, start + len(rows))
+        if self.backend == "hnswlib":
+            if self._ann.get_max_elements() < len(self._vectors):
+                self._ann.resize_index(max(len(self._vectors), 2 * self._ann.get_max_elements()))
+            self._ann.add_items(rows, labels)
+        elif self.backend == "faiss":
+            self._ann.add(rows)
+
+    def _ensure_ann(self):
+        if self.backend == "numpy" or len(self._ids) == 0:
+            return
+        if self._ann is not None and not self._dirty:
+            return
+        if self.backend == "hnswlib":
+            ann = hnswlib.Index(space="ip", dim=self.dim)
+            ann.init_index(max_elements=max(len(self._vectors), 16),
+                           ef_construction=self.ef_construction, M=self.m)
+            ann.add_items(self._vectors, np.arange(len(self._vectors)))
+            ann.set_ef(self.ef_search)
+        else:
+            ann = faiss.IndexHNSWFlat(self.dim, self.m, faiss.METRIC_INNER_PRODUCT)
+            ann.hnsw.efConstruction = self.ef_construction
+            ann.hnsw.efSearch = self.ef_search
+            ann.add(self._vectors)
+        self._ann = ann
+        self._dirty = False
+
+    # ---------------- Recherche ----------------
+    def query(self, positions: np.ndarray, k: int,
+              allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k plus proches voisins des vecteurs aux positions données,
+        restreints aux positions `allowed` si fourni.
+        Retourne (voisins, similarités) de forme (len(positions), k) ; -1 = vide.
+        """
+        with self._lock:
+            self._ensure_ann()
+            queries = self._vectors[positions]
+            pool = len(self._ids) if allowed is None else len(allowed)
+            k = max(1, min(k, pool))
+
+            if self.backend == "hnswlib":
+                allowed_set = None if allowed is None else set(int(p) for p in allowed)
+                self._ann.set_ef(max(self.ef_search, k))
+                labels, distances = self._ann.knn_query(
+                    queries, k=k,
+                    filter=None if allowed_set is None else (lambda label: label in allowed_set),
+                )
+                return labels.astype(np.int64), 1.0 - distances
+
+            if self.backend == "faiss":
+                params = None
+                if allowed is not None:
+                    params = faiss.SearchParametersHNSW(
+                        sel=faiss.IDSelectorBatch(np.asarray(allowed, dtype=np.int64)),
+                        efSearch=max(self.ef_search, k),
+                    )
+                similarities, labels = self._ann.search(queries, k, params=params)
+                return labels.astype(np.int64), similarities
+
+            return self._exact_query(queries, k, allowed)
+
+    def _exact_query(self, queries: np.ndarray, k: int,
+                     allowed: Optional[np.ndarray], block_size: int = 1024):
+        """Recherche exacte par blocs (fallback sans dépendance)"""
+        candidates = np.arange(len(self._ids)) if allowed is None else np.asarray(allowed)
+        matrix = self._vectors[candidates]
+        labels = np.empty((len(queries), k), dtype=np.int64)
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size] @ matrix.T
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            labels[start:start + block_size] = candidates[np.take_along_axis(top, order, axis=1)]
+            similarities[start:start + block_size] = np.take_along_axis(top_scores, order, axis=1)
+        return labels, similarities
+
+    def similar_pairs(self, ids: Sequence[str], k: int,
+                      threshold: float) -> List[Tuple[str, str, float]]:
+        """Paires (id1, id2, similarité) au-dessus du seuil parmi `ids`"""
+        positions = np.array([self._positions[i] for i in ids if i in self._positions], dtype=np.int64)
+        if len(positions) < 2:
+            return []
+
+        # k + 1 : chaque vecteur est son propre plus proche voisin
+        labels, similarities = self.query(positions, k + 1, allowed=positions)
+
+        pairs = {}
+        for row, position in enumerate(positions):
+            for label, similarity in zip(labels[row], similarities[row]):
+                if label < 0 or label == position or similarity <= threshold:
+                    continue
+                key = (min(position, label), max(position, label))
+                pairs[key] = max(pairs.get(key, -1.0), float(similarity))
+
+        return [(self._ids[a], self._ids[b], similarity) for (a, b), similarity in pairs.items()]
+
+    # ---------------- Persistance ----------------
+    def _paths(self) -> Dict[str, str]:
+        base = os.path.join(self.index_dir, self.name)
+        return {
+            "meta": base + ".json",
+            "vectors": base + ".npy",
+            "hnswlib": base + ".hnsw",
+            "faiss": base + ".faiss",
+        }
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            paths = self._paths()
+            np.save(paths["vectors"], self._vectors)
+            with open(paths["meta"], "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "ids": self._ids, "hashes": self._hashes}, f)
+            self._ensure_ann()
+            if self._ann is not None:
+                if self.backend == "hnswlib":
+                    self._ann.save_index(paths["hnswlib"])
+                elif self.backend == "faiss":
+                    faiss.write_index(self._ann, paths["faiss"])
+
+    @classmethod
+    def load_or_create(cls, dim: int = 384, backend: str = DEFAULT_BACKEND,
+                       index_dir: str = INDEX_DIR, name: str = "candidates") -> "CandidateSimilarityIndex":
+        index = cls(dim=dim, backend=backend, index_dir=index_dir, name=name)
+        paths = index._paths()
+        if not os.path.exists(paths["meta"]) or not os.path.exists(paths["vectors"]):
+            return index
+
+        try:
+            with open(paths["meta"], "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != dim:
+                logger.warning("Dimension de l'index différente, reconstruction complète")
+                return index
+            index._ids = meta["ids"]
+            index._hashes = meta["hashes"]
+            index._positions = {candidate_id: i for i, candidate_id in enumerate(index._ids)}
+            index._vectors = np.load(paths["vectors"]).astype(np.float32)
+
+            if index.backend == "hnswlib" and os.path.exists(paths["hnswlib"]):
+                ann = hnswlib.Index(space="ip", dim=dim)
+                ann.load_index(paths["hnswlib"], max_elements=max(len(index._ids), 16))
+                ann.set_ef(index.ef_search)
+                index._ann = ann
+            elif index.backend == "faiss" and os.path.exists(paths["faiss"]):
+                index._ann = faiss.read_index(paths["faiss"])
+            else:
+                index._dirty = True
+        except Exception as e:
+            logger.error(f"Erreur chargement de l'index de similarité: {e}")
+            return cls(dim=dim, backend=backend, index_dir=index_dir, name=name)
+
+        return index
+
+
+# ======================================================
+# 🧩 Regroupement des paires en clusters de quasi-doublons
+# ======================================================
+def cluster_pairs(pairs: Sequence[Tuple[str, str, float]]) -> List[Dict]:
+    """Composantes connexes (union-find) du graphe des paires similaires"""
+    parent: Dict[str, str] = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b, _ in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    clusters: Dict[str, Dict] = {}
+    for a, b, similarity in pairs:
+        cluster = clusters.setdefault(find(a), {"members": set(), "max_similarity": 0.0})
+        cluster["members"].update((a, b))
+        cluster["max_similarity"] = max(cluster["max_similarity"], similarity)
+
+    return sorted(
+        (
+            {
+                "candidate_ids": sorted(c["members"]),
+                "size": len(c["members"]),
+                "max_similarity": round(c["max_similarity"], 3),
+            }
+            for c in clusters.values()
+        ),
+        key=lambda c: (-c["size"], -c["max_similarity"]),
+    )
+
+
+_candidate_index: Optional[CandidateSimilarityIndex] = None
+_candidate_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> CandidateSimilarityIndex:
+    """Instance partagée de l'index des CV (chargée depuis le disque)"""
+    global _candidate_index
+    with _candidate_index_lock:
+        if _candidate_index is None:
+            _candidate_index = CandidateSimilarityIndex.load_or_create()
+        return _candidate_index
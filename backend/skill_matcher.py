@@ -0,0 +1,297 @@
+# skill_matcher.py
+import json
+import logging
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# 📚 Dictionnaire des compétences (canonique -> catégorie + alias)
+# ======================================================
+SKILL_DICTIONARY: Dict[str, Dict] = {
+    # Programmation
+    "python": {"category": "programming", "aliases": ["python", "py"]},
+    "java": {"category": "programming", "aliases": ["java", "j2ee"]},
+    "javascript": {"category": "programming", "aliases": ["javascript", "js"]},
+    "typescript": {"category": "programming", "aliases": ["typescript"]},
+    "c++": {"category": "programming", "aliases": ["c++"]},
+    "c#": {"category": "programming", "aliases": ["c#"]},
+    "php": {"category": "programming", "aliases": ["php"]},
+    "ruby": {"category": "programming", "aliases": ["ruby"]},
+    "go": {"category": "programming", "aliases": ["golang"], "exact_aliases": ["Go"]},
+    "rust": {"category": "programming", "aliases": ["rust"]},
+    "swift": {"category": "programming", "aliases": ["swift"]},
+    "kotlin": {"category": "programming", "aliases": ["kotlin"]},
+    "r": {"category": "programming", "aliases": ["rstudio"], "exact_aliases": ["R"]},
+    "bash": {"category": "programming", "aliases": ["bash"]},
+    # Web
+    "html": {"category": "web", "aliases": ["html"]},
+    "css": {"category": "web", "aliases": ["css"]},
+    "react": {"category": "web", "aliases": ["react", "reactjs", "react.js"]},
+    "vue": {"category": "web", "aliases": ["vue", "vue.js", "vuejs"]},
+    "angular": {"category": "web", "aliases": ["angular"]},
+    "node.js": {"category": "web", "aliases": ["node.js", "nodejs", "node"]},
+    "next.js": {"category": "web", "aliases": ["next.js", "nextjs"]},
+    "django": {"category": "web", "aliases": ["django"]},
+    "flask": {"category": "web", "aliases": ["flask"]},
+    "spring": {"category": "web", "aliases": ["spring boot", "spring framework", "spring mvc"],
+               "exact_aliases": ["Spring"]},
+    "express": {"category": "web", "aliases": ["express.js", "expressjs"], "exact_aliases": ["Express"]},
+    "hibernate": {"category": "web", "aliases": ["hibernate"]},
+    "jpa": {"category": "web", "aliases": ["jpa"]},
+    "bootstrap": {"category": "web", "aliases": ["bootstrap"]},
+    "sass": {"category": "web", "aliases": ["sass"]},
+    "webpack": {"category": "web", "aliases": ["webpack"]},
+    "jquery": {"category": "web", "aliases": ["jquery"]},
+    "svelte": {"category": "web", "aliases": ["svelte"]},
+    "ember": {"category": "web", "aliases": ["ember.js", "emberjs"]},
+    "backbone": {"category": "web", "aliases": ["backbone.js", "backbonejs"]},
+    "lodash": {"category": "web", "aliases": ["lodash"]},
+    "moment": {"category": "web", "aliases": ["moment.js", "momentjs"]},
+    "axios": {"category": "web", "aliases": ["axios"]},
+    "rest api": {"category": "web", "aliases": ["rest api"]},
+    "rest": {"category": "web", "aliases": ["restful"], "exact_aliases": ["REST"]},
+    "api": {"category": "web", "aliases": ["api"]},
+    "graphql": {"category": "web", "aliases": ["graphql"]},
+    "microservices": {"category": "web", "aliases": ["microservices"]},
+    "json": {"category": "web", "aliases": ["json"]},
+    "xml": {"category": "web", "aliases": ["xml"]},
+    # Mobile
+    "android": {"category": "mobile", "aliases": ["android"]},
+    "ios": {"category": "mobile", "aliases": ["ios"]},
+    "react native": {"category": "mobile", "aliases": ["react native"]},
+    "flutter": {"category": "mobile", "aliases": ["flutter"]},
+    # Bases de données
+    "sql": {"category": "database", "aliases": ["sql"]},
+    "mysql": {"category": "database", "aliases": ["mysql"]},
+    "postgresql": {"category": "database", "aliases": ["postgresql", "postgres"]},
+    "mongodb": {"category": "database", "aliases": ["mongodb", "mongo"]},
+    "redis": {"category": "database", "aliases": ["redis"]},
+    "oracle": {"category": "database", "aliases": ["oracle"]},
+    "sqlite": {"category": "database", "aliases": ["sqlite"]},
+    "elasticsearch": {"category": "database", "aliases": ["elasticsearch"]},
+    "firebase": {"category": "database", "aliases": ["firebase"]},
+    "supabase": {"category": "database", "aliases": ["supabase"]},
+    "prisma": {"category": "database", "aliases": ["prisma"]},
+    "sequelize": {"category": "database", "aliases": ["sequelize"]},
+    "typeorm": {"category": "database", "aliases": ["typeorm"]},
+    "mongoose": {"category": "database", "aliases": ["mongoose"]},
+    # DevOps / Cloud
+    "docker": {"category": "devops", "aliases": ["docker"]},
+    "kubernetes": {"category": "devops", "aliases": ["kubernetes", "k8s"]},
+    "jenkins": {"category": "devops", "aliases": ["jenkins"]},
+    "git": {"category": "devops", "aliases": ["git"]},
+    "github": {"category": "devops", "aliases": ["github"]},
+    "gitlab": {"category": "devops", "aliases": ["gitlab"]},
+    "ci/cd": {"category": "devops", "aliases": ["ci/cd"]},
+    "aws": {"category": "devops", "aliases": ["aws", "amazon web services"]},
+    "azure": {"category": "devops", "aliases": ["azure"]},
+    "gcp": {"category": "devops", "aliases": ["gcp", "google cloud"]},
+    "linux": {"category": "devops", "aliases": ["linux"]},
+    "nginx": {"category": "devops", "aliases": ["nginx"]},
+    "apache": {"category": "devops", "aliases": ["apache"]},
+    "tomcat": {"category": "devops", "aliases": ["tomcat"]},
+    "jetty": {"category": "devops", "aliases": ["jetty"]},
+    "wildfly": {"category": "devops", "aliases": ["wildfly"]},
+    "glassfish": {"category": "devops", "aliases": ["glassfish"]},
+    "kafka": {"category": "devops", "aliases": ["kafka"]},
+    "rabbitmq": {"category": "devops", "aliases": ["rabbitmq"]},
+    "npm": {"category": "devops", "aliases": ["npm"]},
+    "yarn": {"category": "devops", "aliases": ["yarn"]},
+    "maven": {"category": "devops", "aliases": ["maven"]},
+    "gradle": {"category": "devops", "aliases": ["gradle"]},
+    "devops": {"category": "devops", "aliases": ["devops"]},
+    "cloud": {"category": "devops", "aliases": ["cloud"]},
+    # Data science
+    "pandas": {"category": "data_science", "aliases": ["pandas"]},
+    "numpy": {"category": "data_science", "aliases": ["numpy"]},
+    "tensorflow": {"category": "data_science", "aliases": ["tensorflow"]},
+    "pytorch": {"category": "data_science", "aliases": ["pytorch"]},
+    "machine learning": {"category": "data_science", "aliases": ["machine learning", "apprentissage automatique"],
+                         "exact_aliases": ["ML"]},
+    "data science": {"category": "data_science", "aliases": ["data science"]},
+    "ai": {"category": "data_science", "aliases": ["artificial intelligence", "intelligence artificielle"],
+           "exact_aliases": ["AI", "IA"]},
+    # Méthodes et outils
+    "agile": {"category": "methods", "aliases": ["agile"]},
+    "scrum": {"category": "methods", "aliases": ["scrum"]},
+    "kanban": {"category": "methods", "aliases": ["kanban"]},
+    "jira": {"category": "methods", "aliases": ["jira"]},
+    "confluence": {"category": "methods", "aliases": ["confluence"]},
+    "testing": {"category": "methods", "aliases": ["testing"]},
+    "tdd": {"category": "methods", "aliases": ["tdd"]},
+    "bdd": {"category": "methods", "aliases": ["bdd"]},
+    # Profils
+    "full stack": {"category": "roles", "aliases": ["full stack", "fullstack"]},
+    "frontend": {"category": "roles", "aliases": ["frontend", "front-end"]},
+    "backend": {"category": "roles", "aliases": ["backend", "back-end"]},
+    # Soft skills
+    "communication": {"category": "soft_skills", "aliases": ["communication"]},
+    "leadership": {"category": "soft_skills", "aliases": ["leadership"]},
+    "teamwork": {"category": "soft_skills", "aliases": ["teamwork"]},
+    "problem solving": {"category": "soft_skills", "aliases": ["problem solving"]},
+    "creativity": {"category": "soft_skills", "aliases": ["creativity"]},
+    "adaptability": {"category": "soft_skills", "aliases": ["adaptability"]},
+}
+
+# Les alias courts ou ambigus (R, Go, REST...) sont dans "exact_aliases" :
+# respect de la casse et délimiteurs de liste obligatoires ("R&D",
+# "go-to-market", "en ce moment" ne sont pas des compétences).
+
+# Fichier JSON optionnel pour étendre le dictionnaire (même format)
+SKILL_DICTIONARY_PATH = os.getenv("SKILL_DICTIONARY_PATH", "")
+
+
+class SkillMatch(NamedTuple):
+    skill_id: int
+    skill: str
+    start: int
+    end: int
+
+
+# L'apostrophe fait partie du mot : "j'ai" ne contient pas la compétence "ai"
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_'’"
+
+
+# Seuls séparateurs admis autour d'un alias exact
+_EXACT_DELIMITERS = frozenset(" \t\r\n,;:/()[]|•·.")
+
+
+class SkillMatcher:
+    """
+    Automate Aho–Corasick construit une fois à partir du dictionnaire :
+    toutes les compétences et leurs alias sont détectés en un seul
+    parcours linéaire du texte, avec vérification des limites de mots.
+    """
+
+    def __init__(self, dictionary: Dict[str, Dict]):
+        self.skills: List[str] = []
+        self.skill_ids: Dict[str, int] = {}
+        self.categories: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+
+        # Trie : transitions, liens d'échec et sorties par nœud
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[tuple]] = [[]]
+
+        for canonical, entry in dictionary.items():
+            skill_id = self._intern(canonical)
+            self.categories.setdefault(canonical, entry.get("category", ""))
+            self.aliases.setdefault(canonical.lower(), self.skills[skill_id])
+            for alias in entry.get("aliases", [] if "exact_aliases" in entry else [canonical]):
+                self._add_pattern(alias.lower(), skill_id)
+                self.aliases.setdefault(alias.lower(), self.skills[skill_id])
+            for alias in entry.get("exact_aliases", []):
+                self._add_pattern(alias.lower(), skill_id, exact=alias)
+                self.aliases.setdefault(alias.lower(), self.skills[skill_id])
+        self._build_failure_links()
+
+    def _intern(self, canonical: str) -> int:
+        canonical = canonical.lower()
+        if canonical not in self.skill_ids:
+            self.skill_ids[canonical] = len(self.skills)
+            self.skills.append(canonical)
+        return self.skill_ids[canonical]
+
+    def _add_pattern(self, pattern: str, skill_id: int, exact: Optional[str] = None):
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        output = (skill_id, len(pattern), _is_word_char(pattern[0]), _is_word_char(pattern[-1]), exact)
+        if output not in self._out[node]:
+            self._out[node].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[SkillMatch]:
+        """Toutes les occurrences (compétence canonique + position) dans le texte"""
+        if not text:
+            return []
+        original, text = text, text.lower()
+        # Les alias exacts sont comparés au texte d'origine (même longueur requise)
+        exact_allowed = len(original) == len(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        length = len(text)
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for skill_id, size, check_start, check_end, exact in out[node]:
+                start, end = i - size + 1, i + 1
+                if exact is not None:
+                    if not exact_allowed or original[start:end] != exact:
+                        continue
+                    if start > 0 and original[start - 1] not in _EXACT_DELIMITERS:
+                        continue
+                    if end < length and original[end] not in _EXACT_DELIMITERS:
+                        continue
+                if check_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if check_end and end < length and _is_word_char(text[end]):
+                    continue
+                matches.append(SkillMatch(skill_id, self.skills[skill_id], start, end))
+        return matches
+
+    def find_skills(self, text: str) -> List[str]:
+        """Compétences canoniques distinctes, dans l'ordre d'apparition"""
+        seen = {}
+        for match in self.find(text):
+            seen.setdefault(match.skill, None)
+        return list(seen)
+
+    def canonical(self, skill: str) -> str:
+        """Forme canonique d'une compétence saisie telle quelle ("Golang" -> "go"), sinon en minuscules"""
+        skill = skill.strip().lower()
+        return self.aliases.get(skill, skill)
+
+    def category(self, skill: str) -> str:
+        return self.categories.get(skill.lower(), "")
+
+
+def load_skill_dictionary(path: Optional[str] = SKILL_DICTIONARY_PATH) -> Dict[str, Dict]:
+    """Dictionnaire par défaut, éventuellement étendu par un fichier JSON"""
+    dictionary = dict(SKILL_DICTIONARY)
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                dictionary.update(json.load(f))
+        except Exception as e:
+            logger.error(f"Erreur chargement du dictionnaire de compétences {path}: {e}")
+    return dictionary
+
+
+def build_skill_matcher(extra: Optional[Iterable[str]] = None) -> SkillMatcher:
+    dictionary = load_skill_dictionary()
+    for skill in extra or []:
+        dictionary.setdefault(skill.lower(), {"category": "", "aliases": [skill.lower()]})
+    return SkillMatcher(dictionary)
+
+
+# Instance partagée par tous les extracteurs de compétences
+skill_matcher = build_skill_matcher()
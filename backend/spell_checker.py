@@ -1,72 +1,77 @@
 # text_quality.py - Version corrigée
-import requests
-import subprocess
-import time
+import logging
+import os
+
+from languagetool_client import LanguageToolError, languagetool
+from spell_engine import SpellDictionaryMissing, find_misspellings, missing_dictionaries
+from memoization import memoize
+
+logger = logging.getLogger(__name__)
+
+# Moteur par défaut : "languagetool" (grammaire complète, serveur Java) ou
+# "symspell" (orthographe seule, en mémoire, sans Java)
+SPELL_ENGINE = os.getenv("SPELL_ENGINE", "languagetool").lower()
+
+if SPELL_ENGINE == "symspell" and missing_dictionaries():
+    # Pas de repli silencieux sur le serveur Java : voir dictionaries/README.md
+    logger.error(f"SPELL_ENGINE=symspell sans dictionnaire pour {missing_dictionaries()}")
 
 # ======================================================
-# 🧠 Démarre le serveur Java LanguageTool local
+# 🧠 Serveur Java LanguageTool local : démarré une seule fois et
+# supervisé par le client partagé (languagetool_client)
 # ======================================================
 def start_local_languagetool_server():
-    try:
-        # Vérifie si déjà en ligne
-        try:
-            r = requests.get("http://127.0.0.1:8081/v2/check", params={"text": "test"})
-            if r.status_code == 400:  # LanguageTool retourne 400 pour les requêtes sans texte valide
-                print("✅ Serveur LanguageTool déjà actif.")
-                return
-        except requests.exceptions.ConnectionError:
-            pass
-        # Démarrer le serveur
-        LT_PATH = r"D:\project IA\LanguageTool-6.6\LanguageTool-6.6"
-        subprocess.Popen(
-            [
-                "java", "-cp", f"{LT_PATH}\\languagetool.jar",
-                "org.languagetool.server.HTTPServer",
-                "--port", "8081", "--allow-origin", "*"
-            ],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        print("🚀 Serveur Java LanguageTool démarré sur http://127.0.0.1:8081")
-        time.sleep(5)  # Donner plus de temps pour le démarrage
-    except Exception as e:
-        print("❌ Erreur lors du démarrage de LanguageTool local :", e)
+    """Conservé pour compatibilité : délègue au client supervisé"""
+    return languagetool.ensure_server()
 
 # ======================================================
 # 🔍 Fonction d'analyse du texte via API HTTP locale
 # ======================================================
-def analyze_text_quality(text: str, lang: str = "en-US"):
-    """Analyse la qualité linguistique d'un texte avec LanguageTool"""
-    start_local_languagetool_server()
+def quality_result(nb_errors: int, text: str, examples):
+    total_words = len(text.split()) or 1
+    error_rate = (nb_errors / total_words) * 100
+    score = max(0, 100 - min(error_rate, 100))  # Limiter à 100%
+    return {
+        "nb_errors": nb_errors,
+        "error_rate": round(error_rate, 2),
+        "quality_score": round(score, 2),
+        "examples": examples,
+    }
+
 
-    url = "http://127.0.0.1:8081/v2/check"
-    payload = {"language": lang, "text": text}
+def analyze_with_symspell(text: str, lang: str = "en-US"):
+    """Orthographe seule via le dictionnaire SymSpell (SpellDictionaryMissing sans dictionnaire)"""
+    errors = find_misspellings(text, lang)
+    examples = [
+        f"Faute possible : « {e.word} »" + (f" → « {e.suggestion} »" if e.suggestion else "")
+        for e in errors[:3]
+    ] or ["Aucune erreur détectée."]
+    return quality_result(len(errors), text, examples)
 
+
+# Les erreurs (serveur, dictionnaire absent) sont levées, donc jamais mises en cache
+@memoize("text_quality", version="2")
+def _analyze(text: str, lang: str, engine: str):
+    if engine == "symspell":
+        return analyze_with_symspell(text, lang)
+    matches = languagetool.check(text, lang)
+    examples = [m.get("message", "Erreur inconnue") for m in matches[:3]] if matches else ["Aucune erreur détectée."]
+    return quality_result(len(matches), text, examples)
+
+
+def analyze_text_quality(text: str, lang: str = "en-US", engine: str = None):
+    """Analyse la qualité linguistique d'un texte (engine : "languagetool" ou "symspell")"""
     try:
-        response = requests.post(url, data=payload, timeout=30)
-        if response.status_code != 200:
+        try:
+            return _analyze(text, lang, (engine or SPELL_ENGINE).lower())
+        except (LanguageToolError, SpellDictionaryMissing) as e:
             return {
                 "nb_errors": 0,
                 "error_rate": 0,
                 "quality_score": 0,
-                "examples": [f"Erreur serveur {response.status_code}"],
+                "examples": [str(e)],
             }
 
-        result = response.json()
-        matches = result.get("matches", [])
-        nb_errors = len(matches)
-        total_words = len(text.split()) or 1
-        error_rate = (nb_errors / total_words) * 100
-        score = max(0, 100 - min(error_rate, 100))  # Limiter à 100%
-        examples = [m.get("message", "Erreur inconnue") for m in matches[:3]] if matches else ["Aucune erreur détectée."]
-
-        return {
-            "nb_errors": nb_errors,
-            "error_rate": round(error_rate, 2),
-            "quality_score": round(score, 2),
-            "examples": examples,
-        }
-
     except Exception as e:
         print("❌ Erreur lors de l'analyse du texte :", e)
         return {
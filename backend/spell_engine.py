@@ -0,0 +1,249 @@
+# spell_engine.py
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# ⚙️ Configuration
+# ======================================================
+# Listes de mots "<mot>" ou "<mot> <fréquence>" par ligne, une par langue
+SPELL_DICTIONARY_DIR = os.getenv(
+    "SPELL_DICTIONARY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dictionaries")
+)
+SPELL_DICTIONARY_FILES = {"en-US": "en-US.txt", "fr": "fr.txt"}
+SPELL_MAX_EDIT_DISTANCE = int(os.getenv("SPELL_MAX_EDIT_DISTANCE", "2"))
+# Longueur du préfixe indexé (compromis mémoire / rappel, comme SymSpell)
+SPELL_PREFIX_LENGTH = int(os.getenv("SPELL_PREFIX_LENGTH", "7"))
+
+_WORD = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+
+# Formes élidées (l'expérience, qu'il) et contractions anglaises (developer's, don't)
+_FRENCH_ELISIONS = frozenset(["l", "d", "j", "m", "t", "n", "s", "c", "qu", "jusqu", "lorsqu", "puisqu", "quoiqu"])
+_ENGLISH_CONTRACTIONS = frozenset(["s", "t", "d", "m", "ll", "re", "ve"])
+_APOSTROPHE = re.compile(r"['’]")
+
+
+class SpellDictionaryMissing(Exception):
+    """Aucun dictionnaire orthographique disponible pour la langue demandée"""
+
+
+class Misspelling(NamedTuple):
+    offset: int
+    word: str
+    suggestion: Optional[str]
+
+
+def normalize_language(lang: str) -> str:
+    """en, en-GB, en-US -> en-US ; fr, fr-FR -> fr"""
+    return "fr" if (lang or "").lower().startswith("fr") else "en-US"
+
+
+def _damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Distance d'édition avec transpositions (OSA), arrêt anticipé au-delà de max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellDictionary:
+    """
+    Dictionnaire à suppressions symétriques (SymSpell) : l'appartenance d'un
+    mot est un accès au set, les suggestions passent par l'index des
+    suppressions, construit au premier besoin.
+    """
+
+    def __init__(self, max_edit_distance: int = SPELL_MAX_EDIT_DISTANCE, prefix_length: int = SPELL_PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.frequencies: Dict[str, int] = {}
+        self._deletes: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def add_words(self, words: Iterable[str], frequency: int = 1):
+        for word in words:
+            word = word.lower()
+            self.frequencies[word] = max(self.frequencies.get(word, 0), frequency)
+        self._deletes = None
+
+    def load(self, path: str) -> int:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                frequency = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+                word = parts[0].lower()
+                self.frequencies[word] = max(self.frequencies.get(word, 0), frequency)
+        self._deletes = None
+        return len(self.frequencies)
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self.frequencies
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
+
+    def _edits(self, word: str) -> Set[str]:
+        """Toutes les suppressions de 1 à max_edit_distance caractères"""
+        edits, frontier = set(), {word}
+        for _ in range(self.max_edit_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            edits |= frontier
+        return edits
+
+    def _index(self) -> Dict[str, List[str]]:
+        if self._deletes is None:
+            with self._lock:
+                if self._deletes is None:
+                    deletes: Dict[str, List[str]] = {}
+                    for word in self.frequencies:
+                        prefix = word[:self.prefix_length]
+                        for edit in self._edits(prefix) | {prefix}:
+                            deletes.setdefault(edit, []).append(word)
+                    self._deletes = deletes
+        return self._deletes
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Meilleure correction : plus petite distance, puis mot le plus fréquent"""
+        word = word.lower()
+        if word in self.frequencies:
+            return word
+        index = self._index()
+        prefix = word[:self.prefix_length]
+        candidates = set()
+        for edit in self._edits(prefix) | {prefix}:
+            candidates.update(index.get(edit, ()))
+        best, best_key = None, None
+        for candidate in candidates:
+            distance = _damerau_levenshtein(word, candidate, self.max_edit_distance)
+            if distance > self.max_edit_distance:
+                continue
+            key = (distance, -self.frequencies[candidate])
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+
+# ======================================================
+# 📚 Dictionnaires par langue (chargés une fois par processus)
+# ======================================================
+_dictionaries: Dict[str, Optional[SymSpellDictionary]] = {}
+_dictionaries_lock = threading.Lock()
+
+
+def _bundled_english_dictionary() -> Optional[str]:
+    """Dictionnaire de fréquences fourni avec symspellpy, s'il est installé"""
+    try:
+        import symspellpy
+    except ImportError:
+        return None
+    path = os.path.join(os.path.dirname(symspellpy.__file__), "frequency_dictionary_en_82_765.txt")
+    return path if os.path.exists(path) else None
+
+
+def _technical_vocabulary() -> Set[str]:
+    """Mots des compétences connues (python, kubernetes...) : jamais signalés"""
+    try:
+        from skill_matcher import load_skill_dictionary
+    except ImportError:
+        return set()
+    words = set()
+    for skill, entry in load_skill_dictionary().items():
+        for alias in [skill] + list(entry.get("aliases", [])) + list(entry.get("exact_aliases", [])):
+            words.update(_WORD.findall(alias.lower()))
+    return words
+
+
+def dictionary_path(lang: str) -> Optional[str]:
+    """Liste de mots utilisée pour la langue, None si aucune n'est installée"""
+    lang = normalize_language(lang)
+    path = os.path.join(SPELL_DICTIONARY_DIR, SPELL_DICTIONARY_FILES[lang])
+    if not os.path.exists(path) and lang == "en-US":
+        path = _bundled_english_dictionary() or path
+    return path if os.path.exists(path) else None
+
+
+def missing_dictionaries() -> List[str]:
+    return [lang for lang in SPELL_DICTIONARY_FILES if dictionary_path(lang) is None]
+
+
+def get_dictionary(lang: str) -> Optional[SymSpellDictionary]:
+    lang = normalize_language(lang)
+    if lang in _dictionaries:
+        return _dictionaries[lang]
+    with _dictionaries_lock:
+        if lang not in _dictionaries:
+            path = dictionary_path(lang)
+            dictionary = None
+            if path is not None:
+                dictionary = SymSpellDictionary()
+                size = dictionary.load(path)
+                dictionary.add_words(_technical_vocabulary())
+                logger.info(f"📚 Dictionnaire {lang} chargé ({size} mots) depuis {path}")
+            else:
+                logger.error(f"Aucun dictionnaire orthographique pour {lang} "
+                             f"({os.path.join(SPELL_DICTIONARY_DIR, SPELL_DICTIONARY_FILES[lang])})")
+            _dictionaries[lang] = dictionary
+    return _dictionaries[lang]
+
+
+def _should_check(token: str, text: str, offset: int) -> bool:
+    """Ignore acronymes, mots très courts et noms propres en milieu de phrase"""
+    if len(token) <= 2 or token.isupper():
+        return False
+    if token[0].isupper():
+        before = text[:offset].rstrip()
+        return not before or before[-1] in ".!?\n"
+    return True
+
+
+def _strip_clitics(token: str, offset: int, lang: str):
+    """Mot principal d'une forme élidée : j'ai -> ai, qu'il -> il, developer's -> developer"""
+    parts = _APOSTROPHE.split(token)
+    if len(parts) == 1:
+        return token, offset
+    if lang == "fr" and parts[0].lower() in _FRENCH_ELISIONS:
+        head = len(parts[0]) + 1
+        return token[head:], offset + head
+    if lang == "en-US" and parts[-1].lower() in _ENGLISH_CONTRACTIONS:
+        return token[:-(len(parts[-1]) + 1)], offset
+    return token, offset
+
+
+def find_misspellings(text: str, lang: str = "en-US", suggestions: int = 3) -> List[Misspelling]:
+    """
+    Mots inconnus du dictionnaire, avec une correction pour les `suggestions`
+    premiers. SpellDictionaryMissing si aucun dictionnaire n'est installé.
+    """
+    lang = normalize_language(lang)
+    dictionary = get_dictionary(lang)
+    if dictionary is None:
+        raise SpellDictionaryMissing(f"Aucun dictionnaire orthographique pour {lang} dans {SPELL_DICTIONARY_DIR}")
+    errors = []
+    for match in _WORD.finditer(text):
+        token = match.group(0)
+        if not _should_check(token, text, match.start()) or token in dictionary:
+            continue
+        word, offset = _strip_clitics(token, match.start(), lang)
+        # Clitique suivi d'un mot court (j'ai, d'un) : ignoré comme les mots courts
+        if len(word) <= 2 or word in dictionary:
+            continue
+        suggestion = dictionary.lookup(word) if len(errors) < suggestions else None
+        errors.append(Misspelling(offset, word, suggestion))
+    return errors
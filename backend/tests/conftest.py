@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# Les modules du backend sont à plat : backend/ doit être importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
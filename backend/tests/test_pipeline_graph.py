@@ -0,0 +1,130 @@
+# test_pipeline_graph.py
+import asyncio
+import time
+
+import pytest
+
+from pipeline_graph import Stage, StageGraph
+
+
+def run(graph, inputs, **kwargs):
+    return asyncio.run(graph.run(inputs, **kwargs))
+
+
+def test_independent_stages_run_in_parallel():
+    def slow(name):
+        def func(ctx):
+            time.sleep(0.2)
+            return {name: ctx["x"] + 1}
+        return func
+
+    graph = StageGraph([
+        Stage("a", slow("a"), ("x",), ("a",)),
+        Stage("b", slow("b"), ("x",), ("b",)),
+        Stage("sum", lambda ctx: {"sum": ctx["a"] + ctx["b"]}, ("a", "b"), ("sum",)),
+    ], inputs=("x",))
+    result = run(graph, {"x": 1})
+    assert result.values["sum"] == 4
+    assert {stage["status"] for stage in result.report.values()} == {"done"}
+    # Chemin critique : a et b en parallèle (~0,2 s), pas en série
+    assert result.total_ms < 350
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError, match="Cycle"):
+        StageGraph([
+            Stage("a", lambda ctx: {"a": 1}, ("b",), ("a",)),
+            Stage("b", lambda ctx: {"b": 1}, ("a",), ("b",)),
+        ])
+
+
+def test_missing_producer_and_duplicate_output_are_rejected():
+    with pytest.raises(ValueError, match="sans producteur"):
+        StageGraph([Stage("a", lambda ctx: {"a": 1}, ("nope",), ("a",))])
+    with pytest.raises(ValueError, match="plusieurs sources"):
+        StageGraph([
+            Stage("a", lambda ctx: {"v": 1}, (), ("v",)),
+            Stage("b", lambda ctx: {"v": 2}, (), ("v",)),
+        ])
+
+
+def test_skip_uses_fallback_and_dependents_still_run():
+    graph = StageGraph([
+        Stage("fraud", lambda ctx: {"report": "ran"}, ("x",), ("report",),
+              optional=True, fallback=lambda values: {"report": {"status": "skipped"}}),
+        Stage("store", lambda ctx: {"stored": ctx["report"]}, ("report",), ("stored",)),
+    ], inputs=("x",))
+    result = run(graph, {"x": 1}, skip=["fraud"])
+    assert result.values["stored"] == {"status": "skipped"}
+    assert result.report["fraud"]["status"] == "skipped"
+    assert result.report["store"]["status"] == "done"
+
+
+def test_skip_without_fallback_propagates_to_dependents():
+    calls = []
+    graph = StageGraph([
+        Stage("opt", lambda ctx: {"o": 1}, (), ("o",), optional=True),
+        Stage("dep", lambda ctx: calls.append("dep") or {"d": ctx["o"]}, ("o",), ("d",)),
+        Stage("other", lambda ctx: {"z": 2}, (), ("z",)),
+    ])
+    result = run(graph, {}, skip=["opt"])
+    assert calls == []
+    assert result.report["dep"]["status"] == "skipped"
+    assert "d" not in result.values
+    assert result.values["z"] == 2
+
+
+def test_only_optional_stages_can_be_skipped():
+    graph = StageGraph([Stage("required", lambda ctx: {"r": 1}, (), ("r",))])
+    with pytest.raises(ValueError, match="non optionnelles"):
+        run(graph, {}, skip=["required"])
+    assert graph.optional_stages() == []
+
+
+def test_optional_failure_falls_back():
+    def broken(ctx):
+        raise RuntimeError("modèle absent")
+
+    graph = StageGraph([
+        Stage("opt", broken, (), ("o",), optional=True, fallback=lambda values: {"o": 0}),
+        Stage("dep", lambda ctx: {"d": ctx["o"] + 1}, ("o",), ("d",)),
+    ])
+    result = run(graph, {})
+    assert result.values["d"] == 1
+    assert result.report["opt"]["status"] == "failed"
+    assert "modèle absent" in result.report["opt"]["error"]
+
+
+def test_required_failure_raises():
+    def broken(ctx):
+        raise RuntimeError("extraction impossible")
+
+    graph = StageGraph([
+        Stage("extract", broken, (), ("text",)),
+        Stage("analyse", lambda ctx: {"a": ctx["text"]}, ("text",), ("a",)),
+    ])
+    with pytest.raises(RuntimeError, match="extraction impossible"):
+        run(graph, {})
+
+
+def test_async_stage_and_custom_runner():
+    used = []
+
+    async def runner(func, *args):
+        used.append(func.__name__)
+        return func(*args)
+
+    async def fetch(ctx):
+        return {"doc": ctx["x"] * 2}
+
+    def parse(ctx):
+        return {"parsed": ctx["doc"] + 1}
+
+    graph = StageGraph([
+        Stage("fetch", fetch, ("x",), ("doc",)),
+        Stage("parse", parse, ("doc",), ("parsed",)),
+    ], inputs=("x",))
+    result = run(graph, {"x": 3}, runner=runner)
+    assert result.values["parsed"] == 7
+    # Les coroutines s'exécutent sur la boucle, seules les fonctions synchrones passent par le runner
+    assert used == ["parse"]
@@ -0,0 +1,56 @@
+# test_skill_matcher.py
+import pytest
+
+from skill_matcher import SkillMatcher, skill_matcher
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Python, Go, R et Docker", ["python", "go", "r", "docker"]),
+    ("Compétences : Go.", ["go"]),
+    ("Skills: AI, ML", ["ai", "machine learning"]),
+    ("API REST (Spring)", ["api", "rest", "spring"]),
+])
+def test_exact_aliases_between_delimiters(text, expected):
+    assert skill_matcher.find_skills(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "R&D go-to-market",        # délimiteurs non admis autour d'un alias exact
+    "en ce moment je vais",    # "go"/"r" à l'intérieur de mots
+    "Let us go now",           # casse différente de l'alias exact
+    "j'ai fait de l'IA",       # l'apostrophe fait partie du mot
+    "le printemps (spring)",
+])
+def test_ambiguous_words_are_not_skills(text):
+    assert skill_matcher.find_skills(text) == []
+
+
+def test_word_boundaries():
+    assert skill_matcher.find_skills("java et javascript") == ["java", "javascript"]
+    assert skill_matcher.find_skills("pythonista, sqlite3") == []
+
+
+def test_aliases_map_to_canonical_skill():
+    assert skill_matcher.find_skills("golang") == ["go"]
+    assert skill_matcher.canonical("Golang") == "go"
+    assert skill_matcher.canonical(" React.js ") == "react"
+    assert skill_matcher.canonical("Inconnue") == "inconnue"
+    assert skill_matcher.category("Python") == "programming"
+
+
+def test_positions_and_overlapping_aliases():
+    matcher = SkillMatcher({
+        "machine learning": {"category": "ai", "aliases": ["machine learning"]},
+        "learning": {"category": "soft", "aliases": ["learning"]},
+    })
+    matches = matcher.find("Deep machine learning")
+    assert [(m.skill, m.start, m.end) for m in matches] == [
+        ("machine learning", 5, 21),
+        ("learning", 13, 21),
+    ]
+
+
+def test_entry_without_aliases_matches_its_name():
+    matcher = SkillMatcher({"terraform": {"category": "devops"}})
+    assert matcher.find_skills("Terraform, Ansible") == ["terraform"]
+    assert matcher.find_skills("") == []
@@ -0,0 +1,64 @@
+# test_spell_engine.py
+import pytest
+
+import spell_engine
+from spell_engine import SpellDictionaryMissing, SymSpellDictionary, find_misspellings
+
+
+@pytest.fixture
+def dictionaries(monkeypatch):
+    """Petits dictionnaires en mémoire à la place des listes de mots installées"""
+    english = SymSpellDictionary()
+    english.add_words(["the", "developer", "experience", "python", "with", "years", "team"], frequency=10)
+    english.add_words(["developed"], frequency=1)
+    french = SymSpellDictionary()
+    french.add_words(["développeur", "expérience", "équipe", "avec", "ans", "il", "aime"], frequency=10)
+    monkeypatch.setitem(spell_engine._dictionaries, "en-US", english)
+    monkeypatch.setitem(spell_engine._dictionaries, "fr", french)
+
+
+def test_lookup_prefers_distance_then_frequency():
+    dictionary = SymSpellDictionary(max_edit_distance=2)
+    dictionary.add_words(["developer"], frequency=10)
+    dictionary.add_words(["developed"], frequency=1)
+    assert dictionary.lookup("develper") == "developer"
+    assert dictionary.lookup("Developer") == "developer"
+    assert dictionary.lookup("zzzzzz") is None
+
+
+def test_misspellings_with_suggestion(dictionaries):
+    errors = find_misspellings("python developer with five yeras experience")
+    assert [(e.word, e.suggestion) for e in errors] == [("five", None), ("yeras", "years")]
+
+
+def test_suggestions_are_limited(dictionaries):
+    errors = find_misspellings("yeras developr", suggestions=1)
+    assert [e.suggestion for e in errors] == ["years", None]
+
+
+def test_clitics_are_stripped(dictionaries):
+    assert find_misspellings("the developer's team", lang="en-US") == []
+    assert find_misspellings("qu'il aime l'équipe", lang="fr") == []
+    errors = find_misspellings("l'expérince", lang="fr")
+    assert [(e.offset, e.word, e.suggestion) for e in errors] == [(2, "expérince", "expérience")]
+
+
+def test_acronyms_and_proper_nouns_are_ignored(dictionaries):
+    assert find_misspellings("python with AWS at Airbus") == []
+
+
+def test_missing_dictionary_raises(monkeypatch, tmp_path):
+    monkeypatch.setattr(spell_engine, "SPELL_DICTIONARY_DIR", str(tmp_path))
+    monkeypatch.setattr(spell_engine, "_bundled_english_dictionary", lambda: None)
+    monkeypatch.setattr(spell_engine, "_dictionaries", {})
+    assert spell_engine.missing_dictionaries() == ["en-US", "fr"]
+    with pytest.raises(SpellDictionaryMissing):
+        find_misspellings("bonjour", lang="fr")
+
+
+def test_dictionary_file_is_loaded(monkeypatch, tmp_path):
+    (tmp_path / "fr.txt").write_text("bonjour 100\nmonde\n", encoding="utf-8")
+    monkeypatch.setattr(spell_engine, "SPELL_DICTIONARY_DIR", str(tmp_path))
+    monkeypatch.setattr(spell_engine, "_dictionaries", {})
+    assert find_misspellings("bonjour monde", lang="fr") == []
+    assert [e.word for e in find_misspellings("bonjour mondee", lang="fr")] == ["mondee"]
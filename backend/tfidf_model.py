@@ -0,0 +1,223 @@
+# tfidf_model.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "model_cache")
+TFIDF_MODEL_PATH = os.getenv("TFIDF_MODEL_PATH", os.path.join(MODEL_CACHE_DIR, "tfidf_corpus.joblib"))
+
+# Nouveaux documents observés avant une mise à jour incrémentale de l'IDF
+TFIDF_UPDATE_EVERY = int(os.getenv("TFIDF_UPDATE_EVERY", "100"))
+# Documents à accumuler avant un premier fit lorsque le corpus initial était vide
+TFIDF_MIN_FIT_DOCS = int(os.getenv("TFIDF_MIN_FIT_DOCS", "20"))
+# Âge maximal avant un ré-apprentissage complet (nouveau vocabulaire)
+TFIDF_MAX_AGE_SECONDS = int(os.getenv("TFIDF_MAX_AGE_SECONDS", str(24 * 3600)))
+
+
+def _transformer_from_idf(idf: np.ndarray) -> TfidfTransformer:
+    """TfidfTransformer prêt à l'emploi à partir d'un vecteur IDF"""
+    transformer = TfidfTransformer()
+    transformer.idf_ = idf
+    transformer.n_features_in_ = len(idf)
+    return transformer
+
+
+class CorpusTfidfModel:
+    """
+    Modèle TF-IDF appris une fois sur le corpus candidats + offres.
+    Le vocabulaire est figé au fit ; l'IDF est mis à jour de façon
+    incrémentale à partir des fréquences documentaires, et un fit complet
+    est refait périodiquement. Tant que le modèle n'est pas appris, les
+    documents observés sont conservés jusqu'à permettre un premier fit.
+    Les vecteurs des documents sont mis en cache : une similarité est un
+    simple produit scalaire creux.
+    """
+
+    def __init__(self, path: str = TFIDF_MODEL_PATH, cache_size: int = 4096,
+                 update_every: int = TFIDF_UPDATE_EVERY,
+                 max_age_seconds: int = TFIDF_MAX_AGE_SECONDS,
+                 min_fit_docs: int = TFIDF_MIN_FIT_DOCS):
+        self.path = path
+        self.cache_size = cache_size
+        self.update_every = update_every
+        self.min_fit_docs = max(1, min_fit_docs)
+        self.max_age_seconds = max_age_seconds
+
+        self._lock = threading.RLock()
+        self._counter: Optional[CountVectorizer] = None
+        self._transformer: Optional[TfidfTransformer] = None
+        self._df: Optional[np.ndarray] = None
+        self._n_docs = 0
+        self._fitted_at = 0.0
+        self._pending: List[str] = []
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._transformer is not None
+
+    @property
+    def version(self) -> str:
+        """Identifiant de l'état courant (fit et mises à jour de l'IDF)"""
+        if not self.is_fitted:
+            return "unfitted"
+        return f"{self._fitted_at:.0f}-{self._n_docs}"
+
+    @property
+    def is_stale(self) -> bool:
+        return not self.is_fitted or time.time() - self._fitted_at > self.max_age_seconds
+
+    # ---------------- Apprentissage ----------------
+    def fit(self, corpus: Iterable[str]):
+        """Apprend vocabulaire et IDF sur le corpus complet"""
+        documents = [doc for doc in corpus if doc]
+        if not documents:
+            logger.warning("Corpus TF-IDF vide, modèle non appris")
+            return
+
+        counter = CountVectorizer(max_features=20000, stop_words="english", ngram_range=(1, 2))
+        counts = counter.fit_transform(documents)
+        df = np.asarray((counts > 0).sum(axis=0)).ravel().astype(np.float64)
+        transformer = TfidfTransformer()
+        transformer.fit(counts)
+
+        with self._lock:
+            self._counter, self._transformer = counter, transformer
+            self._df, self._n_docs = df, len(documents)
+            self._fitted_at = time.time()
+            self._pending = []
+            self._cache.clear()
+        logger.info(f"Modèle TF-IDF appris sur {len(documents)} documents")
+
+    def observe(self, text: str):
+        """
+        Enregistre un nouveau document ; met l'IDF à jour par paquets, ou
+        fait le premier fit dès que min_fit_docs documents sont connus.
+        Bloquant (fit, sauvegarde) : à appeler hors de la boucle d'événements.
+        """
+        if not text:
+            return
+        with self._lock:
+            self._pending.append(text)
+            fitted = self.is_fitted
+            if len(self._pending) < (self.update_every if fitted else self.min_fit_docs):
+                return
+            pending, self._pending = self._pending, []
+        if fitted:
+            self.partial_update(pending)
+        else:
+            self.fit(pending)
+            self.save()
+
+    def partial_update(self, documents: List[str]):
+        """Mise à jour incrémentale de l'IDF sur le vocabulaire existant"""
+        if not documents or not self.is_fitted:
+            return
+        counts = self._counter.transform(documents)
+        with self._lock:
+            self._df = self._df + np.asarray((counts > 0).sum(axis=0)).ravel()
+            self._n_docs += len(documents)
+            # Même formule que TfidfTransformer(smooth_idf=True)
+            idf = np.log((1 + self._n_docs) / (1 + self._df)) + 1
+            self._transformer = _transformer_from_idf(idf)
+            self._cache.clear()
+        self.save()
+
+    def refresh(self, corpus_loader: Callable[[], Iterable[str]], force: bool = False):
+        """Ré-apprentissage complet si le modèle est absent ou trop ancien"""
+        if force or self.is_stale:
+            self.fit(corpus_loader())
+            self.save()
+
+    # ---------------- Vectorisation ----------------
+    def transform(self, text: str):
+        """Vecteur TF-IDF (normalisé L2) d'un document, mis en cache"""
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                return vector
+            counter, transformer = self._counter, self._transformer
+
+        vector = transformer.transform(counter.transform([text]))
+
+        with self._lock:
+            self._cache[key] = vector
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def similarity(self, text1: str, text2: str) -> float:
+        """Cosinus entre deux documents (produit scalaire creux)"""
+        return float(self.transform(text1).multiply(self.transform(text2)).sum())
+
+    def similarities(self, query: str, texts: List[str]) -> np.ndarray:
+        """Cosinus entre un document et une liste de documents"""
+        if not texts:
+            return np.zeros(0)
+        query_vector = self.transform(query)
+        with self._lock:
+            counter, transformer = self._counter, self._transformer
+        matrix = transformer.transform(counter.transform(texts))
+        return (matrix @ query_vector.T).toarray().ravel()
+
+    # ---------------- Persistance ----------------
+    def save(self):
+        if not self.is_fitted:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._lock:
+                state = {
+                    "counter": self._counter,
+                    "idf": self._transformer.idf_,
+                    "df": self._df,
+                    "n_docs": self._n_docs,
+                    "fitted_at": self._fitted_at,
+                }
+            joblib.dump(state, self.path)
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde du modèle TF-IDF: {e}")
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            state = joblib.load(self.path)
+            transformer = _transformer_from_idf(state["idf"])
+            with self._lock:
+                self._counter = state["counter"]
+                self._transformer = transformer
+                self._df = state["df"]
+                self._n_docs = state["n_docs"]
+                self._fitted_at = state["fitted_at"]
+                self._cache.clear()
+            return True
+        except Exception as e:
+            logger.error(f"Erreur chargement du modèle TF-IDF: {e}")
+            return False
+
+
+_tfidf_model: Optional[CorpusTfidfModel] = None
+_tfidf_model_lock = threading.Lock()
+
+
+def get_tfidf_model() -> CorpusTfidfModel:
+    """Instance partagée du modèle TF-IDF (chargée depuis le disque)"""
+    global _tfidf_model
+    with _tfidf_model_lock:
+        if _tfidf_model is None:
+            _tfidf_model = CorpusTfidfModel()
+            _tfidf_model.load()
+        return _tfidf_model
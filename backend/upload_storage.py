@@ -0,0 +1,165 @@
+# upload_storage.py
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+# Version de la chaîne d'analyse des CV (parsing, NER, classifieurs, qualité).
+# À incrémenter à chaque changement de parsing ou de modèle : les analyses
+# stockées sous une autre version ne sont plus réutilisées.
+CV_ANALYZER_VERSION = os.getenv("CV_ANALYZER_VERSION", "1")
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Taille maximale d'un fichier reçu (CV, diplôme, certificat)
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(20 * 1024 * 1024)))
+
+PDF_TYPES = {"application/pdf"}
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/tiff", "image/bmp", "image/webp"}
+DOCUMENT_TYPES = PDF_TYPES | IMAGE_TYPES
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    content_hash: str
+    size: int
+    original_filename: str
+    mime_type: str
+
+
+class UploadRejected(Exception):
+    """Fichier refusé pendant la réception (413 trop volumineux, 415 type non accepté)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# ======================================================
+# 🔎 Détection du type réel (octets de signature, pas l'extension)
+# ======================================================
+_SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"PK\x03\x04", "application/zip"),
+]
+
+
+def sniff_mime(head: bytes) -> str:
+    """Type MIME d'après les premiers octets du fichier"""
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    # Certains générateurs placent des octets parasites avant l'en-tête PDF
+    if b"%PDF-" in head[:1024]:
+        return "application/pdf"
+    return "application/octet-stream"
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def content_addressed_path(directory: str, content_hash: str, filename: str) -> str:
+    """Chemin du fichier nommé d'après son empreinte SHA-256"""
+    return os.path.join(directory, content_hash + _extension(filename))
+
+
+class _ThreadFileWriter:
+    """Repli sans aiofiles : chaque écriture est déléguée à un thread"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._file = None
+
+    async def __aenter__(self):
+        self._file = await asyncio.to_thread(open, self._path, "wb")
+        return self
+
+    async def write(self, data: bytes) -> int:
+        return await asyncio.to_thread(self._file.write, data)
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.to_thread(self._file.close)
+
+
+def _open_for_write(path: str):
+    if aiofiles is not None:
+        return aiofiles.open(path, "wb")
+    return _ThreadFileWriter(path)
+
+
+async def store_upload(
+    file,
+    directory: str,
+    max_size: int = UPLOAD_MAX_SIZE,
+    allowed_types: Optional[Iterable[str]] = None,
+    filename: Optional[str] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredUpload:
+    """
+    Reçoit un UploadFile par blocs sans le charger en mémoire ni bloquer la
+    boucle d'événements. En une seule passe : écriture disque, SHA-256,
+    détection du type sur le premier bloc et contrôle de la taille.
+    Sans `filename`, le fichier est stocké sous <sha256><ext> : deux uploads
+    identiques partagent le même fichier et deux homonymes ne s'écrasent plus.
+    """
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and declared_size > max_size:
+        raise UploadRejected(413, f"Fichier trop volumineux (maximum {max_size} octets)")
+
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    mime_type = None
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+    try:
+        async with _open_for_write(temp_path) as buffer:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                if mime_type is None:
+                    mime_type = sniff_mime(chunk)
+                    if allowed_types is not None and mime_type not in allowed_types:
+                        raise UploadRejected(415, f"Type de fichier non accepté: {mime_type}")
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadRejected(413, f"Fichier trop volumineux (maximum {max_size} octets)")
+                digest.update(chunk)
+                await buffer.write(chunk)
+        if size == 0:
+            raise UploadRejected(400, "Fichier vide")
+        content_hash = digest.hexdigest()
+        if filename:
+            path = os.path.join(directory, filename)
+            os.replace(temp_path, path)
+        else:
+            path = content_addressed_path(directory, content_hash, file.filename)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return StoredUpload(path, content_hash, size, file.filename or "", mime_type)